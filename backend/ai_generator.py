@@ -1,18 +1,56 @@
 import os
+import json
 import logging
+import re
+import threading
+import time
+from collections import OrderedDict
 import google.generativeai as genai
-from deep_translator import GoogleTranslator
+from google.ai import generativelanguage as glm
 try:
     from . import db_config  # load .env at import-time (server only)
-    from .schema_handler import load_schema, store_all_table_structures
+    from .db_driver import get_driver
+    from .schema_handler import load_schema, store_all_table_structures, get_table_indexes, foreign_key_edges
     from .secret_store import get_google_api_key
+    from .sql_lexer import canonical_sql
+    from .sql_explainer import explain_sql
+    from .llm_scheduler import scheduler, LLMUnavailable, INTERACTIVE, BACKGROUND
+    from . import metrics, timing, translation
 except ImportError:
     import db_config
-    from schema_handler import load_schema, store_all_table_structures
+    from db_driver import get_driver
+    from schema_handler import load_schema, store_all_table_structures, get_table_indexes, foreign_key_edges
     from secret_store import get_google_api_key
+    from sql_lexer import canonical_sql
+    from sql_explainer import explain_sql
+    from llm_scheduler import scheduler, LLMUnavailable, INTERACTIVE, BACKGROUND
+    import metrics
+    import timing
+    import translation
 
 logging.basicConfig(level=logging.INFO)
-translator = GoogleTranslator(source="auto", target="en")
+
+# Completion tokens assumed when reserving tokens-per-minute budget; corrected from usage_metadata.
+EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "512"))
+_models = {}
+
+# EXPLANATION_LOCAL=1: common query shapes are explained from templates (sql_explainer) without the model.
+EXPLANATION_LOCAL = os.getenv("EXPLANATION_LOCAL", "1") == "1"
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "1024"))
+# EXPLANATION_BATCH=1: a missed explanation is generated for all EXPLANATION_LANGUAGES in one call.
+EXPLANATION_BATCH = os.getenv("EXPLANATION_BATCH", "0") == "1"
+EXPLANATION_LANGUAGES = [
+    code.strip() for code in os.getenv("EXPLANATION_LANGUAGES", "en,es,fr,de,hi,zh,ja,ru").split(",") if code.strip()
+]
+LANGUAGE_NAMES = {
+    "en": "English", "es": "Spanish", "fr": "French", "de": "German", "hi": "Hindi",
+    "zh": "Chinese", "ja": "Japanese", "ru": "Russian", "it": "Italian", "pt": "Portuguese",
+}
+_explanations = OrderedDict()
+_explanations_lock = threading.Lock()
+EXPLANATIONS = metrics.Counter(
+    "querywizard_explanations_total", "SQL explanations by how they were served.", ("result",),
+)
 
 def has_api_key():
     """True if API key is available via env or OS keychain."""
@@ -38,15 +76,16 @@ def _format_ai_error(exc: Exception) -> str:
 
 
 def translate_to_english(text):
-    """Translates input text to English while keeping table names intact."""
+    """Translates input text to English while keeping table names intact (English input is passed through)."""
     try:
-        return translator.translate(text)
+        with timing.span("translate"):
+            return translation.translate(text, "en")
     except Exception:
         return text
 
 
 SQL_PROMPT = """
-You are an expert MySQL administrator. Convert the given natural language request into a valid MySQL query.
+You are an expert {dialect} administrator. Convert the given natural language request into a valid {dialect} query.
 The SQL database consists of multiple tables like STUDENT, COLLEGE, FACULTY with their respective columns.
 You can create more tables, delete any table, perform JOIN operations as well as use aggregate functions,and many more if the user say so.
 Rules:
@@ -61,32 +100,29 @@ Rules:
 9.table ka schema dikhao means describe the table.
 10.for any query of create use create if not exist with the given fields.
 11. always take each input as lowercase strictly.
-IMPORTANT RULE: if a record is used as a foreign key in other table then delete it from other tables as well
+"""
 
+# Left out when the DELETE will run with cascade=True, where cascade_planner orders the child deletes
+CHILD_DELETE_RULE = """IMPORTANT RULE: if a record is used as a foreign key in other table then delete it from other tables as well
 """
 
 
 def _build_referenced_by(schema):
     """Build map: table_name -> list of 'other_table.column' that reference it."""
     refs = {}
-    for table, cols in schema.items():
-        for col, data in cols.items():
-            fk = data.get("foreign_key")
-            if fk:
-                ref_table = fk.split("(")[0].strip() if "(" in fk else fk
-                ref_table = ref_table.strip("`")
-                if ref_table not in refs:
-                    refs[ref_table] = []
-                refs[ref_table].append(f"`{table}`.`{col}`")
+    for table, col, fk in foreign_key_edges(schema):
+        ref_table = fk.split("(")[0].strip() if "(" in fk else fk
+        ref_table = ref_table.strip("`")
+        if ref_table not in refs:
+            refs[ref_table] = []
+        refs[ref_table].append(f"`{table}`.`{col}`")
     return refs
 
 
-def get_gemini_response(prompt, default_table=None):
-    if not _ensure_genai_configured():
-        return "AI Error: Missing API key. Add it in login."
-    store_all_table_structures(force_update=True)
-    schema = load_schema()
+def _build_sql_prompt(prompt, schema, default_table=None):
+    """Translate the user prompt and append schema/relationship details for the tables it mentions."""
     translated_prompt = translate_to_english(prompt)
+    started = time.perf_counter()
     mentioned_tables = [table for table in schema.keys() if table.lower() in translated_prompt.lower()]
     if not mentioned_tables and default_table and default_table != "None" and default_table in schema:
         mentioned_tables = [default_table]
@@ -106,22 +142,127 @@ def get_gemini_response(prompt, default_table=None):
             refs = referenced_by.get(table, [])
             if refs:
                 ref_by_lines.append(f"Table `{table}` is referenced by: {', '.join(refs)}")
+        index_lines = []
+        for table in mentioned_tables:
+            indexes = get_table_indexes(schema, table)
+            if indexes:
+                index_lines.append(
+                    f"Table `{table}` indexes: " + "; ".join(f"{name} ({', '.join(cols)})" for name, cols in indexes.items())
+                )
         translated_prompt += f"\n\nSchema Details:\n{table_details}"
+        if index_lines:
+            translated_prompt += "\n\nIndexes (prefer sargable filters on these columns, no functions around them):\n" + "\n".join(index_lines)
         if relationship_details:
             translated_prompt += "\n\nTable Relationships:\n" + "\n".join(relationship_details)
         if ref_by_lines:
             translated_prompt += "\n\nReferenced by (child tables that must be considered for DELETE/UPDATE on the above):\n" + "\n".join(ref_by_lines)
-    try:
+    timing.add("prompt_build", time.perf_counter() - started)
+    return translated_prompt
+
+
+def _clean_sql(text):
+    return text.strip().replace("```sql", "").replace("```", "").strip()
+
+
+def _model_for(api_key):
+    """Gemini model bound to api_key (genai.configure is process-wide, so each key gets its own client)."""
+    model = _models.get(api_key)
+    if model is None:
         model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content([SQL_PROMPT, translated_prompt])
-        sql_query = response.text.strip().replace("```sql", "").replace("```", "").strip()
-        return sql_query
+        model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        _models[api_key] = model
+    return model
+
+
+def _used_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    prompt = getattr(usage, "prompt_token_count", 0) or 0
+    completion = getattr(usage, "candidates_token_count", 0) or 0
+    metrics.LLM_TOKENS.observe(prompt, "prompt")
+    metrics.LLM_TOKENS.observe(completion, "completion")
+    return prompt + completion
+
+
+def _generate_text(parts, priority=INTERACTIVE):
+    """Model output for parts, scheduled under the LLM budgets (see llm_scheduler); raises LLMUnavailable when busy."""
+    text = "\n".join(parts) if isinstance(parts, (list, tuple)) else str(parts)
+
+    def call(api_key):
+        with timing.span("llm"):
+            return _model_for(api_key).generate_content(parts)
+    response = scheduler.run(
+        call, tokens=len(text) // 4 + EXPECTED_COMPLETION_TOKENS, priority=priority, usage=_used_tokens,
+    )
+    return response.text
+
+
+def _dialect():
+    """SQL dialect of the configured DB_DRIVER, named in every prompt."""
+    return get_driver().dialect
+
+
+def _sql_prompt(cascade):
+    prompt = SQL_PROMPT.format(dialect=_dialect())
+    return prompt if cascade else prompt + CHILD_DELETE_RULE
+
+
+def get_gemini_response(prompt, default_table=None, refresh_schema=True, cascade=False):
+    """SQL for prompt; with cascade the model leaves child-row deletes to cascade_planner."""
+    if not _ensure_genai_configured():
+        return "AI Error: Missing API key. Add it in login."
+    if refresh_schema:
+        store_all_table_structures(force_update=True)
+    schema = load_schema()
+    translated_prompt = _build_sql_prompt(prompt, schema, default_table)
+    try:
+        return _clean_sql(_generate_text([_sql_prompt(cascade), translated_prompt]))
+    except LLMUnavailable:
+        raise
     except Exception as e:
         return _format_ai_error(e)
 
 
-FIX_SQL_PROMPT = """You are an expert MySQL administrator. The following MySQL query failed with an error.
-Your task: output a corrected MySQL query that fixes the error. Use only valid table and column names from the schema provided.
+CANDIDATE_SEPARATOR = "-- candidate"
+
+CANDIDATES_PROMPT = """
+Return {count} different, equivalent {dialect} queries for the request, each a complete alternative
+(for example using a JOIN instead of a subquery, or filtering directly on indexed key columns).
+Separate the alternatives with a line containing only: {separator}
+Output only SQL, no explanation or markdown.
+"""
+
+
+def generate_sql_candidates(prompt, default_table=None, count=3, refresh_schema=True, cascade=False):
+    """
+    Ask the model for `count` alternative SQL queries in one call.
+    Returns a list of SQL strings, or a single-item list with an "AI Error" message.
+    Raises LLMUnavailable when Gemini stays rate limited or unreachable.
+    """
+    if not _ensure_genai_configured():
+        return ["AI Error: Missing API key. Add it in login."]
+    if refresh_schema:
+        store_all_table_structures(force_update=True)
+    schema = load_schema()
+    translated_prompt = _build_sql_prompt(prompt, schema, default_table)
+    instructions = CANDIDATES_PROMPT.format(count=count, separator=CANDIDATE_SEPARATOR, dialect=_dialect())
+    try:
+        text = _generate_text([_sql_prompt(cascade), instructions, translated_prompt])
+    except LLMUnavailable:
+        raise
+    except Exception as e:
+        return [_format_ai_error(e)]
+    candidates = []
+    for part in _clean_sql(text).split(CANDIDATE_SEPARATOR):
+        sql = part.strip()
+        if sql and sql not in candidates:
+            candidates.append(sql)
+    return candidates[:count]
+
+
+FIX_SQL_PROMPT = """You are an expert {dialect} administrator. The following {dialect} query failed with an error.
+Your task: output a corrected {dialect} query that fixes the error. Use only valid table and column names from the schema provided.
 Rules:
 1. Output only the SQL query, no explanation or markdown.
 2. Add LIMIT 100 to SELECT queries unless specified otherwise.
@@ -129,11 +270,12 @@ Rules:
 """
 
 
-def fix_sql_query(failed_sql, error_message, original_prompt=None, default_table=None):
+def fix_sql_query(failed_sql, error_message, original_prompt=None, default_table=None, refresh_schema=True):
     """Given a failed SQL and error message, returns a corrected SQL query."""
     if not _ensure_genai_configured():
         return "AI Error: Missing API key. Add it in login."
-    store_all_table_structures(force_update=True)
+    if refresh_schema:
+        store_all_table_structures(force_update=True)
     schema = load_schema()
     prompt = f"""Error from database: {error_message}
 
@@ -158,27 +300,121 @@ Failed query:
         if relationship_details:
             prompt += "\n\nRelationships:\n" + "\n".join(relationship_details)
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content([FIX_SQL_PROMPT, prompt])
-        sql_query = response.text.strip().replace("```sql", "").replace("```", "").strip()
-        return sql_query
+        return _clean_sql(_generate_text([FIX_SQL_PROMPT.format(dialect=_dialect()), prompt]))
+    except LLMUnavailable:
+        raise
     except Exception as e:
         return _format_ai_error(e)
 
 
-def get_sql_explanation(sql_query, target_language="en"):
-    """Generate a brief explanation of the SQL query in the given language."""
+def _cached_explanation(key, language):
+    with _explanations_lock:
+        text = _explanations.get((key, language))
+        if text is not None:
+            _explanations.move_to_end((key, language))
+        return text
+
+
+def _remember_explanation(key, language, text):
+    with _explanations_lock:
+        _explanations[(key, language)] = text
+        _explanations.move_to_end((key, language))
+        while len(_explanations) > EXPLANATION_CACHE_SIZE:
+            _explanations.popitem(last=False)
+
+
+def _language_name(code):
+    return f"{LANGUAGE_NAMES.get(code, code)} ({code})"
+
+
+def _generate_explanations(sql_query, languages):
+    """{language: explanation} from one model call; languages the model left out are missing."""
+    if len(languages) == 1:
+        return {languages[0]: _generate_text(
+            f"Provide a brief explanation of this SQL query in 2-3 sentences, written in "
+            f"{_language_name(languages[0])}:\n{sql_query}",
+            priority=BACKGROUND,
+        ).strip()}
+    text = _generate_text(
+        "Provide a brief explanation of this SQL query in 2-3 sentences in each of these languages: "
+        + ", ".join(_language_name(code) for code in languages)
+        + ". Respond with only a JSON object mapping each language code to its explanation.\n"
+        + sql_query,
+        priority=BACKGROUND,
+    )
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        logging.warning("Batch explanation was not valid JSON")
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {code: parsed[code].strip() for code in languages if isinstance(parsed.get(code), str) and parsed[code].strip()}
+
+
+def get_sql_explanations(sql_query, languages=None, required=None):
+    """
+    Explanations of the SQL query as {language: text} for each requested language (default
+    EXPLANATION_LANGUAGES). Cached per (normalized SQL, language). Simple statements are explained
+    locally (translated when needed); the rest are generated together in one model call.
+    Languages not in required (default: all) are best-effort: if the batched answer misses them
+    they are left out rather than fetched one call each.
+    """
+    languages = list(dict.fromkeys(languages or EXPLANATION_LANGUAGES))
+    required = languages if required is None else [code for code in languages if code in required]
+    key = canonical_sql(sql_query)
+    result = {}
+    for code in languages:
+        text = _cached_explanation(key, code)
+        if text is not None:
+            EXPLANATIONS.inc(1, "cache")
+            result[code] = text
+    missing = [code for code in languages if code not in result]
+    local = explain_sql(sql_query) if missing and EXPLANATION_LOCAL else None
+    if local is not None:
+        for code in missing:
+            try:
+                result[code] = translation.translate(local, code, source="en")
+            except Exception as e:
+                logging.warning("Could not translate local explanation to %s: %s", code, e)
+                continue
+            EXPLANATIONS.inc(1, "local")
+            _remember_explanation(key, code, result[code])
+        missing = [code for code in languages if code not in result]
+    if not missing:
+        return result
     if not _ensure_genai_configured():
-        return "Error generating explanation: Missing API key. Add it in login."
+        return dict(result, **{code: "Error generating explanation: Missing API key. Add it in login." for code in missing})
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash")
-        response = model.generate_content(
-            f"Provide a brief explanation of this SQL query in 2-3 sentences:\n{sql_query}"
-        )
-        explanation = response.text.strip()
-        if target_language != "en":
-            translator = GoogleTranslator(source="auto", target=target_language)
-            explanation = translator.translate(explanation)
-        return explanation
+        generated = _generate_explanations(sql_query, missing)
+        for code in missing:
+            if code not in generated and code in required:
+                generated.update(_generate_explanations(sql_query, [code]))
+    except LLMUnavailable:
+        EXPLANATIONS.inc(1, "error")
+        raise
     except Exception as e:
-        return _format_ai_error(e)
+        EXPLANATIONS.inc(1, "error")
+        return dict(result, **{code: _format_ai_error(e) for code in missing})
+    for code in missing:
+        if code not in generated:
+            continue
+        EXPLANATIONS.inc(1, "generated")
+        _remember_explanation(key, code, generated[code])
+        result[code] = generated[code]
+    return result
+
+
+def get_sql_explanation(sql_query, target_language="en"):
+    """
+    Brief explanation of the SQL query, written directly in the given language. With
+    EXPLANATION_BATCH, a model-explained miss fills the cache for every configured language at once.
+    """
+    batch = EXPLANATION_BATCH and target_language in EXPLANATION_LANGUAGES
+    if (batch and _cached_explanation(canonical_sql(sql_query), target_language) is None
+            and not (EXPLANATION_LOCAL and explain_sql(sql_query))):
+        return get_sql_explanations(
+            sql_query, [target_language] + EXPLANATION_LANGUAGES, required=[target_language]
+        )[target_language]
+    return get_sql_explanations(sql_query, [target_language])[target_language]
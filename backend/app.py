@@ -2,34 +2,86 @@
 Flask backend for Query Wizard.
 Run from project root: python backend/app.py
 """
+import hmac
 import os
 import sys
 from functools import wraps
 from pathlib import Path
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory
 from flask_cors import CORS
 
 try:
-    from .db_config import update_env_credentials, clear_credentials
-    from .schema_handler import load_schema, store_all_table_structures, delete_schema_file
+    from .db_config import update_env_credentials, clear_credentials, DRIVER_CONFIG
+    from .schema_handler import load_schema, store_all_table_structures, schema_version, schema_file
+    from .table_search import index_for
     from .db_handler import execute_query_api
-    from .ai_generator import get_gemini_response, fix_sql_query, get_sql_explanation, has_api_key
+    from .chunked_dml import DEFAULT_CHUNK_SIZE
+    from .cascade_planner import plan_cascade_for_query
+    from .pipeline import generate_and_execute
+    from .sql_validator import validation_report
+    from .sql_lexer import canonical_sql
+    from .candidate_selector import generate_best_sql
+    from .sql_rewriter import rewrite_sql, REWRITE_ENABLED
+    from .index_advisor import advise_indexes
+    from .ai_generator import get_gemini_response, fix_sql_query, get_sql_explanation, get_sql_explanations, has_api_key
     from .secret_store import set_google_api_key
+    from .llm_scheduler import LLMUnavailable, scheduler as llm_scheduler
+    from . import workload
+    from . import metrics, timing, profiler, session_context, singleflight
+    from .replica_router import router as replica_router, current_session
 except ImportError:
-    from db_config import update_env_credentials, clear_credentials
-    from schema_handler import load_schema, store_all_table_structures, delete_schema_file
+    from db_config import update_env_credentials, clear_credentials, DRIVER_CONFIG
+    from schema_handler import load_schema, store_all_table_structures, schema_version, schema_file
+    from table_search import index_for
     from db_handler import execute_query_api
-    from ai_generator import get_gemini_response, fix_sql_query, get_sql_explanation, has_api_key
+    from chunked_dml import DEFAULT_CHUNK_SIZE
+    from cascade_planner import plan_cascade_for_query
+    from pipeline import generate_and_execute
+    from sql_validator import validation_report
+    from sql_lexer import canonical_sql
+    from candidate_selector import generate_best_sql
+    from sql_rewriter import rewrite_sql, REWRITE_ENABLED
+    from index_advisor import advise_indexes
+    from ai_generator import get_gemini_response, fix_sql_query, get_sql_explanation, get_sql_explanations, has_api_key
     from secret_store import set_google_api_key
+    from llm_scheduler import LLMUnavailable, scheduler as llm_scheduler
+    import workload
+    import metrics
+    import timing
+    import profiler
+    import session_context
+    import singleflight
+    from replica_router import router as replica_router, current_session
+
+SESSION_COOKIE = "qw_session"
+# Also write login credentials to .env (the single-user desktop behaviour); off for shared servers.
+PERSIST_DB_CREDENTIALS = os.getenv("PERSIST_DB_CREDENTIALS", "1" if getattr(sys, "frozen", False) else "0") == "1"
+# Identical concurrent LLM requests share one upstream call (keys include the target database).
+_generate_flights = singleflight.Group("generate_sql")
+_fix_flights = singleflight.Group("fix_sql")
+_explanation_flights = singleflight.Group("explanation")
+MAX_EXPLANATION_LANGUAGES = 16
+QUERY_STATS_ORDER = ("total_ms", "calls", "errors", "avg_ms", "p95_ms", "p99_ms", "max_ms", "rows", "rows_examined", "bytes")
 
 
 def has_db_credentials():
+    if session_context.current() is not None:
+        return True
+    # Shared servers require a login session; the .env database is only the single-user default
+    if not PERSIST_DB_CREDENTIALS:
+        return False
+    if DRIVER_CONFIG["driver"] != "mysql":
+        return bool(DRIVER_CONFIG["path"])
     p = (os.getenv("DB_PASSWORD") or "").strip()
     n = (os.getenv("DB_NAME") or "").strip()
     return bool(p and n)
 
 
+def _prompt_key(text):
+    return " ".join((text or "").split())
+
+
 def has_google_api_key():
     return has_api_key()
 
@@ -46,16 +98,47 @@ def error(message, status=400):
     return jsonify({"detail": message}), status
 
 
+def llm_unavailable(exc):
+    """503 with Retry-After when Gemini is rate limited or down after retries."""
+    response, status = error(str(exc), 503)
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return response, status
+
+
 def require_auth(fn):
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        if not has_db_credentials():
+        with timing.span("auth"):
+            authenticated = has_db_credentials()
+        if not authenticated:
             return error("Not authenticated", 401)
         return fn(*args, **kwargs)
 
     return wrapper
 
 
+def require_admin(fn):
+    """Admin endpoints additionally need the X-Admin-Token header to match ADMIN_TOKEN (disabled if unset)."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        expected = os.getenv("ADMIN_TOKEN", "")
+        if not expected:
+            return error("Admin endpoints are disabled (set ADMIN_TOKEN)", 403)
+        if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), expected):
+            return error("Invalid admin token", 403)
+        return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def cached_schema_response(response, version):
+    """Mark a schema response as revalidate-every-time, keyed on the schema version."""
+    if version:
+        response.set_etag(version)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
 def _default_static_dir():
     env_dir = os.getenv("APP_STATIC_DIR", "").strip()
     if env_dir:
@@ -77,12 +160,72 @@ def create_app():
         resources={
             r"/api/*": {
                 "origins": ["http://localhost:5173", "http://127.0.0.1:5173"],
-                "allow_headers": ["Content-Type", "Authorization"],
+                "allow_headers": ["Content-Type", "Authorization", "X-Admin-Token"],
                 "methods": ["GET", "POST", "OPTIONS"],
+                "expose_headers": ["Server-Timing"],
             }
         },
     )
 
+    @app.before_request
+    def bind_client_session():
+        if not request.path.startswith("/api/"):
+            return
+        sid = request.cookies.get(SESSION_COOKIE, "")
+        g.new_session = not session_context.valid_sid(sid)
+        if g.new_session:
+            sid = session_context.new_sid()
+        g.session_token = current_session.set(sid)
+        g.context_token = session_context.bind(sid)
+
+    @app.after_request
+    def issue_client_session(response):
+        if g.get("new_session"):
+            response.set_cookie(SESSION_COOKIE, current_session.get(), httponly=True, samesite="Lax")
+        return response
+
+    @app.teardown_request
+    def unbind_client_session(exc):
+        context_token = g.pop("context_token", None)
+        if context_token is not None:
+            session_context.unbind(context_token)
+        token = g.pop("session_token", None)
+        if token is not None:
+            current_session.reset(token)
+
+    @app.before_request
+    def begin_request_trace():
+        if request.path.startswith("/api/"):
+            timing.start_trace()
+            profiler.request_started()
+
+    @app.after_request
+    def finish_request_trace(response):
+        trace = timing.current_trace()
+        if trace is None:
+            return response
+        if request.args.get("timings") == "1" and response.is_json:
+            body = response.get_json(silent=True)
+            if isinstance(body, dict) and "timings" not in body:
+                body["timings"] = trace.as_dict()
+                response.set_data(jsonify(body).get_data())
+        if response.content_length is not None:
+            metrics.RESPONSE_BYTES.observe(response.content_length, request.endpoint or "unknown")
+        response.headers["Server-Timing"] = trace.server_timing()
+        timing.log_if_slow(trace, request.method, request.path, response.status_code)
+        return response
+
+    @app.teardown_request
+    def end_request_trace(exc):
+        timing.end_trace()
+        profiler.request_finished()
+
+    @app.route("/metrics", methods=["GET"])
+    def prometheus_metrics():
+        if not metrics.METRICS_ENABLED:
+            return error("Metrics are disabled", 404)
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
     @app.route("/api/login", methods=["POST"])
     def login():
         data = json_body()
@@ -94,10 +237,19 @@ def create_app():
         if not google_api_key and not has_google_api_key():
             return error("Google API key required")
         try:
-            update_env_credentials(db_name, db_password)
+            if PERSIST_DB_CREDENTIALS:
+                update_env_credentials(db_name, db_password)
             if google_api_key and not set_google_api_key(google_api_key):
                 return error("Could not securely store API key on this machine")
-            delete_schema_file()
+            # A new session id on every login, so an id planted before login is never authenticated
+            previous = current_session.get()
+            sid = session_context.new_sid()
+            session_context.login(sid, db_name, db_password)
+            session_context.logout(previous)
+            current_session.set(sid)
+            g.new_session = True
+            session_context.unbind(g.pop("context_token"))
+            g.context_token = session_context.bind(sid)
             return jsonify({"success": True})
         except Exception as e:
             return error(str(e), 500)
@@ -115,8 +267,10 @@ def create_app():
     @app.route("/api/logout", methods=["POST"])
     def logout():
         try:
-            clear_credentials()
-            delete_schema_file()
+            # The global .env credentials are only ours to clear when /api/login wrote them
+            if PERSIST_DB_CREDENTIALS and has_db_credentials():
+                clear_credentials()
+            session_context.logout(current_session.get())
             return jsonify({"success": True})
         except Exception as e:
             return error(str(e), 500)
@@ -124,12 +278,45 @@ def create_app():
     @app.route("/api/schema", methods=["GET"])
     @require_auth
     def get_schema():
+        """
+        Full schema by default; ?mode=tables returns just the table list, ?table=<name> one
+        table's columns. Responses carry an ETag of the schema version (If-None-Match -> 304).
+        """
         try:
             schema = load_schema()
             if not schema:
                 store_all_table_structures(force_update=True)
                 schema = load_schema()
-            return jsonify({"schema": schema, "tables": list(schema.keys())})
+            version = schema_version()
+            if version and version in request.if_none_match:
+                return cached_schema_response(Response(status=304), version)
+            table = request.args.get("table")
+            if table is not None:
+                if table not in schema:
+                    return error(f"Unknown table: {table}", 404)
+                body = {"table": table, "columns": schema[table]}
+            elif request.args.get("mode") == "tables":
+                comments = schema.comments() if hasattr(schema, "comments") else {}
+                body = {"tables": list(schema.keys()), "comments": {t: c for t, c in comments.items() if c}}
+            else:
+                body = {"schema": dict(schema.items()), "tables": list(schema.keys())}
+            body["version"] = version
+            return cached_schema_response(jsonify(body), version)
+        except Exception as e:
+            return error(str(e), 500)
+
+    @app.route("/api/schema/search", methods=["GET"])
+    @require_auth
+    def search_schema():
+        query = request.args.get("q", "")
+        try:
+            limit = min(200, max(1, int(request.args.get("limit", 20))))
+        except ValueError:
+            return error("limit must be an integer")
+        try:
+            schema = load_schema()
+            index = index_for(schema_version(), list(schema.keys()))
+            return jsonify({"query": query, "results": index.search(query, limit=limit)})
         except Exception as e:
             return error(str(e), 500)
 
@@ -141,8 +328,66 @@ def create_app():
         if not prompt:
             return error("Prompt required")
         try:
-            sql = get_gemini_response(prompt, default_table=data.get("default_table"))
-            return jsonify({"sql": sql})
+            count = int(data.get("candidates") or 1)
+        except (TypeError, ValueError):
+            return error("candidates must be an integer")
+        try:
+            cascade = bool(data.get("cascade"))
+            key = (schema_file(), _prompt_key(prompt), data.get("default_table"), count, cascade)
+            if count > 1:
+                response = _generate_flights.do(
+                    key, generate_best_sql, prompt, default_table=data.get("default_table"), count=count, cascade=cascade,
+                )
+                sql = response["sql"]
+            else:
+                sql = _generate_flights.do(
+                    key, get_gemini_response, prompt, default_table=data.get("default_table"), cascade=cascade,
+                )
+                response = {"sql": sql}
+            if not sql.startswith("AI Error"):
+                schema = load_schema()
+                if data.get("rewrite", REWRITE_ENABLED):
+                    sql, response["rewrites"] = rewrite_sql(sql, schema, columns=data.get("columns"))
+                    response["sql"] = sql
+                response["validation"] = validation_report(sql, schema)
+            return jsonify(response)
+        except LLMUnavailable as e:
+            return llm_unavailable(e)
+        except Exception as e:
+            return error(str(e), 500)
+
+    @app.route("/api/validate-sql", methods=["POST"])
+    @require_auth
+    def validate_sql_route():
+        data = json_body()
+        sql = (data.get("sql") or "").strip()
+        if not sql:
+            return error("SQL required")
+        try:
+            return jsonify(validation_report(sql, load_schema()))
+        except Exception as e:
+            return error(str(e), 500)
+
+    @app.route("/api/generate-and-execute", methods=["POST"])
+    @require_auth
+    def generate_and_execute_sql():
+        data = json_body()
+        prompt = (data.get("prompt") or "").strip()
+        if not prompt:
+            return error("Prompt required")
+        try:
+            max_attempts = int(data["max_attempts"]) if data.get("max_attempts") is not None else None
+        except (TypeError, ValueError):
+            return error("max_attempts must be an integer")
+        try:
+            result = generate_and_execute(
+                prompt,
+                default_table=data.get("default_table"),
+                max_attempts=max_attempts,
+            )
+            return jsonify(result)
+        except LLMUnavailable as e:
+            return llm_unavailable(e)
         except Exception as e:
             return error(str(e), 500)
 
@@ -153,23 +398,60 @@ def create_app():
         sql = (data.get("sql") or "").strip()
         if not sql:
             return error("SQL required")
-        success, err, results = execute_query_api(sql)
+        chunk_size = pause_ms = None
+        if data.get("chunked"):
+            try:
+                chunk_size = int(data.get("chunk_size") or DEFAULT_CHUNK_SIZE)
+                pause_ms = int(data["pause_ms"]) if data.get("pause_ms") is not None else None
+            except (TypeError, ValueError):
+                return error("chunk_size and pause_ms must be integers")
+            if chunk_size < 1:
+                return error("chunk_size must be positive")
+        success, err, results = execute_query_api(
+            sql, chunk_size=chunk_size, pause_ms=pause_ms, cascade=bool(data.get("cascade"))
+        )
         if not success:
             return jsonify({"success": False, "error": err, "results": None})
-        return jsonify({"success": True, "error": None, "results": results})
+        with timing.span("serialize"):
+            response = jsonify({"success": True, "error": None, "results": results})
+        workload.record_serialized(sql, response.content_length or 0)
+        return response
+
+    @app.route("/api/cascade-plan", methods=["POST"])
+    @require_auth
+    def cascade_plan():
+        data = json_body()
+        sql = (data.get("sql") or "").strip()
+        if not sql:
+            return error("SQL required")
+        try:
+            plan = plan_cascade_for_query(sql)
+        except ValueError as e:
+            return error(str(e))
+        if plan is None:
+            return error("Only single-table DELETE statements with a WHERE clause can cascade")
+        return jsonify({"statements": [step["sql"] for step in plan]})
 
     @app.route("/api/fix-sql", methods=["POST"])
     @require_auth
     def fix_sql():
         data = json_body()
+        key = (
+            schema_file(), canonical_sql(data.get("failed_sql", "")), _prompt_key(data.get("error_message")),
+            _prompt_key(data.get("original_prompt")), data.get("default_table"),
+        )
         try:
-            sql = fix_sql_query(
+            sql = _fix_flights.do(
+                key,
+                fix_sql_query,
                 data.get("failed_sql", ""),
                 data.get("error_message", ""),
                 original_prompt=data.get("original_prompt"),
                 default_table=data.get("default_table"),
             )
             return jsonify({"sql": sql})
+        except LLMUnavailable as e:
+            return llm_unavailable(e)
         except Exception as e:
             return error(str(e), 500)
 
@@ -177,15 +459,119 @@ def create_app():
     @require_auth
     def explanation():
         data = json_body()
+        languages = data.get("languages")
+        if languages is not None and not (isinstance(languages, list) and all(isinstance(l, str) for l in languages)):
+            return error("languages must be a list of language codes", 400)
+        if languages is not None and len(set(languages)) > MAX_EXPLANATION_LANGUAGES:
+            return error(f"At most {MAX_EXPLANATION_LANGUAGES} languages per request", 400)
         try:
-            text = get_sql_explanation(
+            sql = canonical_sql(data.get("sql", ""))
+            if languages is not None:
+                explanations = _explanation_flights.do(
+                    (sql, tuple(languages)), get_sql_explanations, data.get("sql", ""), languages
+                )
+                return jsonify({"explanations": explanations})
+            text = _explanation_flights.do(
+                (sql, data.get("language", "en")),
+                get_sql_explanation,
                 data.get("sql", ""),
                 target_language=data.get("language", "en"),
             )
             return jsonify({"explanation": text})
+        except LLMUnavailable as e:
+            return llm_unavailable(e)
+        except Exception as e:
+            return error(str(e), 500)
+
+    @app.route("/api/advisor/indexes", methods=["GET"])
+    @require_auth
+    def index_advice():
+        try:
+            limit = int(request.args.get("limit", "5"))
+        except ValueError:
+            return error("limit must be an integer")
+        try:
+            return jsonify({"suggestions": advise_indexes(limit=max(1, limit))})
+        except Exception as e:
+            return error(str(e), 500)
+
+    @app.route("/api/admin/indexes/evaluate", methods=["POST"])
+    @require_auth
+    @require_admin
+    def index_advice_evaluate():
+        """Measures each suggestion with a temporary invisible index, so it changes the live schema."""
+        data = json_body()
+        try:
+            limit = int(data.get("limit", 5))
+        except (TypeError, ValueError):
+            return error("limit must be an integer")
+        try:
+            return jsonify({"suggestions": advise_indexes(limit=max(1, limit), evaluate=True)})
         except Exception as e:
             return error(str(e), 500)
 
+    @app.route("/api/stats/queries", methods=["GET"])
+    @require_auth
+    @require_admin
+    def query_stats():
+        try:
+            limit = int(request.args.get("limit", "20"))
+        except ValueError:
+            return error("limit must be an integer")
+        order_by = request.args.get("order_by", "total_ms")
+        if order_by not in QUERY_STATS_ORDER:
+            return error(f"order_by must be one of: {', '.join(QUERY_STATS_ORDER)}")
+        return jsonify({"statements": workload.top_statements(limit=max(1, limit), order_by=order_by)})
+
+    @app.route("/api/admin/replicas", methods=["GET"])
+    @require_auth
+    @require_admin
+    def replica_status():
+        return jsonify({"replicas": replica_router.status()})
+
+    @app.route("/api/admin/llm", methods=["GET"])
+    @require_auth
+    @require_admin
+    def llm_status():
+        return jsonify({"llm": llm_scheduler.status()})
+
+    @app.route("/api/admin/profiler", methods=["GET"])
+    @require_auth
+    @require_admin
+    def profiler_status():
+        return jsonify(profiler.status())
+
+    @app.route("/api/admin/profiler/start", methods=["POST"])
+    @require_auth
+    @require_admin
+    def profiler_start():
+        data = json_body()
+        try:
+            status = profiler.start(
+                data.get("seconds", 30),
+                interval_ms=data.get("interval_ms", profiler.DEFAULT_INTERVAL_MS),
+                slow_ms=data.get("slow_ms"),
+            )
+        except (TypeError, ValueError) as e:
+            return error(str(e))
+        return jsonify(status)
+
+    @app.route("/api/admin/profiler/stop", methods=["POST"])
+    @require_auth
+    @require_admin
+    def profiler_stop():
+        return jsonify(profiler.stop())
+
+    @app.route("/api/admin/profiler/stacks", methods=["GET"])
+    @require_auth
+    @require_admin
+    def profiler_stacks():
+        return Response(
+            profiler.collapsed(),
+            mimetype="text/plain",
+            headers={"Content-Disposition": "attachment; filename=querywizard.collapsed"},
+        )
+
     @app.route("/", defaults={"path": ""})
     @app.route("/<path:path>")
     def serve_spa(path):
@@ -0,0 +1,50 @@
+"""
+Multi-candidate SQL generation: ask the model for several equivalent queries, drop the
+ones that fail local validation, and pick the cheapest by EXPLAIN's estimated rows examined.
+"""
+import os
+try:
+    from .schema_handler import load_schema, store_all_table_structures
+    from .ai_generator import generate_sql_candidates
+    from .sql_validator import validate_sql, format_validation_errors
+    from .db_handler import explain_queries
+except ImportError:
+    from schema_handler import load_schema, store_all_table_structures
+    from ai_generator import generate_sql_candidates
+    from sql_validator import validate_sql, format_validation_errors
+    from db_handler import explain_queries
+
+MAX_SQL_CANDIDATES = int(os.getenv("MAX_SQL_CANDIDATES", "5"))
+
+
+def generate_best_sql(prompt, default_table=None, count=3, cascade=False):
+    """
+    Returns {"sql", "candidates"}: sql is the valid candidate with the lowest estimated
+    rows examined; candidates lists every alternative with its "rows_examined" and "error".
+    If no candidate survives, sql is the first one so the caller can still show or fix it.
+    """
+    count = max(2, min(int(count), MAX_SQL_CANDIDATES))
+    store_all_table_structures(force_update=True)
+    schema = load_schema()
+    sqls = generate_sql_candidates(
+        prompt, default_table=default_table, count=count, refresh_schema=False, cascade=cascade,
+    )
+    if len(sqls) == 1 and sqls[0].startswith("AI Error"):
+        return {"sql": sqls[0], "candidates": []}
+
+    candidates = [{"sql": sql, "rows_examined": None, "error": None} for sql in sqls]
+    valid = []
+    for candidate in candidates:
+        errors = validate_sql(candidate["sql"], schema)
+        if errors:
+            candidate["error"] = format_validation_errors(errors)
+        else:
+            valid.append(candidate)
+
+    for candidate, (rows, err) in zip(valid, explain_queries([c["sql"] for c in valid])):
+        candidate["rows_examined"] = rows
+        candidate["error"] = err
+
+    ranked = sorted((c for c in valid if c["rows_examined"] is not None), key=lambda c: c["rows_examined"])
+    best = ranked[0] if ranked else candidates[0]
+    return {"sql": best["sql"], "candidates": candidates}
@@ -0,0 +1,138 @@
+"""
+Plans child-first DELETE cascades from the foreign keys in the cached schema,
+so deleting a referenced row doesn't depend on the model getting statement order right.
+"""
+import logging
+try:
+    from .schema_handler import load_schema, foreign_key_edges
+    from .chunked_dml import DEFAULT_CHUNK_SIZE, parse_single_table_dml
+except ImportError:
+    from schema_handler import load_schema, foreign_key_edges
+    from chunked_dml import DEFAULT_CHUNK_SIZE, parse_single_table_dml
+
+logging.basicConfig(level=logging.INFO)
+
+
+def _parse_foreign_key(fk):
+    """'parent(col)' -> ('parent', 'col')."""
+    if "(" not in fk:
+        return fk.strip("` "), None
+    table, col = fk.split("(", 1)
+    return table.strip("` "), col.rstrip(")").strip("` ")
+
+
+def build_fk_graph(schema):
+    """
+    Map: parent table -> list of (child_table, child_columns, parent_columns), one entry per
+    foreign key constraint (a composite key lists its columns in matching order).
+    """
+    constraints = {}
+    for table, col, fk, name in foreign_key_edges(schema, names=True):
+        parent, parent_col = _parse_foreign_key(fk)
+        key = (table, parent, name) if name else (table, parent, col)
+        child_cols, parent_cols = constraints.setdefault(key, ([], []))
+        child_cols.append(col)
+        parent_cols.append(parent_col or col)
+    graph = {}
+    for (table, parent, _), (child_cols, parent_cols) in constraints.items():
+        graph.setdefault(parent, []).append((table, tuple(child_cols), tuple(parent_cols)))
+    return graph
+
+
+def _columns_sql(columns):
+    names = ", ".join(f"`{col}`" for col in columns)
+    return names if len(columns) == 1 else f"({names})"
+
+
+def _descendants_in_topological_order(graph, root):
+    """Tables reachable from root, parents before children. Raises ValueError on a cycle."""
+    reachable = {root}
+    stack = [root]
+    while stack:
+        for child, _, _ in graph.get(stack.pop(), []):
+            if child not in reachable:
+                reachable.add(child)
+                stack.append(child)
+
+    indegree = {table: 0 for table in reachable}
+    for parent in reachable:
+        for child, _, _ in graph.get(parent, []):
+            indegree[child] += 1
+
+    order = []
+    ready = [root] if indegree[root] == 0 else []
+    while ready:
+        table = ready.pop()
+        order.append(table)
+        for child, _, _ in graph.get(table, []):
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+
+    if len(order) != len(reachable):
+        cyclic = sorted(t for t, n in indegree.items() if n > 0)
+        raise ValueError(f"Foreign key cycle involving: {', '.join(cyclic)}")
+    return order
+
+
+def plan_cascade_delete(table, where, schema=None):
+    """
+    Build the child-first DELETE sequence for rows of `table` matching `where`.
+    Returns a list of {"table", "where", "sql"} dicts; the parent delete is last.
+    """
+    schema = load_schema() if schema is None else schema
+    if table not in schema:
+        raise ValueError(f"Table `{table}` not found in schema.")
+    if not (where or "").strip():
+        raise ValueError("A WHERE predicate is required for a cascading delete.")
+
+    graph = build_fk_graph(schema)
+    order = _descendants_in_topological_order(graph, table)
+    selectors = {table: where.strip()}
+    for parent in order:
+        for child, cols, parent_cols in graph.get(parent, []):
+            select_list = ", ".join(f"`{col}`" for col in parent_cols)
+            condition = f"{_columns_sql(cols)} IN (SELECT {select_list} FROM `{parent}` WHERE {selectors[parent]})"
+            if child in selectors and child != table:
+                selectors[child] = f"{selectors[child]} OR {condition}"
+            else:
+                selectors[child] = condition
+
+    return [
+        {"table": t, "where": selectors[t], "sql": f"DELETE FROM `{t}` WHERE {selectors[t]}"}
+        for t in reversed(order)
+    ]
+
+
+def plan_cascade_for_query(query, schema=None):
+    """Cascade plan for a single-table 'DELETE FROM t WHERE ...' statement, or None if not applicable."""
+    parsed = parse_single_table_dml(query)
+    if not parsed or parsed["kind"] != "delete" or parsed["alias"] or not parsed["where"]:
+        return None
+    return plan_cascade_delete(parsed["table"], parsed["where"], schema=schema)
+
+
+def run_cascade_delete(conn, cursor, plan, chunk_size=None):
+    """
+    Run a cascade plan in one transaction, deleting each table in LIMIT-sized batches.
+    Rolls back everything if any statement fails. Returns a summary dict.
+    """
+    chunk_size = max(1, int(chunk_size or DEFAULT_CHUNK_SIZE))
+    summary = {"table": plan[-1]["table"], "steps": [], "affected_rows": 0}
+    try:
+        for step in plan:
+            affected = 0
+            while True:
+                cursor.execute(f"{step['sql']} LIMIT {chunk_size}")
+                deleted = max(cursor.rowcount, 0)
+                affected += deleted
+                if deleted < chunk_size:
+                    break
+            logging.info("Cascade delete: %d rows from %s", affected, step["table"])
+            summary["steps"].append({"table": step["table"], "affected_rows": affected})
+            summary["affected_rows"] += affected
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return summary
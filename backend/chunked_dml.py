@@ -0,0 +1,150 @@
+"""
+Opt-in chunked execution of large single-table UPDATE/DELETE statements.
+Matching rows are walked in primary key order (keyset batches) with a commit and short
+pause between batches, so maintenance edits don't hold row locks across the whole table.
+"""
+import os
+import time
+import logging
+try:
+    from .schema_handler import load_schema
+    from .sql_lexer import tokenize, is_keyword, is_identifier, top_level_keyword_index
+except ImportError:
+    from schema_handler import load_schema
+    from sql_lexer import tokenize, is_keyword, is_identifier, top_level_keyword_index
+
+DEFAULT_CHUNK_SIZE = int(os.getenv("DML_CHUNK_SIZE", "1000"))
+DEFAULT_PAUSE_MS = int(os.getenv("DML_CHUNK_PAUSE_MS", "50"))
+
+_INTEGER_TYPES = ("tinyint", "smallint", "mediumint", "int", "integer", "bigint")
+_UNSUPPORTED_CLAUSES = ("JOIN", "ORDER", "LIMIT", "USING")
+
+logging.basicConfig(level=logging.INFO)
+
+
+def _integer_primary_key(columns):
+    """Return the single integer primary key column of a table, or None."""
+    keys = [name for name, data in columns.items() if data.get("primary_key")]
+    if len(keys) != 1:
+        return None
+    col_type = (columns[keys[0]].get("type") or "").lower()
+    if not col_type.startswith(_INTEGER_TYPES):
+        return None
+    return keys[0]
+
+
+def parse_single_table_dml(query):
+    """
+    Split a single-table UPDATE/DELETE into {"kind", "table", "alias", "head", "where"}.
+    head is the statement up to its WHERE clause; where is the bare predicate (or None).
+    Returns None for other statements, multi-table forms, or ORDER BY/LIMIT variants.
+    """
+    tokens = tokenize(query)
+    if len(tokens) < 2:
+        return None
+    if is_keyword(tokens[0], "DELETE"):
+        kind = "delete"
+        if not is_keyword(tokens[1], "FROM"):
+            return None
+        table_idx = 2
+    elif is_keyword(tokens[0], "UPDATE"):
+        kind = "update"
+        table_idx = 1
+    else:
+        return None
+    if table_idx >= len(tokens) or not is_identifier(tokens[table_idx]):
+        return None
+    if top_level_keyword_index(tokens, *_UNSUPPORTED_CLAUSES) != -1:
+        return None
+    refs_end = top_level_keyword_index(tokens, "SET" if kind == "update" else "WHERE")
+    if any(t.kind == "op" and t.value in (",", ".") for t in tokens[table_idx:refs_end if refs_end != -1 else None]):
+        return None
+
+    alias = None
+    next_idx = table_idx + 1
+    if next_idx < len(tokens) and is_keyword(tokens[next_idx], "AS"):
+        next_idx += 1
+    if next_idx < len(tokens) and is_identifier(tokens[next_idx]) and not is_keyword(tokens[next_idx], "SET", "WHERE"):
+        alias = tokens[next_idx].value
+
+    where_idx = top_level_keyword_index(tokens, "WHERE")
+    head_end = tokens[where_idx].pos if where_idx != -1 else len(query)
+    head = query[:head_end].strip().rstrip(";")
+    where = query[tokens[where_idx].pos + len("WHERE"):].strip().rstrip(";") if where_idx != -1 else None
+    return {"kind": kind, "table": tokens[table_idx].value, "alias": alias, "head": head, "where": where}
+
+
+def plan_chunked_dml(query, schema=None):
+    """
+    Inspect an UPDATE/DELETE and return a plan dict if it can be run in primary key batches:
+    parse_single_table_dml() fields plus "key". Returns None when not eligible
+    (multi-table, ORDER BY/LIMIT, no single integer PK, or the PK itself is updated).
+    """
+    plan = parse_single_table_dml(query)
+    if not plan:
+        return None
+    schema = load_schema() if schema is None else schema
+    if plan["table"] not in schema:
+        return None
+    key = _integer_primary_key(schema[plan["table"]])
+    if not key:
+        return None
+
+    if plan["kind"] == "update":
+        tokens = tokenize(query)
+        set_idx = top_level_keyword_index(tokens, "SET")
+        if set_idx == -1:
+            return None
+        where_idx = top_level_keyword_index(tokens, "WHERE")
+        stop = where_idx if where_idx != -1 else len(tokens)
+        for i in range(set_idx + 1, stop - 1):
+            if is_identifier(tokens[i]) and tokens[i].value.lower() == key.lower() and tokens[i + 1].value == "=":
+                return None
+
+    plan["key"] = key
+    return plan
+
+
+def run_chunked_dml(conn, cursor, plan, chunk_size=None, pause_ms=None, progress=None):
+    """
+    Execute a plan from plan_chunked_dml in batches of up to chunk_size matching rows, each
+    bounded by the last key of the previous batch (WHERE key > last ORDER BY key LIMIT n), so
+    sparse keys cost no empty batches. Commits after every batch and pauses between them.
+    progress(done_chunks, affected_rows) is called after each batch.
+    Returns a summary dict with the number of chunks and total affected rows.
+    """
+    chunk_size = max(1, int(chunk_size or DEFAULT_CHUNK_SIZE))
+    pause = max(0, DEFAULT_PAUSE_MS if pause_ms is None else int(pause_ms)) / 1000.0
+    key = f"`{plan['key']}`"
+    table = f"`{plan['table']}`"
+    source = f"{table} AS `{plan['alias']}`" if plan["alias"] else table
+    qualified_key = f"`{plan['alias']}`.{key}" if plan["alias"] else key
+
+    summary = {"table": plan["table"], "key": plan["key"], "chunks": 0, "affected_rows": 0}
+    last = None
+    while True:
+        conditions = [f"({plan['where']})"] if plan["where"] else []
+        if last is not None:
+            conditions.append(f"{qualified_key} > {last}")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor.execute(
+            f"SELECT MAX({key}) FROM (SELECT {qualified_key} AS {key} FROM {source}{where} "
+            f"ORDER BY {qualified_key} LIMIT {chunk_size}) AS batch"
+        )
+        (upper,) = cursor.fetchone()
+        if upper is None:
+            return summary
+        if pause and summary["chunks"]:
+            time.sleep(pause)
+        conditions.append(f"{qualified_key} <= {int(upper)}")
+        cursor.execute(f"{plan['head']} WHERE {' AND '.join(conditions)}")
+        conn.commit()
+        summary["chunks"] += 1
+        summary["affected_rows"] += max(cursor.rowcount, 0)
+        logging.info(
+            "Chunked %s on %s: chunk %d, %d rows affected so far",
+            plan["kind"], plan["table"], summary["chunks"], summary["affected_rows"],
+        )
+        if progress:
+            progress(summary["chunks"], summary["affected_rows"])
+        last = int(upper)
@@ -31,7 +31,7 @@ def _load_env_files(override=False):
 
 _load_env_files(override=False)
 
-required_vars = ["DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME"]
+required_vars = ["DB_HOST", "DB_USER", "DB_PASSWORD", "DB_NAME"] if os.getenv("DB_DRIVER", "mysql") == "mysql" else ["DB_PATH"]
 for var in required_vars:
     if not os.getenv(var):
         logging.warning(f"Missing environment variable: {var}")
@@ -43,6 +43,27 @@ DB_CONFIG = {
     "database": os.getenv("DB_NAME", ""),
 }
 
+# Which db_driver implementation to use; DB_PATH is the database file for embedded drivers.
+DRIVER_CONFIG = {
+    "driver": os.getenv("DB_DRIVER", "mysql"),
+    "path": os.getenv("DB_PATH", ""),
+}
+
+
+def replica_configs(base=None):
+    """Connection configs for the MySQL read replicas in DB_REPLICAS ("host[:port],..."); credentials from base (default DB_CONFIG)."""
+    configs = []
+    for entry in os.getenv("DB_REPLICAS", "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port = entry.partition(":")
+        config = dict(DB_CONFIG if base is None else base, host=host)
+        if port:
+            config["port"] = int(port)
+        configs.append(config)
+    return configs
+
 
 def _env_path():
     """Path to .env file (project root in dev, user dir in packaged mode)."""
@@ -57,6 +78,8 @@ def refresh_db_config():
     DB_CONFIG["user"] = os.getenv("DB_USER", "root")
     DB_CONFIG["password"] = os.getenv("DB_PASSWORD", "")
     DB_CONFIG["database"] = os.getenv("DB_NAME", "")
+    DRIVER_CONFIG["driver"] = os.getenv("DB_DRIVER", "mysql")
+    DRIVER_CONFIG["path"] = os.getenv("DB_PATH", "")
 
 
 def update_env_credentials(db_name: str, db_password: str) -> None:
@@ -0,0 +1,496 @@
+"""
+Database driver abstraction: connect, execute, stream rows, introspect the schema and
+estimate query cost through one interface.
+DB_DRIVER selects the implementation: "mysql" (default, uses the request's session
+credentials or DB_CONFIG), "sqlite" or
+"duckdb" (embedded, pointed at the DB_PATH file - e.g. an exported snapshot).
+Connections expose the subset of the mysql.connector API the backend uses
+(cursor(dictionary=...), commit, rollback, close; cursors with execute, executemany,
+fetchone/fetchmany/fetchall, description, rowcount, with_rows, nextset).
+"""
+import math
+import re
+import sqlite3
+import mysql.connector
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+try:
+    from . import db_config, session_context
+except ImportError:
+    import db_config
+    import session_context
+
+DB_ERRORS = (mysql.connector.Error, sqlite3.Error) + ((duckdb.Error,) if duckdb is not None else ())
+
+_drivers = {}
+
+
+def estimate_rows_examined(plan_rows):
+    """
+    Nested-loop estimate of rows examined from EXPLAIN output (dict rows):
+    each table's rows are multiplied by the rows that survive the tables joined before it.
+    """
+    total = 0.0
+    fanout = {}
+    for row in plan_rows:
+        select_id = row.get("id")
+        rows = float(row.get("rows") or 0)
+        filtered = float(row.get("filtered") or 100) / 100.0
+        prefix = fanout.get(select_id, 1.0)
+        total += prefix * rows
+        fanout[select_id] = prefix * max(rows * filtered, 1.0)
+    return int(total)
+
+
+def _as_dicts(cursor, rows):
+    if rows and isinstance(rows[0], dict):
+        return rows
+    columns = [d[0] for d in cursor.description] if cursor.description else []
+    return [dict(zip(columns, row)) for row in rows]
+
+
+class Driver:
+    name = ""
+    dialect = ""  # SQL dialect name, as told to the model
+
+    def connect(self):
+        raise NotImplementedError
+
+    def quote(self, identifier):
+        """identifier as a quoted SQL name."""
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def iter_rows(self, cursor, batch_size=1000):
+        """Yield the current result set row by row, fetching batch_size rows at a time."""
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield from batch
+
+    def introspect_schema(self, cursor):
+        """
+        {table: {column: {type, primary_key, foreign_key, foreign_key_name, indexes}}} (the mysql_schema.json
+        shape); foreign_key_name identifies the constraint, so columns of a composite key share it.
+        """
+        return self.introspect_tables(cursor, list(self.list_tables(cursor)[0]))
+
+    def list_tables(self, cursor):
+        """
+        The cheap part of introspection: ({table: comment}, [(table, column, "parent(column)", constraint)])
+        - every table name plus all foreign key edges, without per-table column details.
+        """
+        raise NotImplementedError
+
+    def introspect_tables(self, cursor, tables):
+        """Column details for just these tables, in the introspect_schema shape."""
+        raise NotImplementedError
+
+    def schema_fingerprint(self, cursor):
+        """Cheap string that changes whenever introspect_schema's result would; None if unknown."""
+        return None
+
+    def explain(self, cursor, sql):
+        """Estimated rows examined for sql."""
+        raise NotImplementedError
+
+
+class MySQLDriver(Driver):
+    name = "mysql"
+    dialect = "MySQL"
+
+    def quote(self, identifier):
+        return "`" + identifier.replace("`", "``") + "`"
+
+    def connect(self):
+        ctx = session_context.current()
+        if ctx is not None:
+            return ctx.connect()
+        return mysql.connector.connect(**db_config.DB_CONFIG)
+
+    def introspect_schema(self, cursor):
+        cursor.execute("SHOW TABLES;")
+        tables = [row[0] for row in cursor.fetchall()]
+        return self.introspect_tables(cursor, tables)
+
+    def list_tables(self, cursor):
+        cursor.execute(
+            "SELECT TABLE_NAME, TABLE_COMMENT FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME"
+        )
+        tables = {row[0]: row[1] or "" for row in cursor.fetchall()}
+        cursor.execute(
+            "SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME, CONSTRAINT_NAME "
+            "FROM information_schema.KEY_COLUMN_USAGE "
+            "WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL"
+        )
+        return tables, [(row[0], row[1], f"{row[2]}({row[3]})", row[4]) for row in cursor.fetchall()]
+
+    def introspect_tables(self, cursor, tables):
+        schema_data = {}
+
+        for table in tables:
+            cursor.execute(f"DESCRIBE {table}")
+            describe_results = cursor.fetchall()
+
+            table_structure = {}
+
+            cursor.execute(f"SHOW INDEX FROM {table}")
+            index_rows = cursor.fetchall()
+            primary_keys = {row[4] for row in index_rows if row[2] == "PRIMARY"}
+            column_indexes = {}
+            for row in index_rows:
+                column_indexes.setdefault(row[4], []).append(
+                    {"name": row[2], "seq": int(row[3]), "unique": not int(row[1])}
+                )
+
+            cursor.execute("""
+                SELECT COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME, CONSTRAINT_NAME
+                FROM information_schema.KEY_COLUMN_USAGE
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND REFERENCED_TABLE_NAME IS NOT NULL;
+            """, (table,))
+            fk_rows = cursor.fetchall()
+            foreign_keys = {row[0]: f"{row[1]}({row[2]})" for row in fk_rows}
+            foreign_key_names = {row[0]: row[3] for row in fk_rows}
+
+            for row in describe_results:
+                col_name, col_type = row[0], row[1]
+                table_structure[col_name] = {
+                    "type": col_type,
+                    "primary_key": col_name in primary_keys,
+                    "foreign_key": foreign_keys.get(col_name, None),
+                    "foreign_key_name": foreign_key_names.get(col_name),
+                    "indexes": column_indexes.get(col_name, []),
+                }
+
+            schema_data[table] = table_structure
+        return schema_data
+
+    def schema_fingerprint(self, cursor):
+        """Row counts and XOR of CRC32s over the column, index and foreign key metadata the introspection reads."""
+        cursor.execute("""
+            SELECT
+                (SELECT CONCAT(COUNT(*), ':', COALESCE(BIT_XOR(CRC32(CONCAT_WS('|',
+                    TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_TYPE))), 0))
+                 FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()),
+                (SELECT CONCAT(COUNT(*), ':', COALESCE(BIT_XOR(CRC32(CONCAT_WS('|',
+                    TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, NON_UNIQUE))), 0))
+                 FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()),
+                (SELECT CONCAT(COUNT(*), ':', COALESCE(BIT_XOR(CRC32(CONCAT_WS('|',
+                    TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME, CONSTRAINT_NAME))), 0))
+                 FROM information_schema.KEY_COLUMN_USAGE
+                 WHERE TABLE_SCHEMA = DATABASE() AND REFERENCED_TABLE_NAME IS NOT NULL)
+        """)
+        rows = cursor.fetchall()
+        return "/".join(str(v) for v in rows[0]) if rows and rows[0] else None
+
+    def explain(self, cursor, sql):
+        cursor.execute(f"EXPLAIN {sql.strip().rstrip(';')}")
+        return estimate_rows_examined(_as_dicts(cursor, cursor.fetchall()))
+
+
+class _EmbeddedCursor:
+    """mysql.connector-style cursor over a DB-API cursor (sqlite3/duckdb): %s params, dict rows."""
+
+    def __init__(self, raw, driver, dictionary=False):
+        self._raw = raw
+        self._driver = driver
+        self._dictionary = dictionary
+        self._emulated = None
+        self.description = None
+        self.rowcount = -1
+        self.with_rows = False
+
+    def execute(self, sql, params=None):
+        emulated = self._driver.emulate(self._raw, sql)
+        if emulated is not None:
+            columns, rows = emulated
+            self.description = [(c, None, None, None, None, None, None) for c in columns]
+            self._emulated = list(rows)
+            self.rowcount = len(self._emulated)
+            self.with_rows = True
+            return
+        self._emulated = None
+        if params is not None:
+            self._raw.execute(sql.replace("%s", "?"), params)
+        else:
+            self._raw.execute(sql)
+        self.description = self._raw.description
+        self.rowcount = getattr(self._raw, "rowcount", -1)
+        self.with_rows = self.description is not None
+
+    def executemany(self, sql, seq):
+        self._emulated = None
+        self._raw.executemany(sql.replace("%s", "?"), list(seq))
+        self.description = None
+        self.rowcount = getattr(self._raw, "rowcount", -1)
+        self.with_rows = False
+
+    def _shape(self, rows):
+        if self._dictionary and self.description:
+            columns = [d[0] for d in self.description]
+            return [dict(zip(columns, row)) for row in rows]
+        return [tuple(row) for row in rows]
+
+    def fetchmany(self, size=1):
+        if not self.with_rows:
+            return []
+        if self._emulated is not None:
+            rows, self._emulated = self._emulated[:size], self._emulated[size:]
+        else:
+            rows = self._raw.fetchmany(size)
+        if len(rows) < size:
+            self.with_rows = False
+        return self._shape(rows)
+
+    def fetchall(self):
+        if not self.with_rows:
+            return []
+        if self._emulated is not None:
+            rows, self._emulated = self._emulated, []
+        else:
+            rows = self._raw.fetchall()
+        self.with_rows = False
+        return self._shape(rows)
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def nextset(self):
+        return None
+
+    def close(self):
+        self._raw.close()
+
+
+class _EmbeddedConnection:
+    def __init__(self, raw, driver):
+        self._raw = raw
+        self._driver = driver
+
+    def cursor(self, dictionary=False, **kwargs):
+        return _EmbeddedCursor(self._raw.cursor(), self._driver, dictionary=dictionary)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+def _require_path():
+    path = db_config.DRIVER_CONFIG["path"]
+    if not path:
+        raise ValueError("DB_PATH must point to the database file for the embedded driver")
+    return path
+
+
+class SQLiteDriver(Driver):
+    name = "sqlite"
+    dialect = "SQLite"
+    _describe = re.compile(r"^\s*(?:describe|desc)\s+`?(\w+)`?\s*;?\s*$", re.IGNORECASE)
+    _scan = re.compile(r"^(SCAN|SEARCH)\s+(?:TABLE\s+)?(\w+)", re.IGNORECASE)
+    _alias = re.compile(r"\b(?:FROM|JOIN)\s+[`\"]?(\w+)[`\"]?(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+    _not_alias = {"where", "join", "inner", "left", "right", "cross", "natural", "on", "using", "group", "order", "limit", "union"}
+
+    def connect(self):
+        try:
+            raw = sqlite3.connect(_require_path(), timeout=30, check_same_thread=False)
+        except ValueError as e:
+            raise sqlite3.OperationalError(str(e))
+        raw.execute("PRAGMA foreign_keys = ON")
+        return _EmbeddedConnection(raw, self)
+
+    def emulate(self, raw, sql):
+        """Answer the MySQL statements users (and the model) issue: SHOW TABLES, DESCRIBE t."""
+        text = sql.strip().rstrip(";").strip()
+        if text.lower() == "show tables":
+            return ["Tables"], self._tables(raw)
+        match = self._describe.match(text)
+        if match:
+            return ["Field", "Type", "Null", "Key", "Default", "Extra"], [
+                (name, (ctype or "").lower(), "NO" if notnull else "YES", "PRI" if pk else "", default, "")
+                for _, name, ctype, notnull, default, pk in raw.execute(f'PRAGMA table_info("{match.group(1)}")').fetchall()
+            ]
+        return None
+
+    @staticmethod
+    def _tables(raw):
+        return raw.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ).fetchall()
+
+    def list_tables(self, cursor):
+        raw = cursor._raw
+        tables = {table: "" for (table,) in self._tables(raw)}
+        edges = [
+            (table, row[3], f"{row[2]}({row[4]})", f"fk_{table}_{row[0]}")
+            for table in tables
+            for row in raw.execute(f'PRAGMA foreign_key_list("{table}")').fetchall() if row[4]
+        ]
+        return tables, edges
+
+    def introspect_tables(self, cursor, tables):
+        raw = cursor._raw
+        schema_data = {}
+        for table in tables:
+            info = raw.execute(f'PRAGMA table_info("{table}")').fetchall()
+            column_indexes = {}
+            for _, name, _, _, _, pk in info:
+                if pk:
+                    column_indexes.setdefault(name, []).append({"name": "PRIMARY", "seq": pk, "unique": True})
+            for _, index, unique, origin, _ in raw.execute(f'PRAGMA index_list("{table}")').fetchall():
+                if origin == "pk":
+                    continue
+                for seq, _, column in raw.execute(f'PRAGMA index_info("{index}")').fetchall():
+                    if column is not None:
+                        column_indexes.setdefault(column, []).append({"name": index, "seq": seq + 1, "unique": bool(unique)})
+            fk_rows = [row for row in raw.execute(f'PRAGMA foreign_key_list("{table}")').fetchall() if row[4]]
+            foreign_keys = {row[3]: f"{row[2]}({row[4]})" for row in fk_rows}
+            foreign_key_names = {row[3]: f"fk_{table}_{row[0]}" for row in fk_rows}
+            schema_data[table] = {
+                name: {
+                    "type": (ctype or "").lower(),
+                    "primary_key": bool(pk),
+                    "foreign_key": foreign_keys.get(name),
+                    "foreign_key_name": foreign_key_names.get(name),
+                    "indexes": column_indexes.get(name, []),
+                }
+                for _, name, ctype, _, _, pk in info
+            }
+        return schema_data
+
+    def schema_fingerprint(self, cursor):
+        """SQLite bumps schema_version on every schema change."""
+        return f"sqlite:{cursor._raw.execute('PRAGMA schema_version').fetchone()[0]}"
+
+    def explain(self, cursor, sql):
+        """Nested-loop estimate from EXPLAIN QUERY PLAN: full scans cost the table size, searches ~log2 of it."""
+        raw = cursor._raw
+        aliases = {}
+        for table, alias in self._alias.findall(sql):
+            aliases[table] = table
+            if alias and alias.lower() not in self._not_alias:
+                aliases[alias] = table
+        counts = {}
+        total, prefix = 0, 1
+        for row in raw.execute(f"EXPLAIN QUERY PLAN {sql.strip().rstrip(';')}").fetchall():
+            match = self._scan.match(row[-1])
+            if not match:
+                continue
+            table = aliases.get(match.group(2), match.group(2))
+            if table not in counts:
+                try:
+                    counts[table] = raw.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                except sqlite3.Error:
+                    counts[table] = 1000
+            if match.group(1).upper() == "SCAN":
+                rows = max(counts[table], 1)
+                total += prefix * rows
+                prefix *= rows
+            else:
+                total += prefix * max(1, int(math.log2(counts[table] + 1)))
+        return total
+
+
+class DuckDBDriver(Driver):
+    name = "duckdb"
+    dialect = "DuckDB"
+    _estimate = re.compile(r"(?:~|EC:\s*)(\d+)")
+
+    def connect(self):
+        if duckdb is None:
+            raise sqlite3.OperationalError("DB_DRIVER=duckdb requires the duckdb package (pip install duckdb)")
+        try:
+            return _EmbeddedConnection(duckdb.connect(_require_path()), self)
+        except ValueError as e:
+            raise sqlite3.OperationalError(str(e))
+
+    def emulate(self, raw, sql):
+        return None  # SHOW TABLES and DESCRIBE are native
+
+    def list_tables(self, cursor):
+        raw = cursor._raw
+        tables = {row[0]: row[1] or "" for row in raw.execute(
+            "SELECT table_name, comment FROM duckdb_tables() "
+            "WHERE schema_name = current_schema() AND NOT internal ORDER BY table_name"
+        ).fetchall()}
+        edges = []
+        for table, names, ref_table, ref_names in raw.execute(
+            "SELECT table_name, constraint_column_names, referenced_table, referenced_column_names "
+            "FROM duckdb_constraints() WHERE constraint_type = 'FOREIGN KEY' AND schema_name = current_schema()"
+        ).fetchall():
+            constraint = f"fk_{table}_{'_'.join(names)}"
+            edges.extend((table, name, f"{ref_table}({ref})", constraint) for name, ref in zip(names, ref_names or []))
+        return tables, edges
+
+    def introspect_tables(self, cursor, tables):
+        raw = cursor._raw
+        schema_data = {}
+        for table in tables:
+            columns = raw.execute(
+                "SELECT column_name, data_type FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = ? ORDER BY ordinal_position",
+                [table],
+            ).fetchall()
+            column_indexes, foreign_keys, foreign_key_names = {}, {}, {}
+            for ctype, names, ref_table, ref_names in raw.execute(
+                "SELECT constraint_type, constraint_column_names, referenced_table, referenced_column_names "
+                "FROM duckdb_constraints() WHERE table_name = ?",
+                [table],
+            ).fetchall():
+                if ctype in ("PRIMARY KEY", "UNIQUE"):
+                    index = "PRIMARY" if ctype == "PRIMARY KEY" else f"uq_{table}_{'_'.join(names)}"
+                    for seq, name in enumerate(names, 1):
+                        column_indexes.setdefault(name, []).append({"name": index, "seq": seq, "unique": True})
+                elif ctype == "FOREIGN KEY" and ref_table:
+                    for name, ref in zip(names, ref_names or []):
+                        foreign_keys[name] = f"{ref_table}({ref})"
+                        foreign_key_names[name] = f"fk_{table}_{'_'.join(names)}"
+            schema_data[table] = {
+                name: {
+                    "type": data_type.lower(),
+                    "primary_key": any(e["name"] == "PRIMARY" for e in column_indexes.get(name, [])),
+                    "foreign_key": foreign_keys.get(name),
+                    "foreign_key_name": foreign_key_names.get(name),
+                    "indexes": column_indexes.get(name, []),
+                }
+                for name, data_type in columns
+            }
+        return schema_data
+
+    def schema_fingerprint(self, cursor):
+        """Hash over the column and constraint catalog."""
+        row = cursor._raw.execute(
+            "SELECT (SELECT count(*) || ':' || coalesce(bit_xor(hash(table_name, column_name, data_type)), 0) "
+            "        FROM duckdb_columns() WHERE NOT internal), "
+            "       (SELECT count(*) || ':' || coalesce(bit_xor(hash(table_name, constraint_text)), 0) "
+            "        FROM duckdb_constraints())"
+        ).fetchone()
+        return f"duckdb:{row[0]}/{row[1]}"
+
+    def explain(self, cursor, sql):
+        """Sum of the cardinality estimates in the physical plan."""
+        raw = cursor._raw
+        plan = "\n".join(str(row[-1]) for row in raw.execute(f"EXPLAIN {sql.strip().rstrip(';')}").fetchall())
+        return sum(int(n) for n in self._estimate.findall(plan))
+
+
+DRIVERS = {"mysql": MySQLDriver, "sqlite": SQLiteDriver, "duckdb": DuckDBDriver}
+
+
+def get_driver():
+    """Driver for the configured DB_DRIVER (one instance per driver name)."""
+    name = (db_config.DRIVER_CONFIG["driver"] or "mysql").lower()
+    if name not in DRIVERS:
+        raise ValueError(f"Unknown DB_DRIVER '{name}' (expected one of: {', '.join(DRIVERS)})")
+    driver = _drivers.get(name)
+    if driver is None:
+        driver = _drivers[name] = DRIVERS[name]()
+    return driver
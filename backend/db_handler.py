@@ -1,15 +1,27 @@
 import mysql.connector
 import logging
 import re
+import time
 import pandas as pd
 try:
     from .query_parser import fix_insert_query
-    from .db_config import DB_CONFIG
+    from .db_driver import get_driver, DB_ERRORS
     from .schema_handler import store_all_table_structures
+    from .chunked_dml import plan_chunked_dml, run_chunked_dml
+    from .cascade_planner import plan_cascade_for_query, run_cascade_delete
+    from . import workload
+    from . import metrics, timing
+    from .replica_router import router
 except ImportError:
     from query_parser import fix_insert_query
-    from db_config import DB_CONFIG
+    from db_driver import get_driver, DB_ERRORS
     from schema_handler import store_all_table_structures
+    from chunked_dml import plan_chunked_dml, run_chunked_dml
+    from cascade_planner import plan_cascade_for_query, run_cascade_delete
+    import workload
+    import metrics
+    import timing
+    from replica_router import router
 
 logging.basicConfig(level=logging.INFO)
 
@@ -31,26 +43,55 @@ def extract_table_name(query):
     return match.group(1) if match else None
 
 
-def execute_query_api(query):
+def execute_query_api(query, chunk_size=None, pause_ms=None, cascade=False):
     """
     Execute SQL and return (success, error_message, results).
     results: list of dicts (rows) for SELECT/SHOW/DESCRIBE, else None. No Streamlit dependency.
+    If chunk_size is given, eligible single-table UPDATE/DELETE statements are run in
+    primary-key batches and results holds one summary row (table, key, chunks, affected_rows).
+    If cascade is True, single-table DELETEs first remove referencing rows in child tables
+    (planned from the cached FK graph) in one transaction; results holds rows deleted per table.
+    A batch with a DELETE that can't cascade is rejected before anything runs.
+    Read-only batches run on a read replica when DB_REPLICAS is set (see replica_router).
     """
-    try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-    except mysql.connector.Error as err:
-        return (False, str(err), None)
     queries = query.strip().split(";")
     queries = [q.strip() for q in queries if q.strip()]
     if not queries:
         return (False, "No valid SQL query found.", None)
+    cascade_plans = {}
+    if cascade:
+        try:
+            for q in queries:
+                if q.lower().startswith("delete"):
+                    cascade_plans[q] = plan_cascade_for_query(q)
+                    if cascade_plans[q] is None:
+                        return (False, f"Cannot cascade '{q}': only single-table DELETE statements with a WHERE clause can cascade.", None)
+        except ValueError as err:
+            return (False, str(err), None)
+    try:
+        driver = get_driver()
+        with timing.span("db_connect"):
+            conn, _ = router.connect(query, driver)
+        cursor = conn.cursor()
+    except (ValueError, *DB_ERRORS) as err:
+        return (False, str(err), None)
+    metrics.DB_CONNECTIONS_OPEN.inc()
     last_results = None
+    current = started = None
     try:
         for q in queries:
+            current = q
+            track_reads = workload.TRACK_ROWS_EXAMINED and driver.name == "mysql"
+            reads_before = workload.handler_reads(cursor) if track_reads else None
+            started = time.perf_counter()
+            fetch_s = 0.0
             table_name = extract_table_name(q)
             if not table_name and q.lower().startswith("select"):
                 table_name = "Unknown Table"
+            chunk_plan = None
+            cascade_plan = cascade_plans.get(q)
+            if not cascade_plan and chunk_size and q.lower().startswith(("delete", "update")):
+                chunk_plan = plan_chunked_dml(q)
             if q.lower().startswith("insert"):
                 corrected_query, values_list = fix_insert_query(q, table_name)
                 if not corrected_query:
@@ -58,6 +99,11 @@ def execute_query_api(query):
                 cursor.executemany(corrected_query, values_list)
                 conn.commit()
                 last_results = None
+            elif cascade_plan:
+                last_results = run_cascade_delete(conn, cursor, cascade_plan, chunk_size)["steps"]
+            elif chunk_plan:
+                summary = run_chunked_dml(conn, cursor, chunk_plan, chunk_size, pause_ms)
+                last_results = [summary]
             elif q.lower().startswith("delete"):
                 cursor.execute(q)
                 conn.commit()
@@ -68,26 +114,38 @@ def execute_query_api(query):
                 last_results = None
             elif q.lower().startswith("show tables"):
                 cursor.execute(q)
+                fetch_started = time.perf_counter()
                 rows = cursor.fetchall()
                 if rows:
                     last_results = [{"Tables": row[0]} for row in rows]
                 else:
                     last_results = []
+                fetch_s = time.perf_counter() - fetch_started
             elif q.lower().startswith(("select", "show", "describe")):
                 cursor.execute(q)
-                rows = cursor.fetchall()
+                fetch_started = time.perf_counter()
                 col_names = [desc[0] for desc in cursor.description] if cursor.description else []
-                if rows:
-                    last_results = [dict(zip(col_names, row)) for row in rows]
-                else:
-                    last_results = []
+                last_results = [dict(zip(col_names, row)) for row in driver.iter_rows(cursor)]
+                fetch_s = time.perf_counter() - fetch_started
             else:
                 cursor.execute(q)
                 conn.commit()
                 last_results = None
+            elapsed = time.perf_counter() - started
+            timing.add("execute", elapsed - fetch_s)
+            if fetch_s:
+                timing.add("fetch", fetch_s)
+            rows = len(last_results) if last_results is not None else cursor.rowcount
+            rows_examined = workload.handler_reads(cursor) - reads_before if reads_before is not None else None
+            workload.record(q, elapsed, rows=rows, rows_examined=rows_examined)
+            current = None
         return (True, None, last_results)
-    except mysql.connector.Error as err:
+    except ValueError as err:
+        return (False, str(err), None)
+    except DB_ERRORS as err:
         logging.error(f"SQL Execution Error: {err}")
+        if current is not None:
+            workload.record(current, time.perf_counter() - started, error=True)
         return (False, str(err), None)
     finally:
         try:
@@ -100,15 +158,45 @@ def execute_query_api(query):
             conn.close()
         except Exception:
             pass
+        metrics.DB_CONNECTIONS_OPEN.dec()
+
+
+def explain_queries(queries):
+    """
+    Run EXPLAIN for each query on one connection.
+    Returns a list of (rows_examined, error_message) tuples; rows_examined is None on error.
+    """
+    try:
+        driver = get_driver()
+        conn, _ = router.connect(None, driver, read_only=True)
+        cursor = conn.cursor(dictionary=True)
+    except (ValueError, *DB_ERRORS) as err:
+        return [(None, str(err)) for _ in queries]
+    metrics.DB_CONNECTIONS_OPEN.inc()
+    estimates = []
+    try:
+        for q in queries:
+            try:
+                estimates.append((driver.explain(cursor, q), None))
+            except DB_ERRORS as err:
+                estimates.append((None, str(err)))
+        return estimates
+    finally:
+        try:
+            cursor.close()
+            conn.close()
+        except Exception:
+            pass
+        metrics.DB_CONNECTIONS_OPEN.dec()
 
 
 def execute_query(query):
     """Executes SQL queries, tracks history for undo, and handles errors. Returns (success, error_message)."""
     _ensure_session_state()
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
+        conn = get_driver().connect()
         cursor = conn.cursor()
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         st.error(f" SQL Execution Error: {err}")
         return (False, str(err))
 
@@ -172,7 +260,7 @@ def execute_query(query):
                 conn.commit()
                 st.success(f" Query executed successfully!")
         return (True, None)
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         st.error(f" SQL Execution Error: {err}")
         logging.error(f"SQL Execution Error: {err}")
         return (False, str(err))
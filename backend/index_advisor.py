@@ -0,0 +1,180 @@
+"""
+Index advisor driven by the executed-query workload.
+Proposes composite indexes for the heaviest statement fingerprints from their
+WHERE/JOIN/ORDER BY columns, skipping ones the existing index metadata already covers.
+Optionally measures the EXPLAIN estimate before/after with a temporary invisible index (MySQL 8+).
+"""
+import logging
+try:
+    from .db_driver import get_driver, estimate_rows_examined, DB_ERRORS
+    from .schema_handler import load_schema, get_table_indexes
+    from .sql_lexer import tokenize, is_keyword
+    from .sql_rewriter import table_aliases, resolve_column
+    from . import workload
+except ImportError:
+    from db_driver import get_driver, estimate_rows_examined, DB_ERRORS
+    from schema_handler import load_schema, get_table_indexes
+    from sql_lexer import tokenize, is_keyword
+    from sql_rewriter import table_aliases, resolve_column
+    import workload
+
+MAX_INDEX_COLUMNS = 4
+
+logging.basicConfig(level=logging.INFO)
+
+
+def _add(usage, table, kind, column):
+    columns = usage.setdefault(table, {"eq": [], "join": [], "range": [], "order": []})[kind]
+    if column not in columns:
+        columns.append(column)
+
+
+def column_usage(sql, schema):
+    """Per table: columns used in equality filters, joins, range filters and ORDER/GROUP BY."""
+    tokens = tokenize(sql)
+    aliases = table_aliases(tokens, schema)
+    usage = {}
+    region = None
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if is_keyword(token, "WHERE", "ON", "HAVING"):
+            region = "filter"
+        elif is_keyword(token, "ORDER", "GROUP") and i + 1 < len(tokens) and is_keyword(tokens[i + 1], "BY"):
+            region = "order"
+        elif is_keyword(token, "SELECT", "LIMIT", "SET"):
+            region = None
+        resolved = resolve_column(tokens, i, aliases, schema) if region else None
+        if not resolved:
+            i += 1
+            continue
+        table, column, nxt = resolved
+        if region == "order":
+            _add(usage, table, "order", column)
+        elif nxt < len(tokens):
+            op = tokens[nxt]
+            other = resolve_column(tokens, nxt + 1, aliases, schema)
+            if op.value in ("=", "<=>", "<", ">", "<=", ">=") and other:
+                _add(usage, table, "join", column)
+                _add(usage, other[0], "join", other[1])
+            elif op.value in ("=", "<=>") or is_keyword(op, "IN"):
+                _add(usage, table, "eq", column)
+            elif op.value in ("<", ">", "<=", ">=") or is_keyword(op, "BETWEEN"):
+                _add(usage, table, "range", column)
+            elif is_keyword(op, "LIKE") and nxt + 1 < len(tokens) and tokens[nxt + 1].kind == "string":
+                if not tokens[nxt + 1].value[1:].startswith(("%", "_")):
+                    _add(usage, table, "range", column)
+        i = nxt
+    return usage
+
+
+def _candidate_columns(used):
+    """Equality and join columns first, then one range column or the ORDER BY columns."""
+    columns = list(used["eq"])
+    columns += [c for c in used["join"] if c not in columns]
+    if used["range"]:
+        columns += [c for c in used["range"][:1] if c not in columns]
+    else:
+        columns += [c for c in used["order"] if c not in columns]
+    return columns[:MAX_INDEX_COLUMNS]
+
+
+def _covered(columns, existing):
+    """True if an existing index starts with these columns, in this order."""
+    for index_columns in existing.values():
+        if index_columns[:len(columns)] == columns:
+            return True
+    return False
+
+
+def index_name(table, columns):
+    return f"idx_{table}_{'_'.join(columns)}"[:64]
+
+
+def propose_indexes(sql, schema):
+    """Candidate (table, columns) pairs for one statement."""
+    proposals = []
+    for table, used in column_usage(sql, schema).items():
+        columns = _candidate_columns(used)
+        if columns and not _covered(columns, get_table_indexes(schema, table)):
+            proposals.append((table, columns))
+    return proposals
+
+
+def _evaluate(cursor, sample_sql, table, columns):
+    """EXPLAIN sample_sql with and without a temporary invisible index on table(columns)."""
+    name = index_name(table, columns)
+    column_list = ", ".join(f"`{c}`" for c in columns)
+    cursor.execute(f"EXPLAIN {sample_sql}")
+    before = estimate_rows_examined(cursor.fetchall())
+    cursor.execute(f"CREATE INDEX `{name}` ON `{table}` ({column_list}) INVISIBLE")
+    try:
+        cursor.execute("SET SESSION optimizer_switch = 'use_invisible_indexes=on'")
+        cursor.execute(f"EXPLAIN {sample_sql}")
+        after = estimate_rows_examined(cursor.fetchall())
+    finally:
+        cursor.execute("SET SESSION optimizer_switch = 'use_invisible_indexes=off'")
+        cursor.execute(f"DROP INDEX `{name}` ON `{table}`")
+    gain = round(100.0 * (before - after) / before, 1) if before else 0.0
+    return {"rows_before": before, "rows_after": after, "gain_pct": gain}
+
+
+def advise_indexes(limit=5, evaluate=False):
+    """
+    Suggest CREATE INDEX statements for the heaviest recorded statements.
+    With evaluate=True each suggestion is measured on the database with a temporary
+    invisible index (created and dropped immediately); needs MySQL 8.0+ and ALTER privilege.
+    """
+    schema = load_schema()
+    suggestions = {}
+    for stmt in workload.top_statements(limit=limit * 4):
+        if not stmt["fingerprint"].startswith(("select", "update", "delete", "(")):
+            continue
+        for table, columns in propose_indexes(stmt["sample"], schema):
+            key = (table, tuple(columns))
+            suggestion = suggestions.get(key)
+            if suggestion is None:
+                column_list = ", ".join(f"`{c}`" for c in columns)
+                suggestion = suggestions[key] = {
+                    "table": table,
+                    "columns": columns,
+                    "create_sql": f"CREATE INDEX `{index_name(table, columns)}` ON `{table}` ({column_list});",
+                    "digests": [],
+                    "total_ms": 0.0,
+                    "sample": stmt["sample"],
+                    "estimate": None,
+                    "error": None,
+                }
+            suggestion["digests"].append(stmt["digest"])
+            suggestion["total_ms"] = round(suggestion["total_ms"] + stmt["total_ms"], 3)
+
+    ranked = sorted(suggestions.values(), key=lambda s: s["total_ms"], reverse=True)[:limit]
+    if not evaluate or not ranked:
+        return ranked
+
+    driver = get_driver()
+    if driver.name != "mysql":
+        for suggestion in ranked:
+            suggestion["error"] = "Index evaluation needs MySQL 8.0+ (invisible indexes)"
+        return ranked
+    try:
+        conn = driver.connect()
+        cursor = conn.cursor(dictionary=True)
+    except DB_ERRORS as err:
+        for suggestion in ranked:
+            suggestion["error"] = str(err)
+        return ranked
+    try:
+        for suggestion in ranked:
+            try:
+                suggestion["estimate"] = _evaluate(cursor, suggestion["sample"], suggestion["table"], suggestion["columns"])
+            except DB_ERRORS as err:
+                logging.warning("Index evaluation failed for %s: %s", suggestion["create_sql"], err)
+                suggestion["error"] = str(err)
+    finally:
+        try:
+            cursor.close()
+            conn.close()
+        except Exception:
+            pass
+    return ranked
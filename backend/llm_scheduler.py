@@ -0,0 +1,215 @@
+"""
+Scheduler for Gemini calls. Requests wait in a priority queue (interactive SQL generation
+before background explanations) until an API key has room in its requests-per-minute and
+tokens-per-minute budget (LLM_RPM, LLM_TPM; 0 = unlimited) and fewer than LLM_MAX_CONCURRENCY
+calls are running. Rate-limit (429) and transient errors are retried with jittered
+exponential backoff; a rate-limited key cools down while the other keys from secret_store
+(GOOGLE_API_KEY plus GOOGLE_API_KEYS) keep serving. When retries or the queue wait run out,
+LLMUnavailable is raised so callers can answer "busy, retry later" instead of an error as SQL.
+"""
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from google.api_core import exceptions as google_exceptions
+try:
+    from .secret_store import get_google_api_keys
+    from . import metrics, timing
+except ImportError:
+    from secret_store import get_google_api_keys
+    import metrics
+    import timing
+
+LLM_RPM = int(os.getenv("LLM_RPM", "0"))
+LLM_TPM = int(os.getenv("LLM_TPM", "0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "60"))
+
+INTERACTIVE = 0
+BACKGROUND = 1
+_WINDOW_SECONDS = 60.0
+
+_RATE_LIMITED = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+_TRANSIENT = (
+    google_exceptions.ServiceUnavailable, google_exceptions.InternalServerError, google_exceptions.BadGateway,
+    google_exceptions.GatewayTimeout, google_exceptions.DeadlineExceeded, ConnectionError, TimeoutError,
+)
+
+logging.basicConfig(level=logging.INFO)
+LLM_RETRIES = metrics.Counter("querywizard_llm_retries_total", "Gemini calls retried, by cause.", ("cause",))
+LLM_REJECTED = metrics.Counter(
+    "querywizard_llm_unavailable_total", "Gemini calls given up after retries or queue timeout.", ("cause",),
+)
+
+
+class LLMUnavailable(RuntimeError):
+    """Gemini could not be reached within the retry/queue budget; retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(round(retry_after)))
+
+
+class _KeyState:
+    """Requests and tokens one API key used in the last minute, plus its rate-limit cooldown."""
+
+    def __init__(self):
+        self.window = deque()
+        self.tokens = 0
+        self.cooldown_until = 0.0
+
+    def _trim(self, now):
+        while self.window and self.window[0][0] <= now - _WINDOW_SECONDS:
+            self.tokens -= self.window.popleft()[1]
+
+    def wait_time(self, now, tokens, rpm, tpm):
+        """Seconds until a call estimated at `tokens` fits this key's budget (0 = now)."""
+        self._trim(now)
+        waits = [self.cooldown_until - now]
+        if rpm and len(self.window) >= rpm:
+            waits.append(self.window[0][0] + _WINDOW_SECONDS - now)
+        if tpm and self.window and self.tokens + tokens > tpm:
+            excess, freed = self.tokens + tokens - tpm, 0
+            for started, used in self.window:
+                freed += used
+                if freed >= excess:
+                    waits.append(started + _WINDOW_SECONDS - now)
+                    break
+            else:
+                # A call estimated above tpm never fits; it runs alone once the window is empty
+                waits.append(self.window[-1][0] + _WINDOW_SECONDS - now)
+        return max(0.0, *waits)
+
+    def record(self, now, tokens):
+        entry = [now, tokens]
+        self.window.append(entry)
+        self.tokens += tokens
+        return entry
+
+    def adjust(self, entry, tokens):
+        self.tokens += tokens - entry[1]
+        entry[1] = tokens
+
+
+def _backoff(attempt):
+    delay = min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+
+class Scheduler:
+    def __init__(self, rpm=LLM_RPM, tpm=LLM_TPM, concurrency=LLM_MAX_CONCURRENCY, keys=get_google_api_keys):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.concurrency = max(1, concurrency)
+        self._keys = keys
+        self._states = {}
+        self._queue = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def _state(self, key):
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState()
+        return state
+
+    def _acquire(self, tokens, priority, deadline):
+        """Wait for our turn and a key with budget; returns (key, window entry)."""
+        keys = self._keys()
+        if not keys:
+            raise ValueError("Missing API key. Add it in login.")
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._queue[0] == ticket and self._active < self.concurrency:
+                        key, wait = min(
+                            ((key, self._state(key).wait_time(now, tokens, self.rpm, self.tpm)) for key in keys),
+                            key=lambda item: (item[1], len(self._state(item[0]).window)),
+                        )
+                        if wait <= 0:
+                            heapq.heappop(self._queue)
+                            self._active += 1
+                            self._cond.notify_all()
+                            return key, self._state(key).record(now, tokens)
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        LLM_REJECTED.inc(1, "queue_timeout")
+                        raise LLMUnavailable("Gemini is busy; try again shortly.", wait or LLM_RETRY_BASE_SECONDS)
+                    self._cond.wait(min(remaining, wait) if wait else remaining)
+            except BaseException:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                raise
+
+    def _release(self, key, entry, tokens, cooldown):
+        with self._cond:
+            self._active -= 1
+            state = self._state(key)
+            if tokens is not None:
+                state.adjust(entry, tokens)
+            if cooldown:
+                state.cooldown_until = max(state.cooldown_until, time.monotonic() + cooldown)
+            self._cond.notify_all()
+
+    def run(self, fn, tokens=0, priority=INTERACTIVE, usage=None):
+        """
+        fn(api_key) once the budgets allow, retried on rate-limit and transient errors.
+        tokens is the estimated cost; usage(result), if given, returns the actual tokens used.
+        """
+        deadline = time.monotonic() + LLM_QUEUE_TIMEOUT_SECONDS
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            key, entry = self._acquire(tokens, priority, deadline)
+            timing.add("llm_queue", time.perf_counter() - queued)
+            actual, cooldown = None, 0.0
+            try:
+                result = fn(key)
+                actual = usage(result) if usage is not None else None
+                return result
+            except _RATE_LIMITED + _TRANSIENT as e:
+                rate_limited = isinstance(e, _RATE_LIMITED)
+                cause = "rate_limited" if rate_limited else "transient"
+                delay = _backoff(attempt)
+                attempt += 1
+                if rate_limited:
+                    cooldown = delay
+                if attempt > LLM_MAX_RETRIES:
+                    LLM_REJECTED.inc(1, cause)
+                    state = "rate limited" if rate_limited else "unavailable"
+                    raise LLMUnavailable(f"Gemini is {state}; try again shortly. ({e})", delay) from e
+                LLM_RETRIES.inc(1, cause)
+                logging.warning("Gemini call failed (%s), retry %d in %.1fs: %s", cause, attempt, delay, e)
+            finally:
+                self._release(key, entry, actual, cooldown)
+            # A rate-limited key is cooling down, so the retry goes to another key or waits in the queue.
+            if not rate_limited:
+                time.sleep(delay)
+
+    def status(self):
+        with self._cond:
+            return {
+                "active": self._active, "queued": len(self._queue), "keys": len(self._states),
+                "rpm": self.rpm, "tpm": self.tpm, "concurrency": self.concurrency,
+            }
+
+
+scheduler = Scheduler()
+LLM_QUEUED = metrics.Gauge(
+    "querywizard_llm_queued", "Gemini calls waiting for budget or a free slot.",
+    callback=lambda: scheduler.status()["queued"],
+)
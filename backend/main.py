@@ -7,10 +7,9 @@ if _backend_dir not in sys.path:
 
 import speech_recognition as sr
 from db_handler import execute_query
-from ai_generator import get_gemini_response, fix_sql_query
+from ai_generator import get_gemini_response, fix_sql_query, get_sql_explanation
+from llm_scheduler import LLMUnavailable
 from schema_handler import load_schema, store_all_table_structures
-from deep_translator import GoogleTranslator
-import google.generativeai as genai
 from datetime import datetime
 import mysql.connector
 from db_config import DB_CONFIG, update_env_credentials
@@ -172,14 +171,6 @@ def get_db_username():
     except Exception as e:
         return "Unknown User"
 
-def translate_prompt(text):
-    translator = GoogleTranslator(source='auto', target='en')
-    try:
-        return translator.translate(text)
-    except Exception as e:
-        st.error(f"Translation Error: {e}")
-        return text
-
 def _current_prompt():
     return st.session_state.get("user_input", "")
 
@@ -199,20 +190,6 @@ def speech_to_text():
     except sr.RequestError as e:
         st.error(f"Could not request results from Google Speech Recognition service; {e}")
 
-def get_sql_explanation(sql_query, target_language='en'):
-    try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(
-            f"Provide a brief explanation of this SQL query in 2-3 sentences:\n{sql_query}"
-        )
-        explanation = response.text.strip()
-        if target_language != 'en':
-            translator = GoogleTranslator(source='auto', target=target_language)
-            explanation = translator.translate(explanation)
-        return explanation
-    except Exception as e:
-        return f"Error generating explanation: {str(e)}"
-
 st.title("Query Wizard")
 
 with st.sidebar:
@@ -268,8 +245,12 @@ with row1_col2:
         prompt_text = _current_prompt()
         if prompt_text:
             with st.spinner("Generating SQL query..."):
-                translated_input = translate_prompt(prompt_text)
-                sql_query = get_gemini_response(translated_input, default_table=selected_table)
+                # get_gemini_response translates the prompt itself.
+                try:
+                    sql_query = get_gemini_response(prompt_text, default_table=selected_table)
+                except LLMUnavailable as e:
+                    st.error(str(e))
+                    sql_query = None
                 if sql_query:
                     st.session_state["last_sql_error"] = None
                     st.session_state["generated_sql"] = sql_query
@@ -317,12 +298,16 @@ if st.session_state.get("generated_sql"):
                     current_sql = ""
                 else:
                     error_msg = st.session_state.get("last_sql_error") or "Unknown error"
-                fixed = fix_sql_query(
-                    current_sql,
-                    error_msg,
-                    original_prompt=_current_prompt(),
-                    default_table=selected_table,
-                )
+                try:
+                    fixed = fix_sql_query(
+                        current_sql,
+                        error_msg,
+                        original_prompt=_current_prompt(),
+                        default_table=selected_table,
+                    )
+                except LLMUnavailable as e:
+                    st.error(str(e))
+                    st.stop()
                 if fixed and not fixed.startswith("AI Error:"):
                     st.session_state["generated_sql"] = fixed
                     st.session_state["last_sql_error"] = None
@@ -0,0 +1,101 @@
+"""
+Server-side generate -> validate -> execute -> repair loop.
+Replaces the client round trips through /api/fix-sql and /api/execute with a single
+call that introspects the schema once and retries a bounded number of times.
+"""
+import os
+import time
+try:
+    from .schema_handler import load_schema, store_all_table_structures
+    from .ai_generator import get_gemini_response, fix_sql_query
+    from .sql_validator import validate_sql, format_validation_errors
+    from .db_handler import execute_query_api
+    from .sql_rewriter import rewrite_sql, REWRITE_ENABLED
+    from .sql_lexer import split_statements
+    from .replica_router import is_read_only
+except ImportError:
+    from schema_handler import load_schema, store_all_table_structures
+    from ai_generator import get_gemini_response, fix_sql_query
+    from sql_validator import validate_sql, format_validation_errors
+    from db_handler import execute_query_api
+    from sql_rewriter import rewrite_sql, REWRITE_ENABLED
+    from sql_lexer import split_statements
+    from replica_router import is_read_only
+
+MAX_REPAIR_ATTEMPTS = int(os.getenv("AUTO_REPAIR_MAX_ATTEMPTS", "3"))
+
+
+class _StageTimer:
+    """Accumulates wall time per stage in milliseconds."""
+
+    def __init__(self):
+        self.timings = {}
+
+    def run(self, stage, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[stage] = round(self.timings.get(stage, 0.0) + elapsed, 3)
+
+
+def _is_ai_error(sql):
+    return sql.startswith("AI Error")
+
+
+def _safe_to_rerun(sql):
+    """A failed single statement or read-only batch left nothing committed, so a fixed version may run again."""
+    return len(split_statements(sql)) <= 1 or is_read_only(sql)
+
+
+def generate_and_execute(prompt, default_table=None, max_attempts=None):
+    """
+    Generate SQL for prompt, validate it locally, execute it, and on failure ask the model
+    to fix it, up to max_attempts executions/validations in total. A multi-statement batch with
+    writes that fails during execution is not repaired, since its earlier statements may have committed.
+    Returns {"success", "sql", "error", "results", "attempts", "rewrites", "timings"}.
+    """
+    attempts_allowed = max(1, min(int(max_attempts or MAX_REPAIR_ATTEMPTS), MAX_REPAIR_ATTEMPTS))
+    timer = _StageTimer()
+    attempts = []
+    result = {"success": False, "sql": "", "error": None, "results": None, "attempts": attempts, "rewrites": []}
+
+    timer.run("schema", store_all_table_structures, force_update=True)
+    schema = timer.run("schema", load_schema)
+    sql = timer.run("generate", get_gemini_response, prompt, default_table=default_table, refresh_schema=False)
+    if REWRITE_ENABLED and not _is_ai_error(sql):
+        sql, result["rewrites"] = timer.run("rewrite", rewrite_sql, sql, schema)
+
+    for attempt in range(1, attempts_allowed + 1):
+        result["sql"] = sql
+        if _is_ai_error(sql):
+            result["error"] = sql
+            break
+
+        errors = timer.run("validate", validate_sql, sql, schema)
+        if errors:
+            message = format_validation_errors(errors)
+            attempts.append({"attempt": attempt, "sql": sql, "stage": "validate", "error": message, "errors": errors})
+        else:
+            success, err, results = timer.run("execute", execute_query_api, sql)
+            attempts.append({"attempt": attempt, "sql": sql, "stage": "execute", "error": err})
+            if success:
+                result.update(success=True, error=None, results=results)
+                break
+            message = err
+            if not _safe_to_rerun(sql):
+                result["error"] = (
+                    f"{err} (not auto-repaired: earlier statements in this batch may already have been applied)"
+                )
+                break
+
+        result["error"] = message
+        if attempt < attempts_allowed:
+            sql = timer.run(
+                "fix", fix_sql_query, sql, message,
+                original_prompt=prompt, default_table=default_table, refresh_schema=False,
+            )
+
+    result["timings"] = timer.timings
+    return result
@@ -0,0 +1,152 @@
+"""
+On-demand sampling profiler (pure Python, works in the frozen build).
+A background thread snapshots every thread's stack via sys._current_frames() at a fixed
+interval for a bounded time and aggregates them as collapsed stacks
+("frame;frame;frame count"), the input format of flamegraph.pl and speedscope.
+In slow-request mode samples are buffered per request and kept only for requests
+that end up slower than the threshold.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "120"))
+DEFAULT_INTERVAL_MS = 10
+_MAX_DEPTH = 128
+
+_lock = threading.Lock()
+_session = None
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _collapse(frame):
+    labels = []
+    while frame is not None and len(labels) < _MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class _Session:
+    def __init__(self, seconds, interval_ms, slow_ms):
+        self.seconds = seconds
+        self.interval = interval_ms / 1000.0
+        self.slow_ms = slow_ms
+        self.stacks = Counter()
+        self.samples = 0
+        self.requests = {}  # thread id -> (start perf_counter, Counter) in slow-request mode
+        self.kept_requests = 0
+        self.started_at = time.time()
+        self.finished_at = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        deadline = time.perf_counter() + self.seconds
+        while not self.stop_event.is_set() and time.perf_counter() < deadline:
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            with _lock:
+                for tid, frame in frames.items():
+                    if tid == own:
+                        continue
+                    stack = f"{names.get(tid, tid)};{_collapse(frame)}"
+                    if self.slow_ms is None:
+                        self.stacks[stack] += 1
+                    elif tid in self.requests:
+                        self.requests[tid][1][stack] += 1
+                    else:
+                        continue
+                    self.samples += 1
+            self.stop_event.wait(self.interval)
+        with _lock:
+            self.requests.clear()
+            self.finished_at = time.time()
+
+    def status(self):
+        return {
+            "running": self.finished_at is None,
+            "seconds": self.seconds,
+            "interval_ms": round(self.interval * 1000, 3),
+            "slow_ms": self.slow_ms,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+            "kept_requests": self.kept_requests,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def start(seconds, interval_ms=DEFAULT_INTERVAL_MS, slow_ms=None):
+    """Start a profiling session; raises ValueError if one is running or arguments are out of range."""
+    global _session
+    seconds = float(seconds)
+    interval_ms = float(interval_ms)
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise ValueError(f"seconds must be in (0, {PROFILER_MAX_SECONDS:g}]")
+    if not 1 <= interval_ms <= 1000:
+        raise ValueError("interval_ms must be between 1 and 1000")
+    if slow_ms is not None and float(slow_ms) < 0:
+        raise ValueError("slow_ms must not be negative")
+    with _lock:
+        if _session is not None and _session.finished_at is None:
+            raise ValueError("A profiling session is already running")
+        _session = _Session(seconds, interval_ms, None if slow_ms is None else float(slow_ms))
+    _session.thread.start()
+    return _session.status()
+
+
+def stop():
+    session = _session
+    if session is not None:
+        session.stop_event.set()
+        session.thread.join(timeout=5)
+    return status()
+
+
+def status():
+    session = _session
+    return session.status() if session is not None else {"running": False, "samples": 0}
+
+
+def collapsed():
+    """Collapsed stacks of the current/last session, one "stack count" line each, hottest first."""
+    session = _session
+    if session is None:
+        return ""
+    with _lock:
+        items = session.stacks.most_common()
+    return "".join(f"{stack} {count}\n" for stack, count in items)
+
+
+def request_started():
+    """Called at the start of each request; in slow-request mode starts buffering its samples."""
+    session = _session
+    if session is None or session.slow_ms is None or session.finished_at is not None:
+        return
+    with _lock:
+        session.requests[threading.get_ident()] = (time.perf_counter(), Counter())
+
+
+def request_finished():
+    """Merge the request's buffered samples into the profile if it exceeded the threshold."""
+    session = _session
+    if session is None or session.slow_ms is None:
+        return
+    with _lock:
+        entry = session.requests.pop(threading.get_ident(), None)
+        if entry is None:
+            return
+        started, stacks = entry
+        if (time.perf_counter() - started) * 1000 >= session.slow_ms:
+            session.stacks.update(stacks)
+            session.kept_requests += 1
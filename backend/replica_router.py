@@ -0,0 +1,243 @@
+"""
+Read/write routing between the primary and optional MySQL read replicas (DB_REPLICAS).
+Read-only statements go round-robin to healthy replicas; everything else goes to the primary.
+After a write, the same client session reads from the primary for REPLICA_STICKY_SECONDS
+(read-your-writes). A background thread health-checks replicas and skips ones that are
+down, not replicating, or lag more than REPLICA_MAX_LAG_SECONDS behind. It logs in with REPLICA_HEALTH_USER /
+REPLICA_HEALTH_PASSWORD (default: the .env credentials), never with a client session's.
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+import mysql.connector
+try:
+    from . import db_config, metrics, session_context
+    from .sql_lexer import tokenize, is_keyword, split_statements, top_level_keyword_index
+except ImportError:
+    import db_config
+    import metrics
+    import session_context
+    from sql_lexer import tokenize, is_keyword, split_statements, top_level_keyword_index
+
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "10"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+# Short, so an unreachable replica fails over to the primary instead of hanging the read
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+REPLICA_HEALTH_USER = os.getenv("REPLICA_HEALTH_USER", "")
+REPLICA_HEALTH_PASSWORD = os.getenv("REPLICA_HEALTH_PASSWORD", "")
+
+# Client errors meaning the server itself is unreachable (can't connect, lost or gone away);
+# anything else (access denied, unknown database, ...) is about the caller, not the replica.
+_CONNECTIVITY_ERRNOS = frozenset((2002, 2003, 2005, 2006, 2013, 2055))
+
+_READ_KEYWORDS = ("SELECT", "SHOW", "DESCRIBE", "DESC", "EXPLAIN", "WITH")
+_WRITE_KEYWORDS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "MERGE", "CREATE", "DROP", "ALTER", "TRUNCATE", "CALL")
+
+current_session = ContextVar("querywizard_session", default=None)
+
+ROUTED = metrics.Counter("querywizard_db_routed_total", "Statements routed by target.", ("target",))
+logging.basicConfig(level=logging.INFO)
+
+
+def _is_read_only_statement(sql):
+    tokens = tokenize(sql)
+    while tokens and tokens[0].value == "(":
+        tokens = tokens[1:]
+    if not tokens or not is_keyword(tokens[0], *_READ_KEYWORDS):
+        return False
+    if is_keyword(tokens[0], "WITH") and top_level_keyword_index(tokens, *_WRITE_KEYWORDS) != -1:
+        return False
+    for i, token in enumerate(tokens):
+        if is_keyword(token, "INTO") and is_keyword(tokens[0], "SELECT", "WITH"):
+            return False  # SELECT ... INTO OUTFILE / @var
+        if is_keyword(token, "FOR") and i + 1 < len(tokens) and is_keyword(tokens[i + 1], "UPDATE", "SHARE"):
+            return False
+        if is_keyword(token, "LOCK") and i + 1 < len(tokens) and is_keyword(tokens[i + 1], "IN"):
+            return False
+        if is_keyword(token, "GET_LOCK", "RELEASE_LOCK", "LAST_INSERT_ID", "FOUND_ROWS"):
+            return False
+    return True
+
+
+def is_read_only(sql):
+    """True if every statement in sql is a plain read (SELECT/SHOW/DESCRIBE/EXPLAIN without locking or INTO)."""
+    statements = split_statements(sql)
+    return bool(statements) and all(_is_read_only_statement(s) for s in statements)
+
+
+def _is_connectivity_error(err):
+    return err.errno in _CONNECTIVITY_ERRNOS
+
+
+def _health_credentials():
+    config = dict(db_config.DB_CONFIG)
+    config.pop("database", None)
+    if REPLICA_HEALTH_USER:
+        config.update(user=REPLICA_HEALTH_USER, password=REPLICA_HEALTH_PASSWORD)
+    return config
+
+
+class _Replica:
+    def __init__(self, address):
+        self.address = address
+        self.healthy = True
+        self.lag = None
+        self.error = None
+
+    @property
+    def name(self):
+        return f"{self.address['host']}:{self.address.get('port', 3306)}"
+
+    def config(self, credentials):
+        return dict(credentials, **self.address)
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._replicas = []
+        self._configs = None
+        self._next = 0
+        self._last_write = {}
+        self._last_expiry = 0.0
+        self._checker = None
+
+    def _sync(self):
+        """Rebuild the replica list if DB_REPLICAS changed. Caller holds _lock."""
+        configs = db_config.replica_configs({})
+        if configs != self._configs:
+            self._configs = configs
+            self._replicas = [_Replica(c) for c in configs]
+            self._next = 0
+        if self._replicas and self._checker is None:
+            self._checker = threading.Thread(target=self._health_loop, name="replica-health", daemon=True)
+            self._checker.start()
+
+    def note_write(self, session=None):
+        session = session or current_session.get()
+        if session:
+            now = time.monotonic()
+            with self._lock:
+                self._last_write[session] = now
+                if now - self._last_expiry >= REPLICA_STICKY_SECONDS:
+                    self._last_expiry = now
+                    for sid in [s for s, written in self._last_write.items() if now - written >= REPLICA_STICKY_SECONDS]:
+                        del self._last_write[sid]
+
+    def _sticky(self, session):
+        if not session:
+            return False
+        with self._lock:
+            written = self._last_write.get(session)
+            if written is not None and time.monotonic() - written >= REPLICA_STICKY_SECONDS:
+                del self._last_write[session]
+                written = None
+        return written is not None
+
+    def _pick(self):
+        with self._lock:
+            self._sync()
+            healthy = [r for r in self._replicas if r.healthy]
+            if not healthy:
+                return None
+            replica = healthy[self._next % len(healthy)]
+            self._next += 1
+            return replica
+
+    def _mark_down(self, replica, err):
+        with self._lock:
+            replica.healthy = False
+            replica.error = str(err)
+        logging.warning("Replica %s marked down: %s", replica.name, err)
+
+    def connect(self, sql, driver, read_only=None):
+        """
+        Open a connection for sql: a replica for read-only statements (unless the session
+        wrote recently), else the primary. read_only overrides the classification.
+        Returns (connection, target name).
+        """
+        session = current_session.get()
+        if read_only is None:
+            read_only = is_read_only(sql)
+        if driver.name == "mysql" and read_only and not self._sticky(session):
+            credentials = session_context.current_db_config()
+            replica = self._pick()
+            while replica is not None:
+                try:
+                    conn = mysql.connector.connect(
+                        connection_timeout=REPLICA_CONNECT_TIMEOUT, **replica.config(credentials)
+                    )
+                    ROUTED.inc(1, "replica")
+                    return conn, replica.name
+                except mysql.connector.Error as err:
+                    if not _is_connectivity_error(err):
+                        logging.warning("Replica %s refused this session, reading from the primary: %s", replica.name, err)
+                        break
+                    self._mark_down(replica, err)
+                    replica = self._pick()
+        elif not read_only:
+            self.note_write(session)
+        ROUTED.inc(1, "primary")
+        return driver.connect(), "primary"
+
+    def _check(self, replica):
+        try:
+            conn = mysql.connector.connect(
+                connection_timeout=REPLICA_CONNECT_TIMEOUT, **replica.config(_health_credentials())
+            )
+        except mysql.connector.Error as err:
+            return False, None, str(err)
+        try:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+            except mysql.connector.Error:
+                cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+            cursor.close()
+            if not status:
+                return False, None, "not a replica (replica status is empty)"
+            lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+            if lag is None:
+                return False, None, "replication is not running"
+            if lag > REPLICA_MAX_LAG_SECONDS:
+                return False, lag, f"replication lag {lag}s exceeds {REPLICA_MAX_LAG_SECONDS:g}s"
+            return True, lag, None
+        except mysql.connector.Error as err:
+            return False, None, str(err)
+        finally:
+            conn.close()
+
+    def _health_loop(self):
+        while True:
+            with self._lock:
+                replicas = list(self._replicas)
+            for replica in replicas:
+                healthy, lag, error = self._check(replica)
+                with self._lock:
+                    if healthy and not replica.healthy:
+                        logging.info("Replica %s is healthy again", replica.name)
+                    replica.healthy, replica.lag, replica.error = healthy, lag, error
+            time.sleep(REPLICA_HEALTH_INTERVAL)
+
+    def status(self):
+        with self._lock:
+            self._sync()
+            return [
+                {"replica": r.name, "healthy": r.healthy, "lag_seconds": r.lag, "error": r.error}
+                for r in self._replicas
+            ]
+
+    def healthy_count(self):
+        with self._lock:
+            return sum(1 for r in self._replicas if r.healthy)
+
+
+router = ReplicaRouter()
+
+HEALTHY_REPLICAS = metrics.Gauge(
+    "querywizard_db_replicas_healthy", "Read replicas currently accepting traffic.", callback=router.healthy_count,
+)
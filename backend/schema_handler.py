@@ -1,12 +1,25 @@
 import os
+import contextvars
+import hashlib
 import json
-import mysql.connector
 import logging
+import re
 import sys
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 try:
-    from .db_config import DB_CONFIG
+    from .db_config import DRIVER_CONFIG
+    from .db_driver import get_driver, DB_ERRORS
+    from . import metrics, timing, session_context, schema_snapshot
 except ImportError:
-    from db_config import DB_CONFIG
+    from db_config import DRIVER_CONFIG
+    from db_driver import get_driver, DB_ERRORS
+    import schema_snapshot
+    import metrics
+    import timing
+    import session_context
 
 if getattr(sys, "frozen", False):
     app_dir = os.path.join(os.path.expanduser("~"), ".querywizard")
@@ -14,85 +27,335 @@ if getattr(sys, "frozen", False):
     SCHEMA_FILE = os.path.join(app_dir, "mysql_schema.json")
 else:
     SCHEMA_FILE = os.path.join(os.path.dirname(__file__), "mysql_schema.json")
+# SCHEMA_LAZY=1: refresh only the table list and FK edges; columns are introspected per table on first use.
+SCHEMA_LAZY = os.getenv("SCHEMA_LAZY", "0") == "1"
+SCHEMA_PREFETCH_WORKERS = int(os.getenv("SCHEMA_PREFETCH_WORKERS", "2"))
+_prefetcher = ThreadPoolExecutor(max_workers=max(1, SCHEMA_PREFETCH_WORKERS), thread_name_prefix="schema-prefetch")
+# Recently opened snapshots by path: (version, SchemaSnapshot); used outside login sessions.
+_snapshots = {}
+_SNAPSHOT_CACHE_SIZE = 8
 logging.basicConfig(level=logging.INFO)
+SCHEMA_CACHE_TABLES = metrics.Gauge(
+    "querywizard_schema_cache_tables", "Tables in the cached schema file.",
+    callback=lambda: len(load_schema()),
+)
 
 
-def delete_schema_file() -> None:
-    """Deletes the schema JSON file if it exists (e.g. on logout)."""
-    if os.path.exists(SCHEMA_FILE):
-        try:
-            os.remove(SCHEMA_FILE)
-            logging.info("Schema file deleted")
-        except OSError as e:
-            logging.warning("Could not delete schema file: %s", e)
+def database_identity():
+    """
+    (label, identity) of the current database: identity is mysql:host:port:database for MySQL
+    (credentials from the bound login session or DB_CONFIG), driver:path for embedded drivers.
+    """
+    driver = (DRIVER_CONFIG["driver"] or "mysql").lower()
+    if driver == "mysql":
+        config = session_context.current_db_config()
+        label = config.get("database") or "default"
+        return label, f"mysql:{config.get('host')}:{config.get('port', 3306)}:{config.get('database')}"
+    path = os.path.abspath(DRIVER_CONFIG["path"] or "")
+    return os.path.basename(path) or driver, f"{driver}:{path}"
 
 
-def load_schema():
-    """Loads the schema JSON file if it exists."""
-    if os.path.exists(SCHEMA_FILE):
+def schema_file():
+    """
+    Schema snapshot path for the current database: one file per database_identity(),
+    under schema_cache/ next to SCHEMA_FILE.
+    """
+    label, identity = database_identity()
+    slug = re.sub(r"[^\w.-]", "_", label)[:40]
+    digest = hashlib.sha256(identity.encode()).hexdigest()[:12]
+    return os.path.join(os.path.dirname(SCHEMA_FILE), "schema_cache", f"{slug}-{digest}.snapshot")
+
+
+def _fingerprint_file(path):
+    return path + ".fingerprint"
+
+
+def _catalog_file(path):
+    return path + ".catalog"
+
+
+def stored_fingerprint(path=None):
+    """Fingerprint recorded with the schema file, or None."""
+    try:
+        with open(_fingerprint_file(path or schema_file())) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def read_schema_file(path):
+    """SchemaSnapshot for path, or {} if it is missing or unreadable."""
+    try:
+        with timing.span("schema_load"):
+            return schema_snapshot.read(path)
+    except FileNotFoundError:
+        return {}
+    except (OSError, schema_snapshot.SnapshotError) as e:
+        logging.warning("Schema file is invalid (%s). Run a query to rebuild from database.", e)
+        return {}
+
+
+class LazySchema(Mapping):
+    """
+    Schema mapping for SCHEMA_LAZY mode: every table name and FK edge comes from the catalog;
+    a table's columns are introspected on first access, added to the snapshot file, and the
+    tables it is FK-related to are prefetched in the background.
+    """
+
+    def __init__(self, path, catalog, snapshot, version):
+        self.path = path
+        self._comments = catalog["tables"]
+        self._edges = [tuple(edge[:3]) for edge in catalog["foreign_keys"]]
+        self._edge_names = [edge[3] if len(edge) > 3 else None for edge in catalog["foreign_keys"]]
+        self._snapshot = snapshot
+        self._version = version
+        self._details = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, table):
+        if table not in self._comments:
+            raise KeyError(table)
+        columns = self._details.get(table)
+        if columns is None:
+            if table in self._snapshot:
+                columns = self._details[table] = self._snapshot[table]
+            else:
+                columns = self._fetch([table]).get(table, {})
+                self._prefetch_related(table)
+        return columns
+
+    def __iter__(self):
+        return iter(self._comments)
+
+    def __len__(self):
+        return len(self._comments)
+
+    def __contains__(self, table):
+        return table in self._comments
+
+    def items(self):
+        missing = [t for t in self._comments if t not in self._details and t not in self._snapshot]
+        if missing:
+            self._fetch(missing)
+        return {table: self[table] for table in self._comments}.items()
+
+    def values(self):
+        return dict(self.items()).values()
+
+    def comments(self):
+        return dict(self._comments)
+
+    def foreign_key_edges(self, names=False):
+        if names:
+            return [edge + (name,) for edge, name in zip(self._edges, self._edge_names)]
+        return list(self._edges)
+
+    def _fetch(self, tables, background=False):
+        started = time.perf_counter()
+        driver = get_driver()
         try:
-            with open(SCHEMA_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            logging.warning("Schema file is invalid or empty. Run a query to rebuild from database.")
+            conn = driver.connect()
+            cursor = conn.cursor()
+        except (ValueError, *DB_ERRORS) as err:
+            logging.warning("Could not introspect %s: %s", ", ".join(tables), err)
             return {}
-    return {}
+        try:
+            fetched = driver.introspect_tables(cursor, tables)
+        except DB_ERRORS as err:
+            logging.warning("Could not introspect %s: %s", ", ".join(tables), err)
+            return {}
+        finally:
+            cursor.close()
+            conn.close()
+            if not background:
+                timing.add("schema_refresh", time.perf_counter() - started)
+        with self._lock:
+            self._details.update(fetched)
+            if _file_version(_catalog_file(self.path)) == self._version:
+                loaded = {table: self._snapshot[table] for table in self._snapshot}
+                loaded.update(self._details)
+                schema_snapshot.write(self.path, loaded)
+        return fetched
 
+    def _prefetch_related(self, table):
+        related = set()
+        for child, _, parent in self._edges:
+            parent = parent.split("(")[0]
+            if parent == table:
+                related.add(child)
+            elif child == table:
+                related.add(parent)
+        with self._lock:
+            missing = [
+                t for t in related
+                if t in self._comments and t not in self._details and t not in self._snapshot and t not in self._pending
+            ]
+            self._pending.update(missing)
+        if missing:
+            _prefetcher.submit(contextvars.copy_context().run, self._prefetch, missing)
 
-def save_schema(schema):
-    """Saves the updated schema dictionary to JSON."""
-    with open(SCHEMA_FILE, "w") as f:
-        json.dump(schema, f, indent=4)
+    def _prefetch(self, tables):
+        try:
+            self._fetch([t for t in tables if t not in self._details], background=True)
+        finally:
+            with self._lock:
+                self._pending.difference_update(tables)
 
 
-def get_table_columns(table_name):
-    schema = load_schema()
-    return schema.get(table_name, {})
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
 
 
-def store_all_table_structures(force_update=False):
-    """Fetches table structures including Primary Keys & Foreign Keys, stores in JSON."""
-    if os.path.exists(SCHEMA_FILE) and not force_update:
-        return
+def schema_version():
+    """
+    Opaque tag that changes whenever the current database's schema is stored again ("" if none).
+    A lazy schema is tagged by its catalog and fingerprint only, so tables fetched into its
+    snapshot on demand don't move the tag (and the ETag and search index built on it).
+    """
+    path = schema_file()
+    catalog = _file_version(_catalog_file(path))
+    if catalog is not None:
+        versions = (catalog, _file_version(_fingerprint_file(path)))
+    else:
+        versions = (_file_version(path),)
+        if versions == (None,):
+            return ""
+    return hashlib.sha256(repr((path, versions)).encode()).hexdigest()[:20]
 
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cursor = conn.cursor()
 
+def foreign_key_edges(schema, names=False):
+    """
+    [(table, column, "parent(column)")] for every foreign key; lazy schemas answer from the catalog.
+    With names, each edge also carries its constraint name (None in schema files stored without one).
+    """
+    if isinstance(schema, LazySchema):
+        return schema.foreign_key_edges(names=names)
+    return [
+        (table, col, data["foreign_key"]) + ((data.get("foreign_key_name"),) if names else ())
+        for table, cols in schema.items() for col, data in cols.items() if data.get("foreign_key")
+    ]
+
+
+def _read_lazy_schema(path, version):
+    try:
+        with open(_catalog_file(path)) as f:
+            catalog = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning("Schema catalog is invalid (%s). Run a query to rebuild from database.", e)
+        return {}
+    snapshot = read_schema_file(path) if os.path.exists(path) else {}
+    return LazySchema(path, catalog, snapshot, version)
+
+
+def load_schema():
+    """
+    Schema of the current database as a read-only {table: {column: {...}}} mapping; tables
+    are decoded (or, in SCHEMA_LAZY mode, introspected) on first access. Cached (per login
+    session) until the file changes.
+    """
+    path = schema_file()
+    ctx = session_context.current()
+    lazy = os.path.exists(_catalog_file(path))
     try:
-        cursor.execute("SHOW TABLES;")
-        tables = [row[0] for row in cursor.fetchall()]
-        schema_data = {}
+        stat = os.stat(_catalog_file(path) if lazy else path)
+    except OSError:
+        return {}
+    version = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cache = ctx.cache if ctx is not None else _snapshots
+    key = "schema" if ctx is not None else path
+    cached = cache.get(key)
+    if cached is not None and cached[0] == (path, version):
+        return cached[1]
+    schema = _read_lazy_schema(path, version) if lazy else read_schema_file(path)
+    if schema:
+        if ctx is None:
+            _snapshots.pop(path, None)
+            while len(_snapshots) >= _SNAPSHOT_CACHE_SIZE:
+                _snapshots.pop(next(iter(_snapshots)))
+        cache[key] = ((path, version), schema)
+    return schema
 
-        for table in tables:
-            cursor.execute(f"DESCRIBE {table}")
-            describe_results = cursor.fetchall()
 
-            table_structure = {}
+def save_schema(schema, fingerprint=None, catalog=None):
+    """
+    Atomically saves the schema as a snapshot, with the database fingerprint it was read at.
+    catalog ({"tables", "foreign_keys"}) marks a lazy schema whose snapshot holds only the tables
+    introspected so far.
+    """
+    path = schema_file()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if catalog is not None:
+        schema_snapshot.atomic_write(_catalog_file(path), json.dumps(catalog, separators=(",", ":")).encode())
+    elif os.path.exists(_catalog_file(path)):
+        os.remove(_catalog_file(path))
+    schema_snapshot.write(path, schema)
+    if fingerprint is not None:
+        schema_snapshot.atomic_write(_fingerprint_file(path), fingerprint.encode())
+    elif os.path.exists(_fingerprint_file(path)):
+        os.remove(_fingerprint_file(path))
 
-            cursor.execute(f"SHOW KEYS FROM {table} WHERE Key_name = 'PRIMARY'")
-            primary_keys = {row[4] for row in cursor.fetchall()}
 
-            cursor.execute(f"""
-                SELECT COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
-                FROM information_schema.KEY_COLUMN_USAGE
-                WHERE TABLE_NAME = '{table}' AND REFERENCED_TABLE_NAME IS NOT NULL;
-            """)
-            foreign_keys = {row[0]: f"{row[1]}({row[2]})" for row in cursor.fetchall()}
+def get_table_columns(table_name):
+    schema = load_schema()
+    return schema.get(table_name, {})
+
 
-            for row in describe_results:
-                col_name, col_type = row[0], row[1]
-                table_structure[col_name] = {
-                    "type": col_type,
-                    "primary_key": col_name in primary_keys,
-                    "foreign_key": foreign_keys.get(col_name, None),
-                }
+def get_table_indexes(schema, table_name):
+    """Rebuild {index_name: [columns in index order]} from the per-column index entries."""
+    indexes = {}
+    for col, data in schema.get(table_name, {}).items():
+        for entry in data.get("indexes") or []:
+            indexes.setdefault(entry["name"], []).append((entry["seq"], col))
+    return {name: [col for _, col in sorted(cols)] for name, cols in indexes.items()}
 
-            schema_data[table] = table_structure
 
-        save_schema(schema_data)
+def get_indexed_columns(schema, table_name):
+    """Columns that lead at least one index (usable for range/equality lookups on their own)."""
+    return {
+        col for col, data in schema.get(table_name, {}).items()
+        if any(entry["seq"] == 1 for entry in data.get("indexes") or [])
+    }
+
+
+def store_all_table_structures(force_update=False):
+    """
+    Fetches table structures including Primary Keys, Foreign Keys & indexes, stores in JSON.
+    With force_update, the cached file is still reused when the database's schema fingerprint
+    matches the one it was stored with (so switching back to a known database is instant).
+    With SCHEMA_LAZY only the table list and FK edges are stored; see LazySchema.
+    """
+    path = schema_file()
+    if os.path.exists(path) and not force_update:
+        return
+
+    started = time.perf_counter()
+    driver = get_driver()
+    conn = driver.connect()
+    cursor = conn.cursor()
+
+    try:
+        try:
+            fingerprint = driver.schema_fingerprint(cursor)
+        except DB_ERRORS as err:
+            logging.warning("Could not fingerprint schema: %s", err)
+            fingerprint = None
+        if (fingerprint is not None and os.path.exists(path) and fingerprint == stored_fingerprint(path)
+                and os.path.exists(_catalog_file(path)) == SCHEMA_LAZY):
+            return
+        if SCHEMA_LAZY:
+            tables, edges = driver.list_tables(cursor)
+            save_schema({}, fingerprint, catalog={"tables": tables, "foreign_keys": edges})
+        else:
+            schema_data = driver.introspect_schema(cursor)
+            save_schema(schema_data, fingerprint)
         logging.info("Json Updated")
 
-    except mysql.connector.Error as err:
+    except DB_ERRORS as err:
         logging.error(f"  SQL Error: {err}")
 
     finally:
@@ -100,3 +363,4 @@ def store_all_table_structures(force_update=False):
             cursor.fetchall()
         cursor.close()
         conn.close()
+        timing.add("schema_refresh", time.perf_counter() - started)
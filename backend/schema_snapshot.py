@@ -0,0 +1,127 @@
+"""
+Compact on-disk schema snapshot: a small header with a table -> (offset, length) index,
+followed by one minified JSON object per table.
+
+    QWSCHEMA1\n<header length>\n<header JSON>{table 1 JSON}{table 2 JSON}...
+
+Files are written to a temp file and renamed into place, so readers see either the old
+or the new snapshot, never a partial one. Readers memory-map the file (POSIX) and decode
+a table only when it is first accessed.
+"""
+import json
+import mmap
+import os
+import tempfile
+from collections.abc import Mapping
+
+MAGIC = b"QWSCHEMA1\n"
+_COMPACT = (",", ":")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class SchemaSnapshot(Mapping):
+    """Read-only {table: {column: {...}}} mapping backed by a snapshot buffer."""
+
+    def __init__(self, buffer, body, index):
+        self._buffer = buffer
+        self._body = body
+        self._index = index
+        self._tables = {}
+
+    def __getitem__(self, table):
+        columns = self._tables.get(table)
+        if columns is None:
+            offset, length = self._index[table]
+            start = self._body + offset
+            columns = self._tables[table] = json.loads(self._buffer[start:start + length])
+        return columns
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, table):
+        return table in self._index
+
+    def _decode_all(self):
+        """Decode every table with a single json.loads (much faster than one call per table)."""
+        if len(self._tables) < len(self._index):
+            parts = []
+            for table, (offset, length) in self._index.items():
+                start = self._body + offset
+                parts.append(json.dumps(table).encode() + b":" + self._buffer[start:start + length])
+            self._tables = json.loads(b"{" + b",".join(parts) + b"}")
+        return self._tables
+
+    def items(self):
+        return self._decode_all().items()
+
+    def values(self):
+        return self._decode_all().values()
+
+    def to_dict(self):
+        return dict(self._decode_all())
+
+
+def encode(schema):
+    blobs, index, offset = [], {}, 0
+    for table, columns in schema.items():
+        blob = json.dumps(columns, separators=_COMPACT).encode()
+        index[table] = [offset, len(blob)]
+        offset += len(blob)
+        blobs.append(blob)
+    header = json.dumps({"index": index}, separators=_COMPACT).encode()
+    return b"".join([MAGIC, str(len(header)).encode(), b"\n", header] + blobs)
+
+
+def write(path, schema):
+    """Atomically replace path with a snapshot of schema."""
+    atomic_write(path, encode(schema))
+
+
+def atomic_write(path, data):
+    """Write bytes to a temp file in path's directory, fsync, and rename it over path."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".schema-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def decode(buffer):
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise SnapshotError("not a schema snapshot")
+    newline = buffer.find(b"\n", len(MAGIC))
+    try:
+        header_len = int(buffer[len(MAGIC):newline])
+        body = newline + 1 + header_len
+        index = json.loads(buffer[newline + 1:body])["index"]
+    except (ValueError, KeyError) as e:
+        raise SnapshotError(f"corrupt snapshot header: {e}")
+    if index and body + max(o + n for o, n in index.values()) > len(buffer):
+        raise SnapshotError("truncated snapshot")
+    return SchemaSnapshot(buffer, body, index)
+
+
+def read(path):
+    """SchemaSnapshot for path (memory-mapped where the OS allows replacing mapped files)."""
+    with open(path, "rb") as f:
+        if os.name == "posix" and os.fstat(f.fileno()).st_size:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+    return decode(buffer)
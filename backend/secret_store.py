@@ -24,6 +24,12 @@ def get_google_api_key() -> str:
         return ""
 
 
+def get_google_api_keys() -> list:
+    """Every configured key: the primary key, then any extra ones in GOOGLE_API_KEYS (comma-separated)."""
+    keys = [get_google_api_key()] + (os.getenv("GOOGLE_API_KEYS") or "").split(",")
+    return list(dict.fromkeys(key.strip() for key in keys if key and key.strip()))
+
+
 def set_google_api_key(api_key: str) -> bool:
     """Store API key in OS keychain. Returns True on success."""
     clean = (api_key or "").strip()
@@ -0,0 +1,231 @@
+"""
+Per-client database sessions for the Flask backend.
+/api/login stores credentials in a SessionContext keyed by the client's session cookie, so
+several users can work against different databases from one process. Each context owns a
+MySQL connection pool and a per-session cache (used for the schema). Contexts idle for
+SESSION_IDLE_SECONDS release their pool and cache; after SESSION_EXPIRE_SECONDS they are
+forgotten (logged out). Without a bound context, callers fall back to the global DB_CONFIG
+(.env), which is what main.py, the CLI and single-user installs use.
+Session ids are minted here and signed (SESSION_SECRET, random per process if unset), so a
+client can't pick its own; login always issues a fresh one.
+"""
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+import mysql.connector
+try:
+    from . import db_config, metrics
+except ImportError:
+    import db_config
+    import metrics
+
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "4"))
+SESSION_POOL_WAIT_SECONDS = float(os.getenv("SESSION_POOL_WAIT_SECONDS", "10"))
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "900"))
+SESSION_EXPIRE_SECONDS = float(os.getenv("SESSION_EXPIRE_SECONDS", "86400"))
+_SWEEP_INTERVAL_SECONDS = 30
+_SECRET = os.getenv("SESSION_SECRET", "").encode() or secrets.token_bytes(32)
+
+_current = ContextVar("querywizard_session_context", default=None)
+_sessions = {}
+_lock = threading.Lock()
+_last_sweep = [0.0]
+logging.basicConfig(level=logging.INFO)
+
+
+def _sign(token):
+    return hmac.new(_SECRET, token.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def new_sid():
+    """A fresh session id: random token plus its signature."""
+    token = secrets.token_urlsafe(16)
+    return f"{token}.{_sign(token)}"
+
+
+def valid_sid(sid):
+    """True only for ids minted by new_sid."""
+    token, _, signature = (sid or "").partition(".")
+    return bool(token) and hmac.compare_digest(signature, _sign(token))
+
+
+class _PooledConnection:
+    """A connection checked out of a _Pool; close() hands it back instead of disconnecting."""
+
+    def __init__(self, pool, cnx):
+        self._pool = pool
+        self._cnx = cnx
+
+    def __getattr__(self, name):
+        if self._cnx is None:
+            raise mysql.connector.errors.OperationalError("Connection is closed")
+        return getattr(self._cnx, name)
+
+    def close(self):
+        cnx, self._cnx = self._cnx, None
+        if cnx is not None:
+            self._pool.put(cnx)
+
+
+class _Pool:
+    """
+    Up to size MySQL connections for one session. Tracks every connection it opened, so
+    close() disconnects the idle ones at once and the checked-out ones as they come back.
+    """
+
+    def __init__(self, size, config):
+        self.config = config
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._checked_out = set()
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def get(self, timeout):
+        if not self._slots.acquire(timeout=timeout):
+            raise mysql.connector.errors.PoolError("Failed getting connection; pool exhausted")
+        try:
+            with self._lock:
+                if self._closed:
+                    raise mysql.connector.errors.PoolError("Session pool is closed")
+                cnx = self._idle.pop() if self._idle else None
+            if cnx is None or not cnx.is_connected():
+                cnx = mysql.connector.connect(**self.config)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._checked_out.add(cnx)
+        return _PooledConnection(self, cnx)
+
+    def put(self, cnx):
+        with self._lock:
+            self._checked_out.discard(cnx)
+            keep = not self._closed
+        try:
+            if keep:
+                cnx.reset_session()
+                with self._lock:
+                    keep = not self._closed
+                    if keep:
+                        self._idle.append(cnx)
+            if not keep:
+                cnx.close()
+        except Exception as e:
+            logging.warning("Dropping pooled connection: %s", e)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for cnx in idle:
+            try:
+                cnx.close()
+            except Exception as e:
+                logging.warning("Could not close pooled connection: %s", e)
+
+    def open_count(self):
+        with self._lock:
+            return len(self._idle) + len(self._checked_out)
+
+
+class SessionContext:
+    def __init__(self, credentials):
+        self.db_config = dict(db_config.DB_CONFIG, **credentials)
+        self.cache = {}
+        self.last_used = time.monotonic()
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """A pooled connection (close() returns it to the pool); waits up to SESSION_POOL_WAIT_SECONDS when all are busy."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = _Pool(SESSION_POOL_SIZE, self.db_config)
+            pool = self._pool
+        return pool.get(SESSION_POOL_WAIT_SECONDS)
+
+    def release(self):
+        """Close the pool and drop cached data; credentials stay so the next request reconnects."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self.cache.clear()
+        if pool is not None:
+            pool.close()
+
+
+def current():
+    """The SessionContext bound to this request, or None."""
+    return _current.get()
+
+
+def current_db_config():
+    """Connection settings for the bound session, else the global DB_CONFIG."""
+    ctx = _current.get()
+    return ctx.db_config if ctx is not None else db_config.DB_CONFIG
+
+
+def login(sid, db_name, db_password):
+    """Create (or replace) the context for sid with these credentials."""
+    ctx = SessionContext({"database": db_name, "password": db_password})
+    with _lock:
+        previous = _sessions.get(sid)
+        _sessions[sid] = ctx
+    if previous is not None:
+        previous.release()
+    return ctx
+
+
+def logout(sid):
+    with _lock:
+        ctx = _sessions.pop(sid, None)
+    if ctx is not None:
+        ctx.release()
+
+
+def sweep(now=None):
+    """Release idle contexts and forget expired ones."""
+    now = time.monotonic() if now is None else now
+    with _lock:
+        expired = [sid for sid, ctx in _sessions.items() if now - ctx.last_used >= SESSION_EXPIRE_SECONDS]
+        closing = [_sessions.pop(sid) for sid in expired]
+        idle = [ctx for ctx in _sessions.values() if now - ctx.last_used >= SESSION_IDLE_SECONDS]
+    for ctx in closing:
+        ctx.release()
+    for ctx in idle:
+        if ctx._pool is not None or ctx.cache:
+            ctx.release()
+
+
+def bind(sid):
+    """Bind sid's context (if logged in) to the current request; returns the ContextVar token."""
+    now = time.monotonic()
+    if now - _last_sweep[0] >= _SWEEP_INTERVAL_SECONDS:
+        _last_sweep[0] = now
+        sweep(now)
+    with _lock:
+        ctx = _sessions.get(sid)
+    if ctx is not None:
+        ctx.last_used = now
+    return _current.set(ctx)
+
+
+def unbind(token):
+    _current.reset(token)
+
+
+def active_count():
+    with _lock:
+        return len(_sessions)
+
+
+ACTIVE_SESSIONS = metrics.Gauge(
+    "querywizard_sessions_active", "Logged-in client sessions.", callback=active_count,
+)
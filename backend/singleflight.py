@@ -0,0 +1,59 @@
+"""
+In-flight request coalescing: concurrent calls with the same key share one execution.
+The first caller runs the function; callers arriving while it runs wait for it and get
+the same result (or exception). Nothing is cached once the call has finished.
+"""
+import copy
+import threading
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+COALESCED = metrics.Counter(
+    "querywizard_coalesced_requests_total", "Calls that waited on an identical in-flight call.", ("group",),
+)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        fn(*args, **kwargs), shared with any concurrent call for the same key. Every caller gets
+        its own deep copy of the result, so callers may modify it freely.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        else:
+            COALESCED.inc(1, self.name)
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
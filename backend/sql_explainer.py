@@ -0,0 +1,497 @@
+"""
+Deterministic, offline explanations for common SQL shapes: single-table and simply joined
+SELECTs (filters, grouping, ordering, limits), INSERT ... VALUES, UPDATE, DELETE, DESCRIBE
+and SHOW. Anything else (subqueries, UNION, CTEs, CASE, window functions, ...) returns None
+so the caller can fall back to the model.
+"""
+try:
+    from .sql_lexer import tokenize, split_statements, is_keyword, is_identifier, top_level_keyword_index
+except ImportError:
+    from sql_lexer import tokenize, split_statements, is_keyword, is_identifier, top_level_keyword_index
+
+MAX_JOINS = 3
+MAX_CONDITIONS = 5
+MAX_TOKENS = 200
+
+_UNSUPPORTED = ("UNION", "INTERSECT", "EXCEPT", "WITH", "CASE", "OVER", "EXISTS", "NATURAL")
+_UNSUPPORTED_IN_SELECT = ("INTO", "FOR", "LOCK")
+_CLAUSES = ("FROM", "WHERE", "GROUP", "HAVING", "ORDER", "LIMIT")
+_JOIN_WORDS = ("JOIN", "INNER", "LEFT", "RIGHT", "CROSS", "OUTER", "STRAIGHT_JOIN")
+_ALIAS_STOP_WORDS = _CLAUSES + _JOIN_WORDS + ("ON", "USING", "SET", "AS", "BY")
+_AGGREGATES = {"COUNT": "the number of", "SUM": "the total", "AVG": "the average", "MIN": "the lowest", "MAX": "the highest"}
+_COMPARISONS = {
+    "=": "is", "!=": "is not", "<>": "is not", ">": "is greater than", ">=": "is at least",
+    "<": "is less than", "<=": "is at most",
+}
+_NO_SPACE_BEFORE = (",", ")", ".")
+_SPACED_BEFORE_PAREN = ("IN", "AND", "OR", "NOT", "ON", "USING", "VALUES", "BY")
+
+
+def _op(token, value):
+    return token.kind == "op" and token.value == value
+
+
+def _listing(items):
+    items = list(items)
+    if len(items) <= 2:
+        return " and ".join(items)
+    return ", ".join(items[:-1]) + " and " + items[-1]
+
+
+def _split_top_level(tokens, separator):
+    """Split tokens on a top-level operator (e.g. ',') or keyword; BETWEEN ... AND is kept together."""
+    parts, current, depth, between = [], [], 0, False
+    for token in tokens:
+        if _op(token, "("):
+            depth += 1
+        elif _op(token, ")"):
+            depth -= 1
+        elif depth == 0 and is_keyword(token, "BETWEEN"):
+            between = True
+        if depth == 0 and (_op(token, separator) or is_keyword(token, separator)):
+            if separator == "AND" and between:
+                between = False
+            else:
+                parts.append(current)
+                current = []
+                continue
+        current.append(token)
+    parts.append(current)
+    return [part for part in parts if part]
+
+
+class _Renderer:
+    """Renders token runs back to compact SQL text, replacing aliases with table names."""
+
+    def __init__(self, aliases, qualify):
+        self.aliases = aliases
+        self.qualify = qualify
+
+    def __call__(self, tokens):
+        out = ""
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            value = token.value
+            if is_identifier(token) and i + 2 < len(tokens) and _op(tokens[i + 1], ".") and value.lower() in self.aliases:
+                if not self.qualify:
+                    i += 2
+                    token, value = tokens[i], tokens[i].value
+                else:
+                    value = self.aliases[value.lower()]
+            if out and not (token.kind == "op" and value in _NO_SPACE_BEFORE) and not out.endswith(("(", ".")):
+                previous = tokens[i - 1]
+                if not (_op(token, "(") and is_identifier(previous) and not is_keyword(previous, *_SPACED_BEFORE_PAREN)):
+                    out += " "
+            out += value
+            i += 1
+        return out
+
+
+def _clauses(tokens):
+    """{keyword: tokens after it} for the top-level SELECT clauses, or None if they are out of order."""
+    positions = []
+    for word in _CLAUSES:
+        index = top_level_keyword_index(tokens, word)
+        if index >= 0:
+            positions.append((index, word))
+    positions.sort()
+    found = [word for _, word in positions]
+    if found != [word for word in _CLAUSES if word in found]:
+        return None
+    clauses = {}
+    for n, (index, word) in enumerate(positions):
+        end = positions[n + 1][0] if n + 1 < len(positions) else len(tokens)
+        body = tokens[index + 1:end]
+        if word in ("GROUP", "ORDER"):
+            if not body or not is_keyword(body[0], "BY"):
+                return None
+            body = body[1:]
+        clauses[word] = body
+    clauses["SELECT"] = tokens[1:positions[0][0]] if positions else tokens[1:]
+    return clauses
+
+
+def _table_ref(tokens, i, aliases):
+    """Parse `name [[AS] alias]` at tokens[i]; returns (table, next index) or None."""
+    if i >= len(tokens) or not is_identifier(tokens[i]) or is_keyword(tokens[i], *_ALIAS_STOP_WORDS):
+        return None
+    table = tokens[i].value
+    i += 1
+    if i + 1 < len(tokens) and _op(tokens[i], ".") and is_identifier(tokens[i + 1]):
+        table = tokens[i + 1].value
+        i += 2
+    aliases[table.lower()] = table
+    if i < len(tokens) and is_keyword(tokens[i], "AS"):
+        i += 1
+    if i < len(tokens) and is_identifier(tokens[i]) and not is_keyword(tokens[i], *_ALIAS_STOP_WORDS):
+        aliases[tokens[i].value.lower()] = table
+        i += 1
+    return table, i
+
+
+def _parse_from(tokens, aliases):
+    """(first table, [(join kind, table, ON tokens, USING columns)]) or None."""
+    ref = _table_ref(tokens, 0, aliases)
+    if ref is None:
+        return None
+    base, i = ref
+    joins = []
+    while i < len(tokens):
+        if _op(tokens[i], ","):
+            kind = "CROSS"
+            i += 1
+        else:
+            words = []
+            while i < len(tokens) and is_keyword(tokens[i], *_JOIN_WORDS):
+                words.append(tokens[i].value.upper())
+                i += 1
+            if not words or words[-1] not in ("JOIN", "STRAIGHT_JOIN"):
+                return None
+            kind = "LEFT" if "LEFT" in words else "RIGHT" if "RIGHT" in words else "CROSS" if "CROSS" in words else "INNER"
+        ref = _table_ref(tokens, i, aliases)
+        if ref is None:
+            return None
+        table, i = ref
+        condition, using = [], []
+        if i < len(tokens) and is_keyword(tokens[i], "ON", "USING"):
+            start = i + 1
+            i = start
+            depth = 0
+            while i < len(tokens) and not (depth == 0 and (_op(tokens[i], ",") or is_keyword(tokens[i], *_JOIN_WORDS))):
+                depth += _op(tokens[i], "(") - _op(tokens[i], ")")
+                i += 1
+            condition = tokens[start:i]
+            if is_keyword(tokens[start - 1], "USING"):
+                condition, using = [], [t.value for t in condition if is_identifier(t)]
+        joins.append((kind, table, condition, using))
+    return base, joins
+
+
+def _describe_pattern(pattern, negated):
+    text = pattern[1:-1] if len(pattern) >= 2 and pattern[0] == pattern[-1] and pattern[0] in "'\"" else None
+    inner = (text or "").strip("%")
+    if text is None or not inner or "_" in inner or "%" in inner:
+        return f"does not match the pattern {pattern}" if negated else f"matches the pattern {pattern}"
+    if text.startswith("%") and text.endswith("%"):
+        verb = "contain" if negated else "contains"
+    elif text.endswith("%"):
+        verb = "start with" if negated else "starts with"
+    elif text.startswith("%"):
+        verb = "end with" if negated else "ends with"
+    else:
+        return f"is {'not ' if negated else ''}'{inner}'"
+    return f"{'does not ' if negated else ''}{verb} '{inner}'"
+
+
+def _describe_condition(tokens, render):
+    """Plain-English form of one AND-ed condition, or None when it is incomplete."""
+    if len(tokens) >= 3 and is_keyword(tokens[-1], "NULL") and is_keyword(tokens[-2], "IS", "NOT"):
+        negated = is_keyword(tokens[-2], "NOT")
+        subject = tokens[:-3] if negated else tokens[:-2]
+        return f"{render(subject)} is {'set' if negated else 'empty (NULL)'}"
+    depth = 0
+    for k, token in enumerate(tokens):
+        if _op(token, "("):
+            depth += 1
+        elif _op(token, ")"):
+            depth -= 1
+        if depth or k == 0:
+            continue
+        negated = is_keyword(tokens[k - 1], "NOT")
+        subject = render(tokens[:k - 1] if negated else tokens[:k])
+        rest = tokens[k + 1:]
+        if token.kind == "op" and token.value in _COMPARISONS:
+            return f"{subject} {_COMPARISONS[token.value]} {render(rest)}" if subject and rest else None
+        if is_keyword(token, "IN") and rest and _op(rest[0], "(") and _op(rest[-1], ")"):
+            values = [render(part) for part in _split_top_level(rest[1:-1], ",")]
+            if not subject or not values:
+                return None
+            return f"{subject} is {'not ' if negated else ''}one of {_listing(values)}"
+        if is_keyword(token, "BETWEEN"):
+            split = next((j for j, t in enumerate(rest) if is_keyword(t, "AND")), -1)
+            if split <= 0 or split == len(rest) - 1 or not subject:
+                return None
+            low, high = render(rest[:split]), render(rest[split + 1:])
+            return f"{subject} is {'not ' if negated else ''}between {low} and {high}"
+        if is_keyword(token, "LIKE") and len(rest) == 1 and rest[0].kind == "string":
+            return f"{subject} {_describe_pattern(rest[0].value, negated)}"
+    return render(tokens)
+
+
+def _describe_filter(tokens, render):
+    """'x is 5 and y is set', or None when the filter is empty, incomplete or too long to read well."""
+    if not tokens or is_keyword(tokens[0], "AND", "OR") or is_keyword(tokens[-1], "AND", "OR", "NOT"):
+        return None
+    conditions = _split_top_level(tokens, "AND")
+    if len(conditions) > MAX_CONDITIONS:
+        return None
+    described = [
+        f"({render(part)})" if top_level_keyword_index(part, "OR") >= 0 else _describe_condition(part, render)
+        for part in conditions
+    ]
+    return None if None in described else _listing(described)
+
+
+def _describe_select_item(tokens, render):
+    alias = None
+    if len(tokens) >= 3 and is_keyword(tokens[-2], "AS") and is_identifier(tokens[-1]):
+        alias, tokens = tokens[-1].value, tokens[:-2]
+    elif (len(tokens) >= 2 and is_identifier(tokens[-1]) and not is_keyword(tokens[-2], "DISTINCT")
+            and (is_identifier(tokens[-2]) or _op(tokens[-2], ")"))):
+        alias, tokens = tokens[-1].value, tokens[:-1]
+    if len(tokens) == 1 and _op(tokens[0], "*"):
+        return "all columns"
+    if len(tokens) == 3 and _op(tokens[1], ".") and _op(tokens[2], "*"):
+        return f"all columns of {render.aliases.get(tokens[0].value.lower(), tokens[0].value)}"
+    is_column = all(is_identifier(t) or _op(t, ".") for t in tokens)
+    if is_column:
+        description = render(tokens)
+    elif (len(tokens) >= 4 and tokens[0].kind == "name" and tokens[0].value.upper() in _AGGREGATES
+            and _op(tokens[1], "(") and _op(tokens[-1], ")")):
+        args = tokens[2:-1]
+        word = _AGGREGATES[tokens[0].value.upper()]
+        if len(args) == 1 and _op(args[0], "*"):
+            description = "the number of rows"
+        elif args and is_keyword(args[0], "DISTINCT"):
+            description = f"{word} distinct {render(args[1:])} values"
+        else:
+            description = f"{word} {render(args)}" + (" values" if word == "the number of" else "")
+    else:
+        description = render(tokens)
+    if alias and alias != description:
+        description += f" (as {alias})"
+    return description
+
+
+def _describe_order(tokens, render):
+    items = []
+    for part in _split_top_level(tokens, ","):
+        direction = ""
+        if is_keyword(part[-1], "DESC"):
+            direction, part = " descending", part[:-1]
+        elif is_keyword(part[-1], "ASC"):
+            direction, part = " ascending", part[:-1]
+        items.append(render(part) + direction)
+    return _listing(items)
+
+
+def _describe_limit(tokens):
+    values = [t.value for t in tokens if t.kind == "number"]
+    if len(tokens) == 1 and values:
+        return f"limited to {values[0]} rows"
+    if len(values) == 2 and len(tokens) == 3 and _op(tokens[1], ","):
+        return f"limited to {values[1]} rows after skipping the first {values[0]}"
+    if len(values) == 2 and len(tokens) == 3 and is_keyword(tokens[1], "OFFSET"):
+        return f"limited to {values[0]} rows after skipping the first {values[1]}"
+    return None
+
+
+def _explain_select(tokens):
+    clauses = _clauses(tokens)
+    if clauses is None or "FROM" not in clauses:
+        return None
+    aliases = {}
+    parsed = _parse_from(clauses["FROM"], aliases)
+    if parsed is None or len(parsed[1]) > MAX_JOINS:
+        return None
+    base, joins = parsed
+    render = _Renderer(aliases, qualify=bool(joins))
+    select = clauses["SELECT"]
+    distinct = bool(select) and is_keyword(select[0], "DISTINCT")
+    items = _split_top_level(select[1:] if distinct else select, ",")
+    if not items:
+        return None
+    columns = [_describe_select_item(item, render) for item in items]
+    if len(columns) > 6:
+        columns = columns[:5] + [f"{len(columns) - 5} more columns"]
+    what = _listing(columns)
+    if distinct:
+        what = f"the distinct {'combinations' if len(items) > 1 else 'values'} of {what}"
+    sentence = f"This query retrieves {what} from the {base} table"
+    for kind, table, condition, using in joins:
+        on = f"matching on {_listing(using)}" if using else f"on {render(condition)}"
+        if kind == "CROSS" and not (condition or using):
+            sentence += f", combined with every row of {table}"
+        elif kind == "LEFT":
+            sentence += f", together with related {table} rows where they exist ({on})"
+        elif kind == "RIGHT":
+            sentence += f", keeping every {table} row even without a match ({on})"
+        else:
+            sentence += f", joined with {table} ({on})"
+    if "WHERE" in clauses:
+        condition = _describe_filter(clauses["WHERE"], render)
+        if condition is None:
+            return None
+        sentence += f", for rows where {condition}"
+    details = []
+    if "GROUP" in clauses:
+        details.append(f"grouped by {_listing(render(part) for part in _split_top_level(clauses['GROUP'], ','))}")
+    if "HAVING" in clauses:
+        condition = _describe_filter(clauses["HAVING"], render)
+        if condition is None:
+            return None
+        details.append(f"keeping only groups where {condition}")
+    if "ORDER" in clauses:
+        details.append(f"sorted by {_describe_order(clauses['ORDER'], render)}")
+    if "LIMIT" in clauses:
+        limit = _describe_limit(clauses["LIMIT"])
+        if limit is None:
+            return None
+        details.append(limit)
+    explanation = sentence + "."
+    if details:
+        explanation += f" The results are {_listing(details)}."
+    return explanation
+
+
+def _explain_insert(tokens):
+    i = 1
+    while i < len(tokens) and is_keyword(tokens[i], "IGNORE", "INTO", "LOW_PRIORITY", "HIGH_PRIORITY", "DELAYED"):
+        i += 1
+    aliases = {}
+    ref = _table_ref(tokens, i, aliases)
+    if ref is None:
+        return None
+    table, i = ref
+    columns = []
+    if i < len(tokens) and _op(tokens[i], "("):
+        end = next((j for j in range(i, len(tokens)) if _op(tokens[j], ")")), -1)
+        columns = [t.value for t in tokens[i + 1:end] if is_identifier(t)]
+        i = end + 1
+    if i >= len(tokens) or not is_keyword(tokens[i], "VALUES", "VALUE"):
+        return None
+    rows = sum(1 for part in _split_top_level(tokens[i + 1:], ",") if _op(part[0], "("))
+    update = top_level_keyword_index(tokens, "DUPLICATE", start=i) >= 0
+    explanation = f"This query inserts {rows} row{'s' if rows != 1 else ''} into the {table} table"
+    if columns:
+        explanation += f", setting {_listing(columns)}"
+    explanation += "."
+    if update:
+        explanation += " Rows that clash with an existing unique key update that row instead."
+    return explanation
+
+
+def _explain_update(tokens):
+    aliases = {}
+    i = 1
+    while i < len(tokens) and is_keyword(tokens[i], "LOW_PRIORITY", "IGNORE"):
+        i += 1
+    ref = _table_ref(tokens, i, aliases)
+    if ref is None or ref[1] >= len(tokens) or not is_keyword(tokens[ref[1]], "SET"):
+        return None
+    table, i = ref
+    render = _Renderer(aliases, qualify=False)
+    end = top_level_keyword_index(tokens, "WHERE", "ORDER", "LIMIT", start=i)
+    end = len(tokens) if end < 0 else end
+    assignments = []
+    for part in _split_top_level(tokens[i + 1:end], ","):
+        if len(part) < 3 or not _op(part[1], "="):
+            return None
+        assignments.append(f"{render(part[:1])} to {render(part[2:])}")
+    if not assignments:
+        return None
+    scope = _where_and_limit(tokens, end, render)
+    if scope is None:
+        return None
+    condition, limit, order = scope
+    if condition:
+        where = f"for rows where {condition}." + (f" At most {limit} rows are affected{order}." if limit else "")
+    elif limit:
+        where = f"for at most {limit} rows{order}."
+    else:
+        where = "for every row."
+    return f"This query updates the {table} table, setting {_listing(assignments)}, {where}"
+
+
+def _explain_delete(tokens):
+    if len(tokens) < 3 or not is_keyword(tokens[1], "FROM"):
+        return None
+    aliases = {}
+    ref = _table_ref(tokens, 2, aliases)
+    if ref is None:
+        return None
+    table, i = ref
+    render = _Renderer(aliases, qualify=False)
+    if i < len(tokens) and not is_keyword(tokens[i], "WHERE", "ORDER", "LIMIT"):
+        return None
+    scope = _where_and_limit(tokens, i, render)
+    if scope is None:
+        return None
+    condition, limit, order = scope
+    if condition:
+        note = f" At most {limit} rows are affected{order}." if limit else ""
+        return f"This query deletes the rows of the {table} table where {condition}.{note}"
+    if limit:
+        return f"This query deletes at most {limit} rows from the {table} table{order}."
+    return f"This query deletes every row from the {table} table."
+
+
+def _where_and_limit(tokens, i, render):
+    """
+    (WHERE description or "", LIMIT row count or None, ", in order of ..." or "") for UPDATE/DELETE,
+    or None if unsupported.
+    """
+    clauses = _clauses([tokens[0]] + tokens[i:]) if i < len(tokens) else {}
+    if clauses is None or clauses.get("SELECT") or "FROM" in clauses or "GROUP" in clauses or "HAVING" in clauses:
+        return None
+    condition = ""
+    if "WHERE" in clauses:
+        condition = _describe_filter(clauses["WHERE"], render)
+        if condition is None:
+            return None
+    limit, order = None, ""
+    if "LIMIT" in clauses:
+        values = [t.value for t in clauses["LIMIT"] if t.kind == "number"]
+        if len(values) != 1 or len(clauses["LIMIT"]) != 1:
+            return None
+        limit = values[0]
+        order = f", in order of {_describe_order(clauses['ORDER'], render)}" if "ORDER" in clauses else ""
+    return condition, limit, order
+
+
+def _explain_show(tokens):
+    words = [t.value.upper() for t in tokens[1:] if t.kind == "name"]
+    table = next((t.value for j, t in enumerate(tokens) if j and is_keyword(tokens[j - 1], "FROM", "IN", "TABLE") and is_identifier(t)), None)
+    if words[:1] in (["TABLES"], ["FULL"]) and "TABLES" in words[:2]:
+        return "This query lists all tables in the current database."
+    if words[:1] == ["DATABASES"]:
+        return "This query lists the databases on the server."
+    if words and words[0] in ("COLUMNS", "FIELDS", "FULL") and table:
+        return f"This query lists the columns of the {table} table with their data types, nullability, keys and defaults."
+    if words and words[0] in ("INDEX", "INDEXES", "KEYS") and table:
+        return f"This query lists the indexes defined on the {table} table and the columns each one covers."
+    if words[:2] == ["CREATE", "TABLE"] and table:
+        return f"This query shows the CREATE TABLE statement that defines the {table} table."
+    return None
+
+
+def explain_sql(sql):
+    """Template explanation of a single common statement, or None when the model should explain it."""
+    statements = split_statements(sql)
+    if len(statements) != 1:
+        return None
+    tokens = tokenize(statements[0])
+    if not tokens or len(tokens) > MAX_TOKENS or tokens[0].kind != "name":
+        return None
+    keyword = tokens[0].value.upper()
+    if keyword in ("DESCRIBE", "DESC") and len(tokens) == 2 and is_identifier(tokens[1]):
+        return (
+            f"This query describes the structure of the {tokens[1].value} table: its columns, their data types, "
+            "whether they allow NULL, and which ones are keys."
+        )
+    if keyword == "SHOW":
+        return _explain_show(tokens)
+    if any(is_keyword(t, *_UNSUPPORTED) for t in tokens) or sum(is_keyword(t, "SELECT") for t in tokens) > (keyword == "SELECT"):
+        return None
+    if keyword == "SELECT":
+        if any(is_keyword(t, *_UNSUPPORTED_IN_SELECT) for t in tokens):
+            return None
+        return _explain_select(tokens)
+    if keyword in ("INSERT", "REPLACE"):
+        return _explain_insert(tokens)
+    if keyword == "UPDATE":
+        return _explain_update(tokens)
+    if keyword == "DELETE":
+        return _explain_delete(tokens)
+    return None
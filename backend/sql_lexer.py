@@ -0,0 +1,105 @@
+"""Minimal SQL tokenizer used to inspect generated statements without a database round trip."""
+import re
+from collections import namedtuple
+
+Token = namedtuple("Token", ["kind", "value", "pos", "end"])
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?(?:\*/|$))
+  | (?P<string>'(?:[^'\\]|\\.|'')*'?|"(?:[^"\\]|\\.|"")*"?)
+  | (?P<quoted>`(?:[^`]|``)*`?)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+  | (?P<param>%s|\?)
+  | (?P<name>[A-Za-z_$@][\w$@]*)
+  | (?P<op><=>|<=|>=|<>|!=|:=|\|\||&&|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def tokenize(sql):
+    """Split SQL into tokens, dropping whitespace and comments. Backtick identifiers become 'ident' tokens."""
+    tokens = []
+    for match in _TOKEN_RE.finditer(sql or ""):
+        kind = match.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        value = match.group()
+        if kind == "quoted":
+            kind = "ident"
+            value = value.strip("`").replace("``", "`")
+        tokens.append(Token(kind, value, match.start(), match.end()))
+    return tokens
+
+
+def canonical_sql(sql):
+    """sql with whitespace and comments collapsed, unquoted names upper-cased and semicolons dropped (literals kept)."""
+    return " ".join(
+        token.value.upper() if token.kind == "name" else token.value
+        for token in tokenize(sql) if not (token.kind == "op" and token.value == ";")
+    )
+
+
+def is_keyword(token, *words):
+    """True if token is an unquoted name matching one of the given keywords (case-insensitive)."""
+    return token.kind == "name" and token.value.upper() in words
+
+
+def is_identifier(token):
+    """True for bare names and backtick-quoted identifiers."""
+    return token.kind in ("name", "ident")
+
+
+def split_statements(sql):
+    """Split a script on top-level semicolons, ignoring those inside strings, identifiers and comments."""
+    statements = []
+    start = 0
+    for token in tokenize(sql):
+        if token.kind == "op" and token.value == ";":
+            part = sql[start:token.pos].strip()
+            if part:
+                statements.append(part)
+            start = token.pos + 1
+    tail = (sql or "")[start:].strip()
+    if tail:
+        statements.append(tail)
+    return statements
+
+
+def statement_keyword(sql):
+    """First keyword of a statement, upper-cased ('' if none)."""
+    for token in tokenize(sql):
+        if token.kind == "name":
+            return token.value.upper()
+        if not (token.kind == "op" and token.value == "("):
+            return ""
+    return ""
+
+
+def matching_paren(tokens, i):
+    """Index of the ')' closing the '(' at tokens[i], or -1."""
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j].kind == "op" and tokens[j].value == "(":
+            depth += 1
+        elif tokens[j].kind == "op" and tokens[j].value == ")":
+            depth -= 1
+            if depth == 0:
+                return j
+    return -1
+
+
+def top_level_keyword_index(tokens, *words, start=0):
+    """Index of the first token at parenthesis depth 0 matching one of words, or -1."""
+    depth = 0
+    for i in range(start, len(tokens)):
+        token = tokens[i]
+        if token.kind == "op" and token.value == "(":
+            depth += 1
+        elif token.kind == "op" and token.value == ")":
+            depth -= 1
+        elif depth == 0 and is_keyword(token, *words):
+            return i
+    return -1
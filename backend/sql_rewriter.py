@@ -0,0 +1,264 @@
+"""
+Rule-based rewrites applied to generated SQL so it can use the indexes recorded in the cached schema.
+Each rule reports whether it fired; rules that can't safely rewrite only annotate. Rewrites use
+plain literals or the active driver's quoting, so they stay valid on every DB_DRIVER.
+"""
+import datetime
+import os
+try:
+    from .db_driver import get_driver
+    from .schema_handler import get_indexed_columns
+    from .sql_lexer import tokenize, split_statements, is_keyword, is_identifier, matching_paren, top_level_keyword_index
+except ImportError:
+    from db_driver import get_driver
+    from schema_handler import get_indexed_columns
+    from sql_lexer import tokenize, split_statements, is_keyword, is_identifier, matching_paren, top_level_keyword_index
+
+REWRITE_ENABLED = os.getenv("SQL_REWRITE", "1") == "1"
+
+_AGGREGATES = ("COUNT", "SUM", "AVG", "MIN", "MAX", "GROUP_CONCAT", "STD", "STDDEV", "VARIANCE", "JSON_ARRAYAGG")
+_DATE_TYPES = ("date", "datetime", "timestamp")
+_COMPARISONS = ("=", ">", ">=", "<", "<=")
+# A comparison is only rewritten when it stands alone between these, so no operator binds to its operands
+_PREDICATE_BEFORE = ("WHERE", "ON", "HAVING", "AND", "OR", "NOT", "WHEN")
+_PREDICATE_AFTER = ("AND", "OR", "THEN", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "WINDOW", "FOR")
+_ALIAS_STOP_WORDS = (
+    "WHERE", "JOIN", "INNER", "LEFT", "RIGHT", "CROSS", "STRAIGHT_JOIN", "NATURAL", "ON", "USING",
+    "GROUP", "ORDER", "LIMIT", "SET", "HAVING", "UNION", "FOR",
+)
+
+
+def _note(notes, rule, applied, detail):
+    notes.append({"rule": rule, "applied": applied, "detail": detail})
+
+
+def table_aliases(tokens, schema):
+    """Map lowercase alias/table name -> schema table for every FROM/JOIN/UPDATE reference."""
+    aliases = {}
+    for i, token in enumerate(tokens):
+        if not is_keyword(token, "FROM", "JOIN", "UPDATE") or i + 1 >= len(tokens):
+            continue
+        name = tokens[i + 1]
+        if not is_identifier(name) or name.value not in schema:
+            continue
+        aliases[name.value.lower()] = name.value
+        j = i + 2
+        if j < len(tokens) and is_keyword(tokens[j], "AS"):
+            j += 1
+        if j < len(tokens) and is_identifier(tokens[j]) and not is_keyword(tokens[j], *_ALIAS_STOP_WORDS):
+            aliases[tokens[j].value.lower()] = name.value
+    return aliases
+
+
+def resolve_column(tokens, i, aliases, schema):
+    """Resolve the column reference starting at tokens[i] -> (table, column, next_index) or None."""
+    if i >= len(tokens) or not is_identifier(tokens[i]):
+        return None
+    if i + 2 < len(tokens) and tokens[i + 1].value == "." and is_identifier(tokens[i + 2]):
+        table = aliases.get(tokens[i].value.lower())
+        column = tokens[i + 2].value
+        return (table, column, i + 3) if table and column in schema[table] else None
+    column = tokens[i].value
+    owners = {t for t in aliases.values() if column in schema[t]}
+    return (owners.pop(), column, i + 1) if len(owners) == 1 else None
+
+
+def _literal_value(token):
+    if token.kind == "number":
+        return token.value
+    if token.kind == "string" and token.value[0] == "'":
+        return token.value[1:-1]
+    return None
+
+
+def _year_range(op, year, column):
+    """Sargable equivalent of YEAR(column) <op> year."""
+    start, end = f"'{year}-01-01'", f"'{year + 1}-01-01'"
+    return {
+        "=": f"({column} >= {start} AND {column} < {end})",
+        ">": f"{column} >= {end}",
+        ">=": f"{column} >= {start}",
+        "<": f"{column} < {start}",
+        "<=": f"{column} < {end}",
+    }[op]
+
+
+def _date_range(op, day, column):
+    """Sargable equivalent of DATE(column) <op> 'day' (None if day is not a valid date)."""
+    try:
+        next_day = datetime.date.fromisoformat(day) + datetime.timedelta(days=1)
+    except ValueError:
+        return None
+    start, end = f"'{day}'", f"'{next_day.isoformat()}'"
+    return {
+        "=": f"({column} >= {start} AND {column} < {end})",
+        ">": f"{column} >= {end}",
+        ">=": f"{column} >= {start}",
+        "<": f"{column} < {start}",
+        "<=": f"{column} < {end}",
+    }[op]
+
+
+def _standalone_predicate(tokens, first, last):
+    """True if tokens[first:last + 1] is a whole predicate rather than an operand of a wider expression."""
+    before = tokens[first - 1] if first > 0 else None
+    after = tokens[last + 1] if last + 1 < len(tokens) else None
+    before_ok = before is None or before.value == "(" or is_keyword(before, *_PREDICATE_BEFORE)
+    after_ok = after is None or after.value in (")", ";") or is_keyword(after, *_PREDICATE_AFTER)
+    return before_ok and after_ok
+
+
+def _rewrite_date_functions(sql, tokens, schema, aliases, edits, notes):
+    for i, token in enumerate(tokens):
+        if not is_keyword(token, "YEAR", "DATE") or i + 1 >= len(tokens) or tokens[i + 1].value != "(":
+            continue
+        resolved = resolve_column(tokens, i + 2, aliases, schema)
+        if not resolved:
+            continue
+        table, column, close = resolved
+        if close + 2 >= len(tokens) or tokens[close].value != ")":
+            continue
+        op, literal = tokens[close + 1], tokens[close + 2]
+        value = _literal_value(literal)
+        if op.kind != "op" or op.value not in _COMPARISONS or value is None:
+            continue
+        if not _standalone_predicate(tokens, i, close + 2):
+            continue
+        if column not in get_indexed_columns(schema, table):
+            continue
+        col_type = (schema[table][column].get("type") or "").lower()
+        if not col_type.startswith(_DATE_TYPES):
+            continue
+        column_sql = sql[tokens[i + 2].pos:tokens[close - 1].end]
+        if token.value.upper() == "YEAR":
+            if not value.isdigit():
+                continue
+            replacement = _year_range(op.value, int(value), column_sql)
+        else:
+            if len(value) != 10 or value[4] != "-" or value[7] != "-":
+                continue
+            replacement = _date_range(op.value, value, column_sql)
+            if replacement is None:
+                continue
+        original = sql[token.pos:literal.end]
+        edits.append((token.pos, literal.end, replacement))
+        _note(notes, "sargable_date_function", True, f"{original} -> {replacement}")
+
+
+def _annotate_non_sargable(tokens, schema, aliases, notes):
+    for i, token in enumerate(tokens):
+        if is_keyword(token, "LIKE") and i + 1 < len(tokens) and tokens[i + 1].kind == "string":
+            pattern = tokens[i + 1].value[1:-1]
+            if not pattern.startswith(("%", "_")):
+                continue
+            start = i - 3 if i >= 3 and tokens[i - 2].value == "." else i - 1
+            resolved = resolve_column(tokens, start, aliases, schema)
+            if resolved and resolved[1] in get_indexed_columns(schema, resolved[0]):
+                _note(
+                    notes, "leading_wildcard_like", False,
+                    f"LIKE '{pattern}' on indexed column {resolved[0]}.{resolved[1]} cannot use its index",
+                )
+        elif is_keyword(token, "LOWER", "UPPER", "TRIM", "SUBSTRING", "LEFT", "CAST") and i + 1 < len(tokens) and tokens[i + 1].value == "(":
+            resolved = resolve_column(tokens, i + 2, aliases, schema)
+            if resolved and resolved[2] < len(tokens) and tokens[resolved[2]].value in (")", ","):
+                if resolved[1] in get_indexed_columns(schema, resolved[0]):
+                    _note(
+                        notes, "function_on_indexed_column", False,
+                        f"{token.value.upper()}() around indexed column {resolved[0]}.{resolved[1]} prevents index use",
+                    )
+
+
+def _push_limit_into_subquery(tokens, edits, notes):
+    """SELECT cols FROM (SELECT ...) x LIMIT n  ->  inner query also gets LIMIT n (+ offset)."""
+    if not tokens or not is_keyword(tokens[0], "SELECT"):
+        return
+    from_idx = top_level_keyword_index(tokens, "FROM")
+    if from_idx == -1 or from_idx + 2 >= len(tokens) or tokens[from_idx + 1].value != "(":
+        return
+    if not is_keyword(tokens[from_idx + 2], "SELECT"):
+        return
+    for j in range(1, from_idx):
+        if is_keyword(tokens[j], "DISTINCT", "OVER", *_AGGREGATES):
+            return
+    close = matching_paren(tokens, from_idx + 1)
+    if close == -1:
+        return
+    inner = tokens[from_idx + 2:close]
+    if top_level_keyword_index(inner, "LIMIT", "UNION") != -1:
+        return
+    k = close + 1
+    if k < len(tokens) and is_keyword(tokens[k], "AS"):
+        k += 1
+    if k < len(tokens) and is_identifier(tokens[k]) and not is_keyword(tokens[k], "LIMIT"):
+        k += 1
+    if k >= len(tokens) or not is_keyword(tokens[k], "LIMIT"):
+        return
+    rest = [t for t in tokens[k + 1:] if t.value != ";"]
+    if len(rest) == 1 and rest[0].kind == "number":
+        rows = int(rest[0].value)
+    elif len(rest) == 3 and rest[1].value == "," and rest[0].kind == rest[2].kind == "number":
+        rows = int(rest[0].value) + int(rest[2].value)
+    elif len(rest) == 3 and is_keyword(rest[1], "OFFSET") and rest[0].kind == rest[2].kind == "number":
+        rows = int(rest[0].value) + int(rest[2].value)
+    else:
+        return
+    edits.append((tokens[close].pos, tokens[close].pos, f" LIMIT {rows}"))
+    _note(notes, "limit_pushdown", True, f"LIMIT {rows} pushed into derived table")
+
+
+def _project_select_star(tokens, schema, columns, edits, notes):
+    """SELECT * FROM t ... -> SELECT <requested columns> when the caller only needs a projection."""
+    if len(tokens) < 4 or not is_keyword(tokens[0], "SELECT") or tokens[1].value != "*":
+        return
+    if not is_keyword(tokens[2], "FROM") or not is_identifier(tokens[3]) or tokens[3].value not in schema:
+        return
+    if top_level_keyword_index(tokens, "JOIN", "GROUP", "UNION") != -1:
+        return
+    end = top_level_keyword_index(tokens, "WHERE", "ORDER", "LIMIT")
+    if any(t.value == "," for t in tokens[4:end if end != -1 else len(tokens)]):
+        return
+    table = tokens[3].value
+    wanted = [c for c in columns if c in schema[table]]
+    if not wanted:
+        return
+    quote = get_driver().quote
+    projection = ", ".join(quote(c) for c in wanted)
+    edits.append((tokens[1].pos, tokens[1].end, projection))
+    _note(notes, "select_star_projection", True, f"SELECT * -> SELECT {projection}")
+
+
+def _rewrite_statement(sql, schema, columns):
+    tokens = tokenize(sql)
+    notes, edits = [], []
+    if not tokens or not is_keyword(tokens[0], "SELECT", "UPDATE", "DELETE"):
+        return sql, notes
+    aliases = table_aliases(tokens, schema)
+    _rewrite_date_functions(sql, tokens, schema, aliases, edits, notes)
+    _annotate_non_sargable(tokens, schema, aliases, notes)
+    if is_keyword(tokens[0], "SELECT"):
+        _push_limit_into_subquery(tokens, edits, notes)
+        if columns:
+            _project_select_star(tokens, schema, columns, edits, notes)
+    for start, end, replacement in sorted(edits, reverse=True):
+        sql = sql[:start] + replacement + sql[end:]
+    return sql, notes
+
+
+def rewrite_sql(sql, schema, columns=None):
+    """
+    Apply index-friendly rewrites to every statement in sql.
+    columns: optional list of column names the caller needs (enables SELECT * projection).
+    Returns (rewritten_sql, notes) where notes is a list of {"rule", "applied", "detail"}.
+    """
+    statements = split_statements(sql)
+    if not statements:
+        return sql, []
+    rewritten, notes = [], []
+    for statement in statements:
+        new_statement, statement_notes = _rewrite_statement(statement, schema, columns)
+        rewritten.append(new_statement)
+        notes.extend(statement_notes)
+    if not any(note["applied"] for note in notes):
+        return sql, notes
+    suffix = ";" if sql.rstrip().endswith(";") else ""
+    return ";\n".join(rewritten) + suffix, notes
@@ -0,0 +1,452 @@
+"""
+Offline validation of generated SQL against the cached schema.
+Catches unknown tables, unknown columns and ambiguous column names before the
+statement is sent to MySQL, with "did you mean" suggestions by edit distance.
+"""
+import time
+try:
+    from .sql_lexer import tokenize, split_statements, is_keyword, is_identifier
+except ImportError:
+    from sql_lexer import tokenize, split_statements, is_keyword, is_identifier
+
+_KEYWORDS = frozenset("""
+    ACCESSIBLE ADD ALL ALTER ANALYZE AND ANY AS ASC ASENSITIVE BEFORE BETWEEN BIGINT BINARY BLOB BOTH BY CALL
+    CASCADE CASE CHANGE CHAR CHARACTER CHECK COLLATE COLUMN CONDITION CONSTRAINT CONTINUE CONVERT CREATE CROSS
+    CUBE CURRENT CURRENT_DATE CURRENT_TIME CURRENT_TIMESTAMP CURRENT_USER CURSOR DATABASE DATABASES DECIMAL
+    DECLARE DEFAULT DELAYED DELETE DESC DESCRIBE DETERMINISTIC DISTINCT DISTINCTROW DIV DOUBLE DROP DUAL
+    DUPLICATE EACH ELSE ELSEIF ENCLOSED END ESCAPE ESCAPED EXCEPT EXISTS EXIT EXPLAIN FALSE FETCH FIRST FLOAT
+    FOLLOWING FOR FORCE FOREIGN FROM FULL FULLTEXT FUNCTION GENERATED GRANT GROUP GROUPS HAVING HIGH_PRIORITY
+    IF IGNORE IN INDEX INFILE INNER INOUT INSENSITIVE INSERT INT INTEGER INTERSECT INTERVAL INTO IS ITERATE
+    JOIN JSON KEY KEYS KILL LAST LATERAL LEADING LEAVE LEFT LIKE LIMIT LINEAR LINES LOAD LOCALTIME
+    LOCALTIMESTAMP LOCK LONG LOOP LOW_PRIORITY MATCH MOD MODE NATURAL NOT NULL NULLS NUMERIC OF OFFSET ON
+    OPTIMIZE OPTION OPTIONALLY OR ORDER OUT OUTER OUTFILE OVER PARTITION PRECEDING PRIMARY PROCEDURE QUICK
+    RANGE READ RECURSIVE REFERENCES REGEXP RELEASE RENAME REPEAT REPLACE REQUIRE RESTRICT RETURN REVOKE RIGHT
+    RLIKE ROLLUP ROW ROWS SCHEMA SCHEMAS SELECT SEPARATOR SET SHARE SHOW SIGNED SMALLINT SOME SPATIAL
+    SQL_CALC_FOUND_ROWS SQL_NO_CACHE STARTING STRAIGHT_JOIN TABLE TABLES TERMINATED THEN TINYINT TO TRAILING
+    TRIGGER TRUE UNBOUNDED UNION UNIQUE UNKNOWN UNLOCK UNSIGNED UPDATE USAGE USE USING UTC_DATE UTC_TIME
+    UTC_TIMESTAMP VALUE VALUES VARCHAR WHEN WHERE WHILE WINDOW WITH WRITE XOR ZEROFILL
+""".split())
+
+_INTERVAL_UNITS = frozenset("""
+    MICROSECOND SECOND MINUTE HOUR DAY WEEK MONTH QUARTER YEAR SECOND_MICROSECOND MINUTE_MICROSECOND
+    MINUTE_SECOND HOUR_MICROSECOND HOUR_SECOND HOUR_MINUTE DAY_MICROSECOND DAY_SECOND DAY_MINUTE DAY_HOUR
+    YEAR_MONTH
+""".split())
+
+_CHECKED_STATEMENTS = ("SELECT", "WITH", "INSERT", "REPLACE", "UPDATE", "DELETE", "DESCRIBE", "DESC", "EXPLAIN")
+_FROM_CLAUSE_END = ("WHERE", "GROUP", "HAVING", "ORDER", "LIMIT", "ON", "USING", "SET", "UNION", "WINDOW", "FOR")
+_SUBQUERY_START = ("SELECT", "WITH")
+_SET_OPERATORS = ("UNION", "INTERSECT", "EXCEPT")
+_UNIT_FUNCTIONS = ("TIMESTAMPDIFF", "TIMESTAMPADD")
+_TYPED_LITERALS = ("DATE", "TIME", "TIMESTAMP")  # DATE '2023-01-01' etc.
+
+
+class _Scope:
+    """Tables visible to one SELECT level. sources maps lowercase alias -> table name (None if opaque)."""
+
+    __slots__ = ("parent", "sources", "from_mode")
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.sources = {}
+        self.from_mode = False
+
+    def lookup(self, name):
+        scope = self
+        while scope is not None:
+            if name in scope.sources:
+                return True, scope.sources[name]
+            scope = scope.parent
+        return False, None
+
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it is known to exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def suggest(name, candidates, limit=3):
+    """Closest candidates to name by case-insensitive edit distance, best first."""
+    target = name.lower()
+    max_distance = max(2, len(target) // 3)
+    scored = []
+    for candidate in set(candidates):
+        distance = _edit_distance(target, candidate.lower(), max_distance)
+        if distance <= max_distance:
+            scored.append((distance, candidate))
+    scored.sort()
+    return [candidate for _, candidate in scored[:limit]]
+
+
+class _SchemaView:
+    """Case-insensitive table/column lookup over the schema dict, built lazily per referenced table."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._tables_lower = None
+        self._columns = {}
+
+    def find_table(self, name):
+        if name in self.schema:
+            return name
+        if self._tables_lower is None:
+            self._tables_lower = {t.lower(): t for t in self.schema}
+        return self._tables_lower.get(name.lower())
+
+    def columns(self, table):
+        cols = self._columns.get(table)
+        if cols is None:
+            cols = {c.lower() for c in self.schema.get(table, {})}
+            self._columns[table] = cols
+        return cols
+
+
+def _error(code, message, token, statement, **extra):
+    err = {"code": code, "message": message, "statement": statement, "position": token.pos}
+    err.update(extra)
+    return err
+
+
+def _is_alias_token(token):
+    return token.kind == "ident" or (token.kind == "name" and token.value.upper() not in _KEYWORDS)
+
+
+def _ends_value(token):
+    if token.kind in ("string", "number", "ident"):
+        return True
+    if token.kind == "op":
+        return token.value == ")"
+    return token.kind == "name" and token.value.upper() not in _KEYWORDS
+
+
+class _StatementChecker:
+    def __init__(self, tokens, view, statement):
+        self.tokens = tokens
+        self.view = view
+        self.statement = statement
+        self.errors = []
+        self.consumed = set()
+        self.scope_of = [None] * len(tokens)
+        self.select_aliases = set()
+        self.ctes = set()
+
+    def run(self):
+        tokens = self.tokens
+        start = 0
+        if is_keyword(tokens[0], "EXPLAIN"):
+            start = next((i for i, t in enumerate(tokens) if is_keyword(t, *_CHECKED_STATEMENTS[:6])), len(tokens))
+            if start == len(tokens) and len(tokens) > 1:
+                self._read_table_ref(1, _Scope())
+                return self.errors
+        if start >= len(tokens):
+            return self.errors
+        if is_keyword(tokens[start], "DESCRIBE", "DESC"):
+            if start + 1 < len(tokens):
+                self._read_table_ref(start + 1, _Scope())
+            return self.errors
+        if is_keyword(tokens[start], "WITH"):
+            self._collect_ctes(start)
+        self._assign_scopes(start)
+        self._check_columns(start)
+        return self.errors
+
+    def _collect_ctes(self, start):
+        tokens = self.tokens
+        depth = 0
+        expect_name = True
+        i = start + 1
+        while i < len(tokens):
+            token = tokens[i]
+            if token.kind == "op" and token.value == "(":
+                depth += 1
+            elif token.kind == "op" and token.value == ")":
+                depth -= 1
+            elif depth == 0:
+                if is_keyword(token, "RECURSIVE"):
+                    pass
+                elif expect_name and is_identifier(token):
+                    self.ctes.add(token.value.lower())
+                    self.consumed.add(i)
+                    expect_name = False
+                    if i + 1 < len(tokens) and tokens[i + 1].value == "(":
+                        i += 1
+                        while i < len(tokens) and tokens[i].value != ")":
+                            self.consumed.add(i)
+                            i += 1
+                        i += 1
+                        continue
+                elif token.kind == "op" and token.value == ",":
+                    expect_name = True
+                elif is_keyword(token, "SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE"):
+                    break
+            i += 1
+
+    def _read_table_ref(self, i, scope):
+        """Register the table reference starting at token i in scope; return the index after it."""
+        tokens = self.tokens
+        if i >= len(tokens) or not is_identifier(tokens[i]) or tokens[i].value.startswith("@"):
+            return i
+        if is_keyword(tokens[i], "DUAL", "LATERAL"):
+            return i
+        name_token = tokens[i]
+        qualified = False
+        self.consumed.add(i)
+        if i + 2 < len(tokens) and tokens[i + 1].value == "." and is_identifier(tokens[i + 2]):
+            self.consumed.update((i + 1, i + 2))
+            name_token = tokens[i + 2]
+            qualified = True
+            i += 2
+        i += 1
+        alias = None
+        if i < len(tokens) and is_keyword(tokens[i], "AS"):
+            i += 1
+        if i < len(tokens) and _is_alias_token(tokens[i]):
+            alias = tokens[i].value
+            self.consumed.add(i)
+            i += 1
+
+        name = name_token.value
+        table = None
+        if not qualified and name.lower() not in self.ctes:
+            table = self.view.find_table(name)
+            if table is None:
+                self.errors.append(
+                    _error(
+                        "unknown_table", f"Table '{name}' doesn't exist", name_token, self.statement,
+                        table=name, suggestions=suggest(name, list(self.view.schema) + list(self.ctes)),
+                    )
+                )
+        scope.sources[(alias or name).lower()] = table
+        return i
+
+    def _assign_scopes(self, start):
+        tokens = self.tokens
+        current = _Scope()
+        insert_scope = None
+        parens = []
+        i = start
+        while i < len(tokens):
+            token = tokens[i]
+            self.scope_of[i] = current
+            prev = tokens[i - 1] if i > start else None
+            if token.kind == "op" and token.value == "(":
+                derived = prev is not None and (
+                    is_keyword(prev, "FROM", "JOIN", "STRAIGHT_JOIN") or (prev.value == "," and current.from_mode)
+                )
+                if i + 1 < len(tokens) and is_keyword(tokens[i + 1], *_SUBQUERY_START):
+                    parens.append((current, derived))
+                    current = _Scope(current)
+                elif prev is not None and is_keyword(prev, "USING"):
+                    while i < len(tokens) and tokens[i].value != ")":
+                        self.consumed.add(i)
+                        i += 1
+                    i += 1
+                    continue
+                else:
+                    parens.append((None, False))
+                i += 1
+                continue
+            if token.kind == "op" and token.value == ")":
+                saved, derived = parens.pop() if parens else (None, False)
+                i += 1
+                if saved is not None:
+                    current = saved
+                    if derived:
+                        if i < len(tokens) and is_keyword(tokens[i], "AS"):
+                            i += 1
+                        if i < len(tokens) and _is_alias_token(tokens[i]):
+                            current.sources[tokens[i].value.lower()] = None
+                            self.consumed.add(i)
+                            i += 1
+                continue
+            if token.kind == "op" and token.value == "," and current.from_mode:
+                i = self._read_table_ref(i + 1, current)
+                continue
+            if token.kind != "name":
+                i += 1
+                continue
+            word = token.value.upper()
+            in_function = bool(parens) and parens[-1][0] is None
+            if word in ("FROM", "JOIN", "STRAIGHT_JOIN") and not in_function:
+                current.from_mode = True
+                i = self._read_table_ref(i + 1, current)
+                continue
+            if word in ("UPDATE", "INTO") and (i == start or (word == "INTO" and prev is not None and is_keyword(prev, "INSERT", "REPLACE", "IGNORE"))):
+                current.from_mode = word == "UPDATE"
+                if word == "INTO":
+                    insert_scope = current
+                i = self._read_table_ref(i + 1, current)
+                continue
+            # Each branch of a set operation and the source SELECT of INSERT ... SELECT see only their own tables
+            if (word in _SET_OPERATORS and not in_function) or (word == "SELECT" and current is insert_scope):
+                current = _Scope(current.parent)
+                self.scope_of[i] = current
+            if word == "DELETE" and i == start and i + 1 < len(tokens) and not is_keyword(tokens[i + 1], "FROM"):
+                while i + 1 < len(tokens) and not is_keyword(tokens[i + 1], "FROM"):
+                    i += 1
+                    self.consumed.add(i)
+            if word in _FROM_CLAUSE_END:
+                current.from_mode = False
+            i += 1
+
+    def _check_columns(self, start):
+        tokens = self.tokens
+        pending = []
+        i = start
+        while i < len(tokens):
+            token = tokens[i]
+            if i in self.consumed or not is_identifier(token) or token.value.startswith("@"):
+                i += 1
+                continue
+            if token.kind == "name" and token.value.upper() in _KEYWORDS:
+                i += 1
+                continue
+            nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+            prev = tokens[i - 1] if i > start else None
+            if nxt is not None and nxt.value == "(" and token.kind == "name":
+                i += 1
+                continue
+            if nxt is not None and nxt.kind == "string" and is_keyword(token, *_TYPED_LITERALS):
+                i += 1
+                continue
+            if nxt is not None and nxt.value == "." and i + 2 < len(tokens):
+                self._check_qualified(i)
+                i += 3
+                while i + 1 < len(tokens) and tokens[i].value == "." and is_identifier(tokens[i + 1]):
+                    i += 2
+                continue
+            if prev is not None and (prev.value == "." or is_keyword(prev, "AS", "OVER", "WINDOW", "COLLATE", "USING")):
+                if is_keyword(prev, "AS"):
+                    self.select_aliases.add(token.value.lower())
+                i += 1
+                continue
+            if token.value.upper() in _INTERVAL_UNITS and (
+                any(is_keyword(t, "INTERVAL") for t in tokens[max(start, i - 3):i])
+                or (nxt is not None and is_keyword(nxt, "FROM"))
+                or (i - 2 >= start and prev.value == "(" and is_keyword(tokens[i - 2], *_UNIT_FUNCTIONS))
+            ):
+                i += 1
+                continue
+            if prev is not None and _ends_value(prev):
+                self.select_aliases.add(token.value.lower())
+                i += 1
+                continue
+            pending.append(i)
+            i += 1
+        for i in pending:
+            self._check_unqualified(i)
+
+    def _check_qualified(self, i):
+        tokens = self.tokens
+        qualifier = tokens[i]
+        column = tokens[i + 2]
+        if i + 4 < len(tokens) and tokens[i + 3].value == ".":
+            return
+        found, table = self.scope_of[i].lookup(qualifier.value.lower())
+        if not found:
+            visible = [name for scope in self._scopes_of(i) for name in scope.sources]
+            self.errors.append(
+                _error(
+                    "unknown_table",
+                    f"Unknown table '{qualifier.value}' in column reference '{qualifier.value}.{column.value}'",
+                    qualifier, self.statement, table=qualifier.value, suggestions=suggest(qualifier.value, visible),
+                )
+            )
+            return
+        if table is None or column.value == "*" or not is_identifier(column):
+            return
+        if column.value.lower() not in self.view.columns(table):
+            self.errors.append(
+                _error(
+                    "unknown_column",
+                    f"Unknown column '{qualifier.value}.{column.value}'",
+                    column, self.statement, table=table, column=column.value,
+                    suggestions=suggest(column.value, self.view.schema.get(table, {})),
+                )
+            )
+
+    def _check_unqualified(self, i):
+        token = self.tokens[i]
+        name = token.value.lower()
+        if name in self.select_aliases:
+            return
+        scope = self.scope_of[i]
+        while scope is not None:
+            matches = [t for t in scope.sources.values() if t is not None and name in self.view.columns(t)]
+            if len(matches) > 1:
+                self.errors.append(
+                    _error(
+                        "ambiguous_column",
+                        f"Column '{token.value}' is ambiguous (found in {', '.join(sorted(set(matches)))})",
+                        token, self.statement, column=token.value, tables=sorted(set(matches)),
+                    )
+                )
+                return
+            if matches or any(t is None for t in scope.sources.values()):
+                return
+            scope = scope.parent
+        tables = [t for s in self._scopes_of(i) for t in s.sources.values() if t is not None]
+        candidates = [col for t in tables for col in self.view.schema.get(t, {})]
+        self.errors.append(
+            _error(
+                "unknown_column",
+                f"Unknown column '{token.value}'" + (f" in {', '.join(tables)}" if tables else ""),
+                token, self.statement, column=token.value, suggestions=suggest(token.value, candidates),
+            )
+        )
+
+    def _scopes_of(self, i):
+        scope = self.scope_of[i]
+        while scope is not None:
+            yield scope
+            scope = scope.parent
+
+
+def validate_sql(sql, schema):
+    """
+    Check every table and column reference in sql against schema.
+    Returns a list of error dicts ({"code", "message", "statement", "position", ...}); empty if valid.
+    Unknown names carry a "suggestions" list of the closest known tables/aliases/columns.
+    Statements other than SELECT/INSERT/UPDATE/DELETE/DESCRIBE/EXPLAIN are not checked.
+    """
+    view = _SchemaView(schema or {})
+    errors = []
+    for index, statement in enumerate(split_statements(sql)):
+        tokens = tokenize(statement)
+        if not tokens:
+            continue
+        first = tokens[0]
+        if first.value == "(" and len(tokens) > 1:
+            first = tokens[1]
+        if not is_keyword(first, *_CHECKED_STATEMENTS):
+            continue
+        errors.extend(_StatementChecker(tokens, view, index).run())
+    return errors
+
+
+def validation_report(sql, schema):
+    """JSON-ready validation result: {"valid", "errors", "elapsed_ms"}."""
+    start = time.perf_counter()
+    errors = validate_sql(sql, schema)
+    return {"valid": not errors, "errors": errors, "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def format_validation_errors(errors):
+    """One line per error, suitable for an error message or a fix-sql prompt."""
+    lines = []
+    for err in errors:
+        line = err["message"]
+        if err.get("suggestions"):
+            line += " (did you mean " + " or ".join(f"'{s}'" for s in err["suggestions"]) + "?)"
+        lines.append(line)
+    return "\n".join(lines)
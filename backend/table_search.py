@@ -0,0 +1,91 @@
+"""
+Table-name search for the schema sidebar: exact, prefix, substring and fuzzy (trigram)
+matches over a per-schema-version index, so lookups stay fast on schemas with thousands
+of tables.
+"""
+import bisect
+import heapq
+import threading
+
+_INDEX_CACHE_SIZE = 8
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _trigrams(text, pad=True):
+    if pad:
+        text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TableIndex:
+    def __init__(self, names):
+        self.names = sorted(names, key=str.lower)
+        self._lower = [name.lower() for name in self.names]
+        self._grams = [_trigrams(name) for name in self._lower]
+        self._postings = {}
+        for i, grams in enumerate(self._grams):
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(i)
+
+    def _substring_candidates(self, query):
+        if len(query) < 3:
+            return range(len(self._lower))
+        postings = [self._postings.get(gram, ()) for gram in _trigrams(query, pad=False)]
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates.intersection_update(ids)
+        return sorted(candidates)
+
+    def search(self, query, limit=20, min_similarity=0.5):
+        """[{"table", "match"}] best first; match is exact, prefix, substring or fuzzy."""
+        query = (query or "").strip().lower()
+        if not query:
+            return [{"table": name, "match": "prefix"} for name in self.names[:limit]]
+        results, seen = [], set()
+
+        def add(i, kind):
+            if i not in seen and len(results) < limit:
+                seen.add(i)
+                results.append({"table": self.names[i], "match": "exact" if self._lower[i] == query else kind})
+
+        i = bisect.bisect_left(self._lower, query)
+        while i < len(self._lower) and self._lower[i].startswith(query) and len(results) < limit:
+            add(i, "prefix")
+            i += 1
+        for i in self._substring_candidates(query):
+            if len(results) >= limit:
+                return results
+            if query in self._lower[i]:
+                add(i, "substring")
+        grams = _trigrams(query)
+        hits = {}
+        for gram in grams:
+            for i in self._postings.get(gram, ()):
+                hits[i] = hits.get(i, 0) + 1
+        # Rank by the share of the query's trigrams found in the name, then by overall (Jaccard) similarity.
+        needed = len(grams) * min_similarity
+        scored = heapq.nsmallest(
+            limit - len(results),
+            (
+                (-count / len(grams), -count / (len(grams) + len(self._grams[i]) - count), self._lower[i], i)
+                for i, count in hits.items() if count >= needed and i not in seen
+            ),
+        )
+        for *_, i in scored:
+            add(i, "fuzzy")
+        return results
+
+
+def index_for(version, names):
+    """TableIndex for this schema version, built once and kept for the last few versions."""
+    with _lock:
+        index = _indexes.get(version)
+    if index is None:
+        index = TableIndex(names)
+        with _lock:
+            _indexes[version] = index
+            while len(_indexes) > _INDEX_CACHE_SIZE:
+                _indexes.pop(next(iter(_indexes)))
+    return index
@@ -0,0 +1,119 @@
+"""
+Per-request stage timing.
+`span(name)` times a block into the current request's trace (if one is active) and into the
+Prometheus stage histograms. app.py starts a trace per /api request, reports it in a
+Server-Timing header (and a `timings` JSON field on request), and logs slow requests.
+"""
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "2000"))
+
+if getattr(sys, "frozen", False):
+    _log_dir = os.path.join(os.path.expanduser("~"), ".querywizard")
+    os.makedirs(_log_dir, exist_ok=True)
+else:
+    _log_dir = os.path.dirname(__file__)
+SLOW_REQUEST_LOG = os.getenv("SLOW_REQUEST_LOG") or os.path.join(_log_dir, "slow_requests.log")
+
+_trace = ContextVar("querywizard_trace", default=None)
+_slow_logger = None
+
+
+class Trace:
+    """Accumulated seconds and call count per span name for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+
+    def add(self, name, seconds):
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + seconds, count + 1)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        """{span: ms} plus "total" (wall time so far)."""
+        timings = {name: round(total * 1000, 3) for name, (total, _) in self.spans.items()}
+        timings["total"] = round(self.elapsed_ms(), 3)
+        return timings
+
+    def server_timing(self):
+        """Server-Timing header value: name;dur=ms entries, total last."""
+        parts = [
+            f"{name};dur={total * 1000:.2f}" + (f';desc="x{count}"' if count > 1 else "")
+            for name, (total, count) in self.spans.items()
+        ]
+        parts.append(f"total;dur={self.elapsed_ms():.2f}")
+        return ", ".join(parts)
+
+
+def start_trace():
+    trace = Trace()
+    _trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _trace.get()
+
+
+def end_trace():
+    _trace.set(None)
+
+
+def add(name, seconds):
+    """Record an already measured duration as a span."""
+    metrics.observe_stage(name, seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def span(name):
+    """Time the block as stage `name` (request trace + metrics histogram)."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        metrics.STAGE_ERRORS.inc(1, name)
+        raise
+    finally:
+        add(name, time.perf_counter() - start)
+
+
+def _get_slow_logger():
+    global _slow_logger
+    if _slow_logger is None:
+        logger = logging.getLogger("querywizard.slow_requests")
+        logger.propagate = False
+        try:
+            handler = RotatingFileHandler(SLOW_REQUEST_LOG, maxBytes=5 * 1024 * 1024, backupCount=3)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+        except OSError as e:
+            logging.warning("Could not open slow request log %s: %s", SLOW_REQUEST_LOG, e)
+        logger.setLevel(logging.INFO)
+        _slow_logger = logger
+    return _slow_logger
+
+
+def log_if_slow(trace, method, path, status):
+    """Append the stage breakdown to the slow request log when the request exceeded SLOW_REQUEST_MS."""
+    timings = trace.as_dict()
+    if SLOW_REQUEST_MS <= 0 or timings["total"] < SLOW_REQUEST_MS:
+        return
+    _get_slow_logger().info(json.dumps({"method": method, "path": path, "status": status, "timings_ms": timings}))
@@ -0,0 +1,199 @@
+"""
+Prompt and explanation translation with local language detection and caching.
+English input is detected locally and never sent to Google Translate. Other translations
+are cached per (text, source, target) in an in-memory LRU backed by a local SQLite file
+(TRANSLATION_CACHE_DB), so repeated prompts and explanations skip the network round trip.
+"""
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from deep_translator import GoogleTranslator
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "2048"))
+
+if getattr(sys, "frozen", False):
+    _data_dir = os.path.join(os.path.expanduser("~"), ".querywizard")
+    os.makedirs(_data_dir, exist_ok=True)
+else:
+    _data_dir = os.path.dirname(__file__)
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB") or os.path.join(_data_dir, "translation_cache.sqlite3")
+
+# Function words per language; table and column names match none of them and stay neutral.
+_STOPWORDS = {
+    "en": {
+        "the", "a", "an", "of", "to", "in", "for", "and", "or", "with", "from", "by", "on", "at", "all", "show",
+        "list", "get", "find", "give", "me", "what", "which", "who", "how", "many", "much", "is", "are", "was",
+        "each", "per", "where", "whose", "than", "more", "less", "top", "count", "average", "total", "number",
+        "rows", "records", "display", "sort", "sorted", "order", "group", "between", "not", "their", "has",
+        "have", "that", "this", "those", "these", "every", "only", "without", "table", "tables", "delete",
+        "remove", "add", "insert", "update", "create", "drop", "set", "into", "schema", "describe", "highest",
+        "lowest", "most", "least", "names", "name", "details", "whose", "after", "before", "greater", "fewer",
+    },
+    "es": {
+        "el", "la", "los", "las", "de", "del", "que", "y", "en", "para", "con", "por", "muestra", "mostrar",
+        "muéstrame", "todos", "todas", "cuántos", "cuantos", "una", "un", "es", "son", "tabla", "dame", "cuál",
+        "cual", "donde", "dónde", "mayor", "menor", "lista", "listar", "sus", "se",
+    },
+    "fr": {
+        "le", "la", "les", "des", "du", "de", "et", "est", "pour", "avec", "dans", "tous", "toutes", "montre",
+        "montrer", "afficher", "affiche", "une", "un", "quels", "quelles", "combien", "sont", "table", "leur",
+        "leurs", "où", "qui", "plus", "moins", "liste", "donne", "moi",
+    },
+    "de": {
+        "der", "die", "das", "und", "ist", "mit", "für", "von", "alle", "zeige", "zeig", "wie", "viele", "ein",
+        "eine", "den", "dem", "tabelle", "nicht", "mir", "welche", "wo", "sind", "mehr", "weniger", "liste",
+    },
+    "it": {
+        "il", "lo", "gli", "di", "della", "delle", "dei", "con", "per", "che", "mostra", "mostrami", "tutti",
+        "tutte", "quanti", "quante", "tabella", "sono", "dove", "elenca",
+    },
+    "hi": {
+        "ka", "ki", "ke", "dikhao", "sabhi", "saare", "kitne", "hai", "hain", "mein", "aur", "ko", "se", "batao",
+        "wale", "vale", "kya", "karo", "kaun", "jinka", "jiska", "sab",
+    },
+}
+
+# Unicode script (first word of the character name) -> language code.
+_SCRIPTS = {
+    "DEVANAGARI": "hi", "CJK": "zh", "HIRAGANA": "ja", "KATAKANA": "ja", "CYRILLIC": "ru",
+    "ARABIC": "ar", "HANGUL": "ko", "GREEK": "el", "HEBREW": "iw", "THAI": "th", "BENGALI": "bn",
+    "TAMIL": "ta", "TELUGU": "te", "GUJARATI": "gu", "GURMUKHI": "pa", "KANNADA": "kn", "MALAYALAM": "ml",
+}
+_MIN_ENGLISH_HITS = 2
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_db = None
+_translators = {}
+
+TRANSLATIONS = metrics.Counter(
+    "querywizard_translations_total", "Translation requests by how they were served.", ("result",),
+)
+logging.basicConfig(level=logging.INFO)
+
+
+def detect_language(text):
+    """
+    Best-effort local language guess: a language code, or "auto" when unsure.
+    Non-Latin scripts are identified from the characters; Latin text by function words.
+    English needs _MIN_ENGLISH_HITS of its words (or a third of a short prompt), since other
+    Latin-script languages without a word list would otherwise pass as English untranslated.
+    """
+    scripts = {}
+    latin = 0
+    for ch in text:
+        if not ch.isalpha():
+            continue
+        if ord(ch) < 0x250:
+            latin += 1
+            continue
+        script = unicodedata.name(ch, "").split(" ")[0]
+        code = _SCRIPTS.get(script)
+        if code:
+            scripts[code] = scripts.get(code, 0) + 1
+    if scripts:
+        code, count = max(scripts.items(), key=lambda item: item[1])
+        if count >= latin * 0.3:
+            return code
+    words = _WORD.findall(text.lower())
+    scores = {code: sum(1 for w in words if w in vocabulary) for code, vocabulary in _STOPWORDS.items()}
+    top = max(scores.values())
+    leaders = [code for code, score in scores.items() if score == top]
+    if top == 0 or len(leaders) > 1:
+        return "auto"
+    if leaders[0] == "en" and top < _MIN_ENGLISH_HITS and top * 3 < len(words):
+        return "auto"
+    return leaders[0]
+
+
+def is_english(text):
+    return detect_language(text) == "en"
+
+
+def _connect():
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(TRANSLATION_CACHE_DB, timeout=5, check_same_thread=False)
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, source TEXT, target TEXT, text TEXT, translated TEXT, created REAL)"
+        )
+    return _db
+
+
+def _key(text, source, target):
+    return hashlib.sha256(f"{source}\0{target}\0{text}".encode()).hexdigest()
+
+
+def _remember(key, translated):
+    _memory[key] = translated
+    _memory.move_to_end(key)
+    while len(_memory) > TRANSLATION_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+def _translate_remote(text, source, target):
+    translator = _translators.get((source, target))
+    if translator is None:
+        translator = _translators[(source, target)] = GoogleTranslator(source=source, target=target)
+    return translator.translate(text)
+
+
+def translate(text, target="en", source="auto"):
+    """
+    Translate text to target, skipping the call when text is (detected to be) in the target
+    language already. Raises whatever the translator raises.
+    """
+    if not text or not text.strip():
+        return text
+    if (source if source != "auto" else detect_language(text)) == target:
+        TRANSLATIONS.inc(1, "skipped")
+        return text
+    key = _key(text, source, target)
+    with _lock:
+        cached = _memory.get(key)
+        if cached is not None:
+            _memory.move_to_end(key)
+            TRANSLATIONS.inc(1, "memory")
+            return cached
+        try:
+            row = _connect().execute("SELECT translated FROM translations WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            logging.warning("Translation cache unavailable: %s", e)
+            row = None
+        if row is not None:
+            _remember(key, row[0])
+            TRANSLATIONS.inc(1, "disk")
+            return row[0]
+    try:
+        translated = _translate_remote(text, source, target)
+    except Exception:
+        TRANSLATIONS.inc(1, "error")
+        raise
+    TRANSLATIONS.inc(1, "remote")
+    if translated is None:
+        return text
+    with _lock:
+        _remember(key, translated)
+        try:
+            db = _connect()
+            db.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                (key, source, target, text, translated, time.time()),
+            )
+            db.commit()
+        except sqlite3.Error as e:
+            logging.warning("Could not persist translation: %s", e)
+    return translated
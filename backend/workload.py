@@ -0,0 +1,323 @@
+"""
+Query digest store: per-statement workload statistics keyed by database and fingerprint (SQL
+with literals normalized). The executor records every statement here; entries live in memory
+and are periodically flushed to a local SQLite file so they survive restarts. At most
+QUERY_DIGEST_MAX_ENTRIES are kept; the least recently seen are evicted first. The index
+advisor and /api/stats/queries read the current database's entries.
+"""
+import atexit
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+try:
+    from .sql_lexer import tokenize, is_keyword, split_statements
+    from .schema_handler import database_identity
+    from . import metrics
+except ImportError:
+    from sql_lexer import tokenize, is_keyword, split_statements
+    from schema_handler import database_identity
+    import metrics
+
+TRACK_ROWS_EXAMINED = os.getenv("WORKLOAD_ROWS_EXAMINED", "0") == "1"
+FLUSH_INTERVAL_SECONDS = float(os.getenv("QUERY_DIGEST_FLUSH_SECONDS", "60"))
+MAX_ENTRIES = max(1, int(os.getenv("QUERY_DIGEST_MAX_ENTRIES", "5000")))
+
+if getattr(sys, "frozen", False):
+    _data_dir = os.path.join(os.path.expanduser("~"), ".querywizard")
+    os.makedirs(_data_dir, exist_ok=True)
+else:
+    _data_dir = os.path.dirname(__file__)
+DIGEST_DB = os.getenv("QUERY_DIGEST_DB") or os.path.join(_data_dir, "query_digest.sqlite3")
+
+# Latency histogram upper bounds in ms (last bucket is open-ended).
+LATENCY_BUCKETS_MS = (
+    0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float("inf"),
+)
+
+_lock = threading.Lock()
+_start_lock = threading.Lock()
+_stats = {}
+_loaded = False
+_dirty = False
+_flusher = None
+
+logging.basicConfig(level=logging.INFO)
+DIGEST_ENTRIES = metrics.Gauge(
+    "querywizard_query_digest_entries", "Statement fingerprints in the query digest store.",
+    callback=lambda: len(_stats),
+)
+
+
+def fingerprint(sql):
+    """Normalize sql: literals -> ?, IN (?, ?, ...) -> IN (?+), names lower-cased, whitespace collapsed."""
+    parts = []
+    tokens = tokenize(sql)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.kind in ("string", "number", "param"):
+            parts.append("?")
+        elif token.kind == "op" and token.value == ";":
+            pass
+        elif is_keyword(token, "IN") and i + 1 < len(tokens) and tokens[i + 1].value == "(":
+            j = i + 2
+            while j < len(tokens) and (tokens[j].kind in ("string", "number", "param") or tokens[j].value == ","):
+                j += 1
+            if j > i + 2 and j < len(tokens) and tokens[j].value == ")":
+                parts.extend(("in", "(", "?+", ")"))
+                i = j + 1
+                continue
+            parts.append("in")
+        elif token.kind in ("name", "ident"):
+            parts.append(token.value.lower())
+        else:
+            parts.append(token.value)
+        i += 1
+    text = ""
+    for part in parts:
+        if text and part not in (".", ",", ")") and text[-1] not in ".(":
+            text += " "
+        text += part
+    return text
+
+
+def digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _new_entry(key, db, text, sql):
+    return {
+        "digest": key,
+        "db": db,
+        "fingerprint": text,
+        "sample": sql,
+        "calls": 0,
+        "errors": 0,
+        "total_ms": 0.0,
+        "min_ms": None,
+        "max_ms": 0.0,
+        "rows": 0,
+        "rows_examined": 0,
+        "bytes": 0,
+        "histogram": [0] * len(LATENCY_BUCKETS_MS),
+        "last_seen": time.time(),
+    }
+
+
+def _evict():
+    """Over MAX_ENTRIES, drop the least recently seen entries (a tenth of the cap at once). Caller holds _lock."""
+    if len(_stats) <= MAX_ENTRIES:
+        return
+    excess = len(_stats) - MAX_ENTRIES + MAX_ENTRIES // 10
+    for entry in heapq.nsmallest(excess, _stats.values(), key=lambda e: e["last_seen"]):
+        del _stats[entry["digest"]]
+
+
+def _entry_for(db, text, sql):
+    """Entry for fingerprint text on database db, created on first use. Caller holds _lock."""
+    key = digest(f"{db}\n{text}")
+    entry = _stats.get(key)
+    if entry is None:
+        entry = _stats[key] = _new_entry(key, db, text, sql)
+        _evict()
+    return entry
+
+
+def record(sql, elapsed_s, rows=None, rows_examined=None, error=False):
+    """Add one execution of sql (successful or failed) to the digest store."""
+    _ensure_started()
+    global _dirty
+    elapsed_ms = elapsed_s * 1000
+    db = database_identity()[1]
+    text = fingerprint(sql)
+    with _lock:
+        entry = _entry_for(db, text, sql)
+        entry["calls"] += 1
+        entry["errors"] += 1 if error else 0
+        entry["total_ms"] += elapsed_ms
+        entry["min_ms"] = elapsed_ms if entry["min_ms"] is None else min(entry["min_ms"], elapsed_ms)
+        entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+        entry["rows"] += max(rows or 0, 0)
+        entry["rows_examined"] += rows_examined or 0
+        entry["histogram"][bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        entry["last_seen"] = time.time()
+        _dirty = True
+
+
+def record_serialized(sql, nbytes):
+    """Attribute the serialized response size to the last statement of sql."""
+    statements = split_statements(sql)
+    if not statements:
+        return
+    global _dirty
+    db = database_identity()[1]
+    text = fingerprint(statements[-1])
+    with _lock:
+        _entry_for(db, text, statements[-1])["bytes"] += nbytes
+        _dirty = True
+
+
+def histogram_percentile(histogram, max_ms, pct):
+    """Percentile estimate from bucket counts: linear interpolation inside the bucket, capped at max_ms."""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    rank = pct / 100.0 * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            low = LATENCY_BUCKETS_MS[i - 1] if i else 0.0
+            high = min(LATENCY_BUCKETS_MS[i], max_ms)
+            return min(max_ms, low + (high - low) * (rank - seen) / count)
+        seen += count
+    return max_ms
+
+
+def _summary(entry):
+    calls = entry["calls"]
+    summary = {k: v for k, v in entry.items() if k not in ("histogram", "db")}
+    summary["total_ms"] = round(entry["total_ms"], 3)
+    summary["min_ms"] = round(entry["min_ms"] or 0.0, 3)
+    summary["max_ms"] = round(entry["max_ms"], 3)
+    summary["avg_ms"] = round(entry["total_ms"] / calls, 3) if calls else 0.0
+    for pct in (50, 95, 99):
+        summary[f"p{pct}_ms"] = round(histogram_percentile(entry["histogram"], entry["max_ms"], pct), 3)
+    summary["histogram"] = [
+        {"le_ms": bound if bound != float("inf") else None, "count": count}
+        for bound, count in zip(LATENCY_BUCKETS_MS, entry["histogram"]) if count
+    ]
+    return summary
+
+
+def top_statements(limit=10, order_by="total_ms"):
+    """The current database's heaviest fingerprints first, as JSON-ready dicts."""
+    _ensure_started()
+    db = database_identity()[1]
+    with _lock:
+        entries = [dict(entry, histogram=list(entry["histogram"])) for entry in _stats.values() if entry["db"] == db]
+    summaries = [_summary(entry) for entry in entries]
+    summaries.sort(key=lambda e: e.get(order_by) or 0, reverse=True)
+    return summaries[:limit]
+
+
+def handler_reads(cursor):
+    """Sum of the session Handler_read_* counters (rows the storage engine read so far)."""
+    cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+    return sum(int(value) for _, value in cursor.fetchall())
+
+
+_COLUMNS = (
+    "digest", "db", "fingerprint", "sample", "calls", "errors", "total_ms", "min_ms", "max_ms",
+    "rows", "rows_examined", "bytes", "histogram", "last_seen",
+)
+
+
+def _connect():
+    conn = sqlite3.connect(DIGEST_DB, timeout=5)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS query_digest ("
+        "digest TEXT PRIMARY KEY, db TEXT, fingerprint TEXT, sample TEXT, calls INTEGER, errors INTEGER, "
+        "total_ms REAL, min_ms REAL, max_ms REAL, rows INTEGER, rows_examined INTEGER, bytes INTEGER, "
+        "histogram TEXT, last_seen REAL)"
+    )
+    if "db" not in {row[1] for row in conn.execute("PRAGMA table_info(query_digest)")}:
+        conn.execute("ALTER TABLE query_digest ADD COLUMN db TEXT")  # stores from before digests were per database
+    return conn
+
+
+def _load():
+    """Merge persisted digests into memory (once, before the first flush)."""
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    if not os.path.exists(DIGEST_DB):
+        return
+    try:
+        conn = _connect()
+        try:
+            rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM query_digest").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.warning("Could not load query digest store: %s", e)
+        return
+    with _lock:
+        for row in rows:
+            entry = dict(zip(_COLUMNS, row))
+            histogram = json.loads(entry["histogram"] or "[]")
+            if len(histogram) != len(LATENCY_BUCKETS_MS) or entry["db"] is None:
+                continue
+            entry["histogram"] = histogram
+            _stats.setdefault(entry["digest"], entry)
+        _evict()
+
+
+def flush():
+    """Replace the SQLite store with the in-memory digests if anything changed since the last flush."""
+    global _dirty
+    with _lock:
+        if not _dirty:
+            return
+        rows = [
+            tuple(json.dumps(e[c]) if c == "histogram" else e[c] for c in _COLUMNS)
+            for e in _stats.values()
+        ]
+        _dirty = False
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM query_digest")  # evicted entries leave the store too
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO query_digest ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(_COLUMNS))})",
+                    rows,
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.warning("Could not flush query digest store: %s", e)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        flush()
+
+
+def _ensure_started():
+    """Load persisted digests and start the background flusher on first use (other callers wait for the load)."""
+    global _flusher
+    if _flusher is not None:
+        return
+    with _start_lock:
+        if _flusher is not None:
+            return
+        _load()
+        flusher = threading.Thread(target=_flush_loop, name="query-digest-flush", daemon=True)
+        flusher.start()
+        atexit.register(flush)
+        _flusher = flusher
+
+
+def reset():
+    """Drop all digests from memory and the SQLite store."""
+    global _dirty
+    with _lock:
+        _stats.clear()
+        _dirty = False
+    if os.path.exists(DIGEST_DB):
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM query_digest")
+        finally:
+            conn.close()
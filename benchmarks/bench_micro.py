@@ -0,0 +1,295 @@
+"""
+Microbenchmarks for the CPU-bound backend paths, on synthetic inputs:
+
+  schema_introspect   store_all_table_structures assembly (+ JSON write) for N tables
+  schema_load         read the schema snapshot for N tables and decode every table
+  prompt_build        mention detection + prompt assembly (_build_sql_prompt) for N tables
+  referenced_by       _build_referenced_by for N tables
+  fix_insert          fix_insert_query on an INSERT with N rows of VALUES
+  rows_to_dicts       execute_query_api row -> dict conversion for an N-row SELECT
+  jsonify             jsonify of an N-row result
+
+The database is a synthetic in-memory cursor, so only Python work is measured.
+Each case reports ops/sec (median of repeated timed runs) and peak traced memory
+(one extra run under tracemalloc).
+
+    python benchmarks/bench_micro.py                    # default sizes
+    python benchmarks/bench_micro.py --full             # up to 10,000 tables / 1M rows
+    python benchmarks/bench_micro.py --only prompt_build,jsonify --output micro.json
+    python benchmarks/bench_micro.py --baseline micro.json --max-regression 0.2
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix="querywizard-micro-")
+os.environ.update({
+    "DB_PASSWORD": "bench",
+    "DB_NAME": "bench",
+    "QUERY_DIGEST_DB": os.path.join(WORKDIR, "query_digest.sqlite3"),
+    "SLOW_REQUEST_LOG": os.path.join(WORKDIR, "slow_requests.log"),
+    "TRANSLATION_CACHE_DB": os.path.join(WORKDIR, "translation_cache.sqlite3"),
+})
+sys.path.insert(0, ROOT)
+
+import mysql.connector  # noqa: E402
+from backend import ai_generator, db_handler, schema_handler, sql_explainer, translation  # noqa: E402
+from backend.app import app  # noqa: E402
+from backend.query_parser import fix_insert_query  # noqa: E402
+from flask import jsonify  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+schema_handler.SCHEMA_FILE = os.path.join(WORKDIR, "mysql_schema.json")
+translation._translate_remote = lambda text, source, target: text
+
+COLUMNS_PER_TABLE = 8
+_fingerprints = itertools.count()
+RESULT_COLUMNS = ("id", "name", "email", "age", "salary", "city", "created_at", "active")
+
+
+def _result_rows(n):
+    return [
+        (i, f"name{i}", f"user{i}@example.com", 20 + i % 50, 1000.5 + i, "city", "2024-01-01 00:00:00", i % 2)
+        for i in range(n)
+    ]
+
+
+class SyntheticCursor:
+    """Answers the introspection statements for `tables` generated tables and SELECTs with `rows` rows."""
+
+    _table_arg = re.compile(r"(?:describe|from)\s+`?(\w+)`?|TABLE_NAME\s*=\s*'(\w+)'", re.IGNORECASE)
+
+    def __init__(self, tables=0, rows=0):
+        self.tables = tables
+        self.rows = rows
+        self.description = None
+        self.rowcount = -1
+        self.with_rows = False
+        self._result = []
+        self._select_rows = _result_rows(rows)
+
+    def execute(self, sql, params=None):
+        lower = sql.strip().lower()
+        match = self._table_arg.search(sql)
+        table = (match.group(1) or match.group(2)) if match else None
+        index = int(table[1:]) if table and table[1:].isdigit() else 0
+        if lower.startswith("show tables"):
+            result = [(f"t{i}",) for i in range(self.tables)]
+        elif lower.startswith("describe"):
+            result = [(f"c{j}", "int" if j < 2 else "varchar(50)", "YES", "", None, "") for j in range(COLUMNS_PER_TABLE)]
+        elif lower.startswith("show index"):
+            result = [(table, 0, "PRIMARY", 1, "c0"), (table, 1, f"idx_{table}_c1", 1, "c1")]
+        elif "bit_xor" in lower:
+            # A new schema fingerprint every time, so each run re-introspects.
+            result = [(str(next(_fingerprints)), "", "")]
+        elif "key_column_usage" in lower:
+            result = [("c1", f"t{index - 1}", "c0")] if index else []
+        elif lower.startswith("select"):
+            result = list(self._select_rows)
+            self.description = [(c,) for c in RESULT_COLUMNS]
+        else:
+            result = []
+        self._result = result
+        self.rowcount = len(result)
+        self.with_rows = bool(result)
+
+    def fetchall(self):
+        result, self._result = self._result, []
+        self.with_rows = False
+        return result
+
+    def fetchmany(self, size=1):
+        result, self._result = self._result[:size], self._result[size:]
+        return result
+
+    def nextset(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class SyntheticConnection:
+    def __init__(self, **kwargs):
+        self.cursor_obj = SyntheticCursor(**kwargs)
+
+    def cursor(self, **kwargs):
+        return self.cursor_obj
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def synthetic_schema(tables):
+    """Schema dict in the mysql_schema.json shape: table i has an FK to table i-1 and an index on c1."""
+    schema = {}
+    for i in range(tables):
+        columns = {}
+        for j in range(COLUMNS_PER_TABLE):
+            columns[f"c{j}"] = {
+                "type": "int" if j < 2 else "varchar(50)",
+                "primary_key": j == 0,
+                "foreign_key": f"t{i - 1}(c0)" if j == 1 and i else None,
+                "indexes": [{"name": "PRIMARY", "seq": 1, "unique": True}] if j == 0 else
+                           [{"name": f"idx_t{i}_c1", "seq": 1, "unique": False}] if j == 1 else [],
+            }
+        schema[f"t{i}"] = columns
+    return schema
+
+
+def _use_connection(**kwargs):
+    mysql.connector.connect = lambda **_: SyntheticConnection(**kwargs)
+
+
+def case_schema_introspect(n):
+    _use_connection(tables=n)
+    return lambda: schema_handler.store_all_table_structures(force_update=True)
+
+
+def case_schema_load(n):
+    schema_handler.save_schema(synthetic_schema(n))
+    path = schema_handler.schema_file()
+    return lambda: dict(schema_handler.read_schema_file(path).items())
+
+
+def case_prompt_build(n):
+    schema = synthetic_schema(n)
+    prompt = f"show every row of t{n // 2} joined with t{n - 1} where c3 is not empty"
+    return lambda: ai_generator._build_sql_prompt(prompt, schema)
+
+
+def case_referenced_by(n):
+    schema = synthetic_schema(n)
+    return lambda: ai_generator._build_referenced_by(schema)
+
+
+def case_fix_insert(n):
+    schema_handler.save_schema(synthetic_schema(1))
+    values = ", ".join(f"({i}, {i}, 'a{i}', 'b', 'c', 'd', 'e', 'f')" for i in range(n))
+    query = f"INSERT INTO t0 VALUES {values};"
+    return lambda: fix_insert_query(query, "t0")
+
+
+def case_explain_local(n):
+    conditions = " AND ".join(f"e.c{i} > {i}" for i in range(n))
+    query = f"SELECT e.c1, COUNT(*) AS n FROM t0 e JOIN t1 d ON d.c0 = e.c2 WHERE {conditions} GROUP BY e.c1 ORDER BY n DESC LIMIT 10"
+    return lambda: sql_explainer.explain_sql(query)
+
+
+def case_rows_to_dicts(n):
+    _use_connection(rows=n)
+    return lambda: db_handler.execute_query_api("SELECT * FROM t0")
+
+
+def case_jsonify(n):
+    rows = [dict(zip(RESULT_COLUMNS, row)) for row in _result_rows(n)]
+
+    def run():
+        with app.app_context():
+            return jsonify({"success": True, "error": None, "results": rows}).get_data()
+    return run
+
+
+CASES = {
+    "schema_introspect": (case_schema_introspect, [10, 100, 1000], [10, 100, 1000, 10000]),
+    "schema_load": (case_schema_load, [10, 100, 1000], [10, 100, 1000, 10000]),
+    "prompt_build": (case_prompt_build, [10, 100, 1000], [10, 100, 1000, 10000]),
+    "referenced_by": (case_referenced_by, [10, 100, 1000], [10, 100, 1000, 10000]),
+    "fix_insert": (case_fix_insert, [100, 1000, 10000], [100, 1000, 10000, 100000]),
+    "explain_local": (case_explain_local, [1, 3, 5], [1, 3, 5]),
+    "rows_to_dicts": (case_rows_to_dicts, [1000, 10000, 100000], [1000, 10000, 100000, 1000000]),
+    "jsonify": (case_jsonify, [1000, 10000, 100000], [1000, 10000, 100000, 1000000]),
+}
+
+
+def measure(fn, min_time, max_runs):
+    """(ops/sec from the median run, runs, peak traced bytes)."""
+    fn()
+    durations = []
+    budget_end = time.perf_counter() + min_time
+    while len(durations) < max_runs and (len(durations) < 3 or time.perf_counter() < budget_end):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    median = statistics.median(durations)
+    return (1.0 / median if median else float("inf")), len(durations), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(CASES), help="comma-separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--full", action="store_true", help="include the largest sizes (slow, memory hungry)")
+    parser.add_argument("--sizes", default=None, help="override sizes for every selected case, e.g. 10,100")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds of timed runs per case and size")
+    parser.add_argument("--max-runs", type=int, default=50)
+    parser.add_argument("--output", default=None, help="write JSON results here")
+    parser.add_argument("--baseline", default=None, help="compare ops/sec against this results file")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results = []
+    for name in names:
+        factory, default_sizes, full_sizes = CASES[name]
+        sizes = [int(s) for s in args.sizes.split(",")] if args.sizes else (full_sizes if args.full else default_sizes)
+        for size in sizes:
+            ops, runs, peak = measure(factory(size), args.min_time, args.max_runs)
+            results.append({
+                "case": name, "size": size, "ops_per_sec": round(ops, 3), "runs": runs, "peak_bytes": peak,
+            })
+            print(f"{name:18s} n={size:<8d} {ops:>12.2f} ops/s  peak {peak / 1048576:>9.2f} MiB", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            previous = {(r["case"], r["size"]): r for r in json.load(f).get("results", [])}
+        regressions = [
+            f"{r['case']}@{r['size']}: ops_per_sec {previous[(r['case'], r['size'])]['ops_per_sec']} -> {r['ops_per_sec']}"
+            for r in results
+            if (r["case"], r["size"]) in previous
+            and r["ops_per_sec"] < previous[(r["case"], r["size"])]["ops_per_sec"] * (1 - args.max_regression)
+        ]
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+End-to-end benchmark of the Flask request path (backend/app.py) with a fake Gemini model
+and a SQLite stand-in for MySQL (see standins.py). Runs each scenario at increasing
+concurrency and reports throughput and p50/p99 latency.
+
+    python benchmarks/bench_pipeline.py --concurrency 1,4,16 --requests 200 --llm-latency-ms 50
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/results/baseline.json
+    python benchmarks/bench_pipeline.py --baseline benchmarks/results/baseline.json --max-regression 0.2
+
+Results are written as JSON (--output); with --baseline the exit status is 1 if any
+scenario's p50/p99 grew or throughput dropped by more than --max-regression.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import standins  # noqa: E402
+
+SCENARIOS = {
+    "generate": ("POST", "/api/generate-sql", {"prompt": "list employees with their department"}),
+    "execute_small": ("POST", "/api/execute", {"sql": "SELECT * FROM dept LIMIT 10;"}),
+    "execute_large": ("POST", "/api/execute", {"sql": "SELECT * FROM emp;"}),
+    "fix_sql": ("POST", "/api/fix-sql", {"sql": "SELECT nme FROM emp;", "error": "Unknown column 'nme'"}),
+    "schema": ("GET", "/api/schema", None),
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_scenario(app, name, concurrency, total_requests):
+    method, path, body = SCENARIOS[name]
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_worker = max(1, total_requests // concurrency)
+
+    def worker():
+        client = app.test_client()
+        local, failed = [], 0
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            local.append((time.perf_counter() - start) * 1000)
+            payload = response.get_json(silent=True) or {}
+            if response.status_code != 200 or payload.get("success") is False:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Regression messages for results that are worse than baseline by more than max_regression."""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = previous.get((result["scenario"], result["concurrency"]))
+        if not base:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if base[key] and result[key] > base[key] * (1 + max_regression):
+                regressions.append(f"{result['scenario']}@{result['concurrency']}: {key} {base[key]} -> {result[key]}")
+        if base["throughput_rps"] and result["throughput_rps"] < base["throughput_rps"] * (1 - max_regression):
+            regressions.append(
+                f"{result['scenario']}@{result['concurrency']}: throughput_rps "
+                f"{base['throughput_rps']} -> {result['throughput_rps']}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated worker counts")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per scenario")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="fake Gemini latency per call")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rows", type=int, default=20000, help="rows in the large table (execute_large)")
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout only)")
+    parser.add_argument("--baseline", default=None, help="compare against this results file")
+    parser.add_argument("--save-baseline", default=None, help="also write the results to this baseline file")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    app, model, workdir = standins.install(args.llm_latency_ms, args.llm_jitter_ms, employees=args.rows)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    results = []
+    for name in scenarios:
+        run_scenario(app, name, 1, args.warmup)
+        for concurrency in levels:
+            result = run_scenario(app, name, concurrency, args.requests)
+            results.append(result)
+            print(
+                f"{name:14s} c={concurrency:<3d} {result['throughput_rps']:>9.1f} req/s  "
+                f"p50 {result['p50_ms']:>8.2f} ms  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}",
+                file=sys.stderr,
+            )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "rows": args.rows,
+            "requests": args.requests,
+            "llm_calls": model.calls,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
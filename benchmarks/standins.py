@@ -0,0 +1,121 @@
+"""
+Local stand-ins for the benchmark suite: a fake Gemini model with canned, latency-configurable
+responses and a seeded SQLite file served through the embedded driver (DB_DRIVER=sqlite).
+"""
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SEED_DDL = """
+CREATE TABLE dept (did INTEGER PRIMARY KEY, dname VARCHAR(50), location VARCHAR(50), budget DECIMAL(12,2));
+CREATE TABLE emp (eid INTEGER PRIMARY KEY, ename VARCHAR(50), age INT, email VARCHAR(100), salary DECIMAL(10,2));
+CREATE TABLE project (pid INTEGER PRIMARY KEY, pname VARCHAR(100), start_date DATE, end_date DATE, budget DECIMAL(12,2));
+CREATE TABLE works (wid INTEGER PRIMARY KEY, eid INT REFERENCES emp(eid), did INT REFERENCES dept(did), pcttime INT);
+CREATE TABLE emp_project (id INTEGER PRIMARY KEY, eid INT REFERENCES emp(eid), pid INT REFERENCES project(pid), role VARCHAR(50), hours_per_week INT);
+CREATE INDEX idx_works_eid ON works (eid);
+CREATE INDEX idx_project_start_date ON project (start_date);
+"""
+
+# Canned model output keyed by a word in the request; the default answers anything else.
+CANNED_SQL = {
+    "fix": "SELECT eid, ename, salary FROM emp WHERE salary > 50000 LIMIT 100;",
+    "explain": "This query lists employees earning more than 50000, limited to 100 rows.",
+    "default": "SELECT e.ename, d.dname FROM emp e JOIN works w ON w.eid = e.eid JOIN dept d ON d.did = w.did LIMIT 100;",
+}
+
+
+def seed_database(path, employees=20000):
+    """Create the sample schema in a fresh SQLite file with `employees` rows in emp/works."""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript(SEED_DDL)
+    rnd = random.Random(42)
+    conn.executemany("INSERT INTO dept VALUES (?, ?, ?, ?)", [(i, f"dept{i}", f"city{i % 7}", 1e6 + i) for i in range(1, 51)])
+    conn.executemany(
+        "INSERT INTO emp VALUES (?, ?, ?, ?, ?)",
+        [(i, f"name{i}", rnd.randint(21, 65), f"e{i}@example.com", rnd.randint(20000, 150000)) for i in range(1, employees + 1)],
+    )
+    conn.executemany(
+        "INSERT INTO project VALUES (?, ?, ?, ?, ?)",
+        [(i, f"project{i}", f"202{i % 5}-0{1 + i % 9}-01", None, 5e5) for i in range(1, 201)],
+    )
+    conn.executemany("INSERT INTO works VALUES (?, ?, ?, ?)", [(i, i, 1 + i % 50, 100) for i in range(1, employees + 1)])
+    conn.executemany(
+        "INSERT INTO emp_project VALUES (?, ?, ?, ?, ?)",
+        [(i, 1 + i % employees, 1 + i % 200, "dev", 40) for i in range(1, employees // 2 + 1)],
+    )
+    conn.commit()
+    conn.close()
+
+
+class FakeModel:
+    """Canned Gemini replacement; latency_ms +/- jitter_ms per call, thread-safe call counter."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, parts):
+        with self._lock:
+            self.calls += 1
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        text = "\n".join(parts) if isinstance(parts, (list, tuple)) else str(parts)
+        lower = text.lower()
+        if "failed query" in lower:
+            return CANNED_SQL["fix"]
+        if "explanation of this sql" in lower:
+            if "json object" in lower:
+                codes = re.findall(r"\((\w+)\)", text.split(".")[0])
+                return json.dumps({code: CANNED_SQL["explain"] for code in codes})
+            return CANNED_SQL["explain"]
+        return CANNED_SQL["default"]
+
+    def generate_content(self, parts):
+        return types.SimpleNamespace(text=self.generate(parts), usage_metadata=None)
+
+
+def install(latency_ms=0.0, jitter_ms=0.0, employees=20000, workdir=None):
+    """
+    Point the backend at the stand-ins and return (flask_app, fake_model, workdir).
+    Must be called before anything imports the backend package.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix="querywizard-bench-")
+    db_path = os.path.join(workdir, "bench.sqlite3")
+    seed_database(db_path, employees=employees)
+    os.environ.update({
+        "DB_DRIVER": "sqlite",
+        "DB_PATH": db_path,
+        "GOOGLE_API_KEY": "bench",
+        "PERSIST_DB_CREDENTIALS": "1",
+        "QUERY_DIGEST_DB": os.path.join(workdir, "query_digest.sqlite3"),
+        "SLOW_REQUEST_LOG": os.path.join(workdir, "slow_requests.log"),
+        "TRANSLATION_CACHE_DB": os.path.join(workdir, "translation_cache.sqlite3"),
+    })
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    from backend import ai_generator, schema_handler, translation
+    model = FakeModel(latency_ms, jitter_ms)
+    schema_handler.SCHEMA_FILE = os.path.join(workdir, "mysql_schema.json")
+    ai_generator._ensure_genai_configured = lambda: True
+    ai_generator._model_for = lambda api_key: model
+    translation._translate_remote = lambda text, source, target: text
+
+    from backend.app import create_app
+    logging.getLogger().setLevel(logging.WARNING)
+    return create_app(), model, workdir
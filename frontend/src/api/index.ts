@@ -2,6 +2,9 @@ import type {
   CheckAuthResponse,
   LoginResponse,
   SchemaResponse,
+  SchemaTablesResponse,
+  TableSchemaResponse,
+  TableSearchResponse,
   SqlResponse,
   ExecuteResponse,
   ExplanationResponse,
@@ -54,6 +57,25 @@ export async function getSchema(): Promise<SchemaResponse> {
   return r.json()
 }
 
+/** Table names only; the browser revalidates with the schema ETag. */
+export async function getSchemaTables(): Promise<SchemaTablesResponse> {
+  const r = await fetch(`${API}/schema?mode=tables`)
+  if (!r.ok) throw new Error('Failed to load tables')
+  return r.json()
+}
+
+export async function getTableSchema(table: string): Promise<TableSchemaResponse> {
+  const r = await fetch(`${API}/schema?table=${encodeURIComponent(table)}`)
+  if (!r.ok) throw new Error(`Failed to load schema for ${table}`)
+  return r.json()
+}
+
+export async function searchTables(query: string, limit = 50): Promise<TableSearchResponse> {
+  const r = await fetch(`${API}/schema/search?q=${encodeURIComponent(query)}&limit=${limit}`)
+  if (!r.ok) throw new Error('Table search failed')
+  return r.json()
+}
+
 export async function generateSql(
   prompt: string,
   defaultTable: string | null = null
@@ -190,6 +190,12 @@ export default function MainContent({
     }
   }
 
+  // Explanations are cached server-side per SQL and language, so refreshing an open panel is cheap
+  useEffect(() => {
+    setExplanation('')
+    if (explanationOpen) loadExplanation()
+  }, [generatedSql, selectedLang.code])
+
   const downloadCsv = () => {
     if (!queryResults || queryResults.length === 0) return
     const headers = Object.keys(queryResults[0])
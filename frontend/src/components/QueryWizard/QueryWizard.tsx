@@ -1,6 +1,7 @@
 import { useState, useEffect, useCallback } from 'react'
 import {
-  getSchema,
+  getSchemaTables,
+  getTableSchema,
   generateSql,
   executeSql,
   fixSql,
@@ -38,8 +39,8 @@ export default function QueryWizard({ onLogout }: QueryWizardProps = {}) {
   const loadSchema = useCallback(async () => {
     setSchemaLoading(true)
     try {
-      const data = await getSchema()
-      setSchema(data.schema || {})
+      const data = await getSchemaTables()
+      setSchema({})
       setTables(data.tables || [])
     } catch {
       setSchema({})
@@ -53,6 +54,20 @@ export default function QueryWizard({ onLogout }: QueryWizardProps = {}) {
     loadSchema()
   }, [loadSchema])
 
+  // Column details are fetched per table when it is selected.
+  useEffect(() => {
+    if (!selectedTable || selectedTable === 'None' || schema[selectedTable]) return
+    let cancelled = false
+    getTableSchema(selectedTable)
+      .then((data) => {
+        if (!cancelled) setSchema((prev) => ({ ...prev, [data.table]: data.columns }))
+      })
+      .catch(() => {})
+    return () => {
+      cancelled = true
+    }
+  }, [selectedTable, schema])
+
   return (
     <styles.Layout>
       <Sidebar
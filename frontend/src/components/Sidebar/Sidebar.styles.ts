@@ -127,6 +127,25 @@ const SelectTrigger = styled.button`
   }
 `
 
+const SearchInput = styled.input`
+  width: 100%;
+  box-sizing: border-box;
+  padding: 0.5rem 0.85rem;
+  margin-bottom: 0.5rem;
+  border: 1px solid #e5e7eb;
+  border-radius: 8px;
+  background: rgba(255, 255, 255, 0.95);
+  font-size: 0.9rem;
+  color: #31333f;
+  outline: none;
+  transition: border-color 0.2s, box-shadow 0.2s;
+
+  &:focus {
+    border-color: #6366f1;
+    box-shadow: 0 0 0 1px rgba(99, 102, 241, 0.2);
+  }
+`
+
 const SelectArrow = styled.span<{ $open?: boolean }>`
   display: inline-block;
   width: 0;
@@ -302,6 +321,7 @@ export const styles = {
   Label,
   SelectWrap,
   SelectTrigger,
+  SearchInput,
   SelectArrow,
   SelectDropdown,
   SelectOption,
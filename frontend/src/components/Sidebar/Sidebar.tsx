@@ -1,6 +1,6 @@
 import { useState, useRef, useEffect } from 'react'
 import { createPortal } from 'react-dom'
-import { logout } from '@/api'
+import { logout, searchTables } from '@/api'
 import type { SidebarProps } from '@/types/components'
 import type { ColumnMeta } from '@/types'
 import { styles } from './Sidebar.styles'
@@ -109,9 +109,35 @@ export default function Sidebar({
 }: SidebarProps) {
   const [schemaExpanded, setSchemaExpanded] = useState(false)
   const [loggingOut, setLoggingOut] = useState(false)
+  const [tableQuery, setTableQuery] = useState('')
+  const [matchedTables, setMatchedTables] = useState<string[] | null>(null)
   const tableColumns: Record<string, ColumnMeta> =
     selectedTable && selectedTable !== 'None' ? schema[selectedTable] || {} : {}
 
+  useEffect(() => {
+    const query = tableQuery.trim()
+    if (!query) {
+      setMatchedTables(null)
+      return
+    }
+    let cancelled = false
+    const timer = window.setTimeout(() => {
+      searchTables(query)
+        .then((data) => {
+          if (!cancelled) setMatchedTables(data.results.map((r) => r.table))
+        })
+        .catch(() => {
+          if (!cancelled) setMatchedTables(null)
+        })
+    }, 150)
+    return () => {
+      cancelled = true
+      window.clearTimeout(timer)
+    }
+  }, [tableQuery])
+
+  const visibleTables = matchedTables ?? tables
+
   const handleLogout = async () => {
     if (!onLogout || loggingOut) return
     setLoggingOut(true)
@@ -139,7 +165,7 @@ export default function Sidebar({
             type="button"
             onClick={handleLogout}
             disabled={loggingOut}
-            title="Log out and clear cached schema"
+            title="Log out"
             aria-label={loggingOut ? 'Logging out...' : 'Log out'}
           >
             <styles.LogoutIcon
@@ -154,9 +180,17 @@ export default function Sidebar({
       <styles.Section>
         <styles.Heading>Database Tables</styles.Heading>
         <styles.Label>Select a Table</styles.Label>
+        <styles.SearchInput
+          type="search"
+          value={tableQuery}
+          onChange={(e) => setTableQuery(e.target.value)}
+          placeholder="Search tables..."
+          aria-label="Search tables"
+          disabled={schemaLoading}
+        />
         <CustomSelect
           value={selectedTable}
-          options={[{ value: 'None', label: 'None' }, ...tables.map((t) => ({ value: t, label: t }))]}
+          options={[{ value: 'None', label: 'None' }, ...visibleTables.map((t) => ({ value: t, label: t }))]}
           onChange={onSelectTable}
           disabled={schemaLoading}
           placeholder="Select a table"
@@ -3,6 +3,7 @@ export interface ColumnMeta {
   type: string
   primary_key: boolean | null
   foreign_key: string | null
+  indexes?: { name: string; seq: number; unique: boolean }[]
 }
 
 /** Table name -> column name -> ColumnMeta */
@@ -36,11 +37,66 @@ export interface LoginResponse {
 export interface SchemaResponse {
   schema: SchemaMap
   tables: string[]
+  version?: string
+}
+
+/** API: schema?mode=tables (table list only) */
+export interface SchemaTablesResponse {
+  tables: string[]
+  comments: Record<string, string>
+  version?: string
+}
+
+/** API: schema?table=<name> */
+export interface TableSchemaResponse {
+  table: string
+  columns: Record<string, ColumnMeta>
+  version?: string
+}
+
+/** API: schema/search */
+export interface TableSearchResponse {
+  query: string
+  results: { table: string; match: 'exact' | 'prefix' | 'substring' | 'fuzzy' }[]
+}
+
+/** Local schema check of generated SQL */
+export interface ValidationError {
+  code: 'unknown_table' | 'unknown_column' | 'ambiguous_column'
+  message: string
+  statement: number
+  position: number
+  table?: string
+  column?: string
+  suggestions?: string[]
+}
+
+export interface ValidationReport {
+  valid: boolean
+  errors: ValidationError[]
+  elapsed_ms: number
+}
+
+/** Alternative query from multi-candidate generation */
+export interface SqlCandidate {
+  sql: string
+  rows_examined: number | null
+  error: string | null
+}
+
+/** Index-aware rewrite rule outcome */
+export interface RewriteNote {
+  rule: string
+  applied: boolean
+  detail: string
 }
 
 /** API: generate-sql, fix-sql */
 export interface SqlResponse {
   sql: string
+  validation?: ValidationReport
+  candidates?: SqlCandidate[]
+  rewrites?: RewriteNote[]
 }
 
 /** API: execute */
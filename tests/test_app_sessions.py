@@ -0,0 +1,65 @@
+import app as app_module
+import session_context
+
+
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "has_google_api_key", lambda: True)
+    return app_module.create_app().test_client()
+
+
+def session_cookie(response):
+    header = response.headers.get("Set-Cookie", "")
+    return header.split(";")[0].split("=", 1)[1] if header.startswith(app_module.SESSION_COOKIE) else None
+
+
+def test_client_chosen_sid_is_replaced(monkeypatch):
+    c = client(monkeypatch)
+    c.set_cookie(app_module.SESSION_COOKIE, "attacker-chosen-session-id")
+    issued = session_cookie(c.get("/api/check-auth"))
+    assert issued and session_context.valid_sid(issued)
+
+
+def test_login_rotates_sid(monkeypatch):
+    c = client(monkeypatch)
+    planted = session_context.new_sid()
+    c.set_cookie(app_module.SESSION_COOKIE, planted)
+    response = c.post("/api/login", json={"db_name": "school", "db_password": "secret"})
+    assert response.status_code == 200
+    issued = session_cookie(response)
+    assert issued and issued != planted
+    try:
+        assert planted not in session_context._sessions
+        assert issued in session_context._sessions
+    finally:
+        session_context.logout(issued)
+
+
+def test_anonymous_logout_keeps_global_credentials(monkeypatch):
+    cleared = []
+    monkeypatch.setattr(app_module, "clear_credentials", lambda: cleared.append(True))
+    monkeypatch.setattr(app_module, "PERSIST_DB_CREDENTIALS", False)
+    response = client(monkeypatch).post("/api/logout")
+    assert response.status_code == 200
+    assert cleared == []
+
+
+def test_shared_mode_requires_login(monkeypatch):
+    monkeypatch.setattr(app_module, "PERSIST_DB_CREDENTIALS", False)
+    monkeypatch.setenv("DB_NAME", "school")
+    monkeypatch.setenv("DB_PASSWORD", "secret")
+    c = client(monkeypatch)
+    assert c.get("/api/check-auth").get_json()["authenticated"] is False
+    assert c.get("/api/schema").status_code == 401
+    c.post("/api/login", json={"db_name": "school", "db_password": "secret"})
+    assert c.get("/api/check-auth").get_json()["authenticated"] is True
+    c.post("/api/logout")
+    assert c.get("/api/check-auth").get_json()["authenticated"] is False
+    assert c.post("/api/execute", json={"query": "SELECT 1"}).status_code == 401
+
+
+def test_single_user_mode_uses_env_credentials(monkeypatch):
+    monkeypatch.setattr(app_module, "PERSIST_DB_CREDENTIALS", True)
+    monkeypatch.setattr(app_module, "DRIVER_CONFIG", {"driver": "mysql", "path": None})
+    monkeypatch.setenv("DB_NAME", "school")
+    monkeypatch.setenv("DB_PASSWORD", "secret")
+    assert client(monkeypatch).get("/api/check-auth").get_json()["authenticated"] is True
@@ -0,0 +1,92 @@
+import sqlite3
+import pytest
+from cascade_planner import build_fk_graph, plan_cascade_delete
+from db_driver import MySQLDriver
+
+
+def column(fk=None, name=None):
+    return {"type": "int", "primary_key": False, "foreign_key": fk, "foreign_key_name": name, "indexes": []}
+
+
+SCHEMA = {
+    "course": {"dept": column(), "code": column()},
+    "section": {
+        "id": column(),
+        "dept": column("course(dept)", "fk_section_course"),
+        "code": column("course(code)", "fk_section_course"),
+    },
+    "team": {"id": column()},
+    "game": {"home_id": column("team(id)", "fk_home"), "away_id": column("team(id)", "fk_away")},
+}
+
+
+def test_composite_key_is_one_edge():
+    assert build_fk_graph(SCHEMA)["course"] == [("section", ("dept", "code"), ("dept", "code"))]
+
+
+def test_composite_key_uses_tuple_predicate():
+    plan = plan_cascade_delete("course", "`dept` = 'cs'", schema=SCHEMA)
+    assert [step["table"] for step in plan] == ["section", "course"]
+    assert plan[0]["where"] == "(`dept`, `code`) IN (SELECT `dept`, `code` FROM `course` WHERE `dept` = 'cs')"
+
+
+def test_separate_keys_to_same_parent_are_ored():
+    plan = plan_cascade_delete("team", "`id` = 1", schema=SCHEMA)
+    assert plan[0]["where"] == (
+        "`home_id` IN (SELECT `id` FROM `team` WHERE `id` = 1) OR `away_id` IN (SELECT `id` FROM `team` WHERE `id` = 1)"
+    )
+
+
+def test_unnamed_edges_stay_per_column():
+    schema = {"parent": {"a": column(), "b": column()}, "child": {"a": column("parent(a)"), "b": column("parent(b)")}}
+    assert sorted(build_fk_graph(schema)["parent"]) == [("child", ("a",), ("a",)), ("child", ("b",), ("b",))]
+
+
+def test_cycle_is_rejected():
+    schema = {"a": {"b_id": column("b(id)", "fk_a")}, "b": {"a_id": column("a(id)", "fk_b")}}
+    with pytest.raises(ValueError):
+        plan_cascade_delete("a", "1 = 1", schema=schema)
+
+
+class InformationSchemaCursor:
+    """MySQL cursor stand-in: DESCRIBE/SHOW INDEX answered from columns, the rest run on SQLite."""
+
+    def __init__(self, columns, key_column_usage):
+        self.columns = columns
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("ATTACH ':memory:' AS information_schema")
+        self.conn.execute(
+            "CREATE TABLE information_schema.KEY_COLUMN_USAGE (TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, "
+            "REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME, CONSTRAINT_NAME)"
+        )
+        self.conn.executemany("INSERT INTO information_schema.KEY_COLUMN_USAGE VALUES (?, ?, ?, ?, ?, ?)", key_column_usage)
+        self.conn.create_function("DATABASE", 0, lambda: "shop")
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        words = sql.split()
+        if words[0] == "DESCRIBE":
+            self.rows = [(name, "int") for name in self.columns[words[1]]]
+        elif words[:2] == ["SHOW", "INDEX"]:
+            self.rows = []
+        else:
+            self.rows = self.conn.execute(sql.replace("%s", "?"), params).fetchall()
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_mysql_introspection_ignores_other_schemas():
+    cursor = InformationSchemaCursor(
+        {"customer": ["id"], "orders": ["id", "customer_id"], "invoice": ["id", "order_id"]},
+        [
+            ("shop", "orders", "customer_id", "customer", "id", "fk_orders_customer"),
+            ("archive", "invoice", "order_id", "orders", "id", "fk_invoice_order"),
+            ("archive", "orders", "id", "invoice", "id", "fk_archive_orders"),
+        ],
+    )
+    schema = MySQLDriver().introspect_tables(cursor, ["customer", "orders", "invoice"])
+    assert schema["invoice"]["order_id"]["foreign_key"] is None
+    assert schema["orders"]["id"]["foreign_key"] is None
+    plan = plan_cascade_delete("customer", "`id` = 1", schema=schema)
+    assert [step["table"] for step in plan] == ["orders", "customer"]
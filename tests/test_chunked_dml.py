@@ -0,0 +1,61 @@
+import sqlite3
+import pytest
+import chunked_dml
+from chunked_dml import parse_single_table_dml, plan_chunked_dml, run_chunked_dml
+
+SCHEMA = {
+    "orders": {
+        "id": {"type": "int", "primary_key": True},
+        "status": {"type": "varchar(20)"},
+    },
+}
+
+
+@pytest.fixture
+def db():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, status TEXT)")
+    ids = [1, 2, 3, 1_000_001, 2_000_000, 3_000_000_001]
+    conn.executemany("INSERT INTO orders VALUES (?, ?)", [(i, "old" if i % 2 else "new") for i in ids])
+    conn.commit()
+    return conn
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM orders o, customers c WHERE o.id = c.id",
+    "UPDATE orders o, customers c SET o.status = 'x' WHERE o.id = c.id",
+    "UPDATE orders AS o, customers SET o.status = 'x'",
+    "DELETE FROM shop.orders WHERE id = 1",
+])
+def test_multi_table_references_are_rejected(sql):
+    assert parse_single_table_dml(sql) is None
+
+
+def test_single_table_with_alias_is_parsed():
+    plan = parse_single_table_dml("UPDATE orders AS o SET o.status = 'x' WHERE o.id > 5")
+    assert plan["table"] == "orders" and plan["alias"] == "o" and plan["where"] == "o.id > 5"
+
+
+def test_sparse_keys_take_no_empty_batches(db, monkeypatch):
+    pauses = []
+    monkeypatch.setattr(chunked_dml.time, "sleep", pauses.append)
+    plan = plan_chunked_dml("DELETE FROM orders WHERE status = 'old'", SCHEMA)
+    summary = run_chunked_dml(db, db.cursor(), plan, chunk_size=1, pause_ms=10)
+    assert summary["chunks"] == 4 and summary["affected_rows"] == 4
+    assert len(pauses) == 3
+    assert [row[0] for row in db.execute("SELECT id FROM orders ORDER BY id")] == [2, 2_000_000]
+
+
+def test_update_with_alias_in_batches(db, monkeypatch):
+    monkeypatch.setattr(chunked_dml.time, "sleep", lambda s: None)
+    seen = []
+    plan = plan_chunked_dml("UPDATE orders AS o SET status = 'done' WHERE o.id >= 2", SCHEMA)
+    summary = run_chunked_dml(db, db.cursor(), plan, chunk_size=2, progress=lambda *args: seen.append(args))
+    assert summary["affected_rows"] == 5 and summary["chunks"] == 3
+    assert seen[-1] == (3, 5)
+    assert db.execute("SELECT COUNT(*) FROM orders WHERE status = 'done'").fetchone()[0] == 5
+
+
+def test_no_matching_rows(db):
+    plan = plan_chunked_dml("DELETE FROM orders WHERE status = 'missing'", SCHEMA)
+    assert run_chunked_dml(db, db.cursor(), plan)["chunks"] == 0
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+import pytest
+import ai_generator
+from sql_explainer import explain_sql
+
+
+@pytest.fixture
+def model(monkeypatch):
+    calls = []
+
+    def generate_text(prompt, priority=None):
+        calls.append(prompt)
+        return "not json"
+    monkeypatch.setattr(ai_generator, "_generate_text", generate_text)
+    monkeypatch.setattr(ai_generator, "_ensure_genai_configured", lambda: True)
+    monkeypatch.setattr(ai_generator, "_explanations", OrderedDict())
+    monkeypatch.setattr(ai_generator, "EXPLANATION_LOCAL", False)
+    monkeypatch.setattr(ai_generator, "EXPLANATION_BATCH", True)
+    monkeypatch.setattr(ai_generator, "EXPLANATION_LANGUAGES", ["en", "es", "fr", "de", "hi", "zh", "ja", "ru"])
+    return calls
+
+
+def test_unparseable_batch_falls_back_only_for_requested_language(model):
+    assert ai_generator.get_sql_explanation("SELECT 1", "fr") == "not json"
+    assert len(model) == 2
+    assert ai_generator._cached_explanation(ai_generator.canonical_sql("SELECT 1"), "fr") == "not json"
+    assert ai_generator._cached_explanation(ai_generator.canonical_sql("SELECT 1"), "es") is None
+
+
+def test_explicit_languages_are_all_generated(model):
+    result = ai_generator.get_sql_explanations("SELECT 1", ["en", "es"])
+    assert set(result) == {"en", "es"}
+    assert len(model) == 3
+
+
+def test_explanation_language_list_is_capped(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, "has_google_api_key", lambda: True)
+    c = app_module.create_app().test_client()
+    c.post("/api/login", json={"db_name": "school", "db_password": "secret"})
+    languages = [f"x{i}" for i in range(app_module.MAX_EXPLANATION_LANGUAGES + 1)]
+    response = c.post("/api/explanation", json={"sql": "SELECT 1", "languages": languages})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("driver, dialect", [("mysql", "MySQL"), ("sqlite", "SQLite"), ("duckdb", "DuckDB")])
+def test_prompts_name_the_driver_dialect(monkeypatch, driver, dialect):
+    import db_config
+    monkeypatch.setitem(db_config.DRIVER_CONFIG, "driver", driver)
+    prompt = ai_generator._sql_prompt(cascade=False)
+    assert f"valid {dialect} query" in prompt and ("MySQL" not in prompt or dialect == "MySQL")
+    assert f"corrected {dialect} query" in ai_generator.FIX_SQL_PROMPT.format(dialect=ai_generator._dialect())
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM s WHERE",
+    "SELECT * FROM s WHERE a = 1 AND",
+    "SELECT * FROM s WHERE a =",
+    "SELECT * FROM s WHERE a IN ()",
+    "SELECT * FROM s WHERE a BETWEEN 1",
+    "SELECT * FROM s WHERE a BETWEEN 1 AND",
+    "UPDATE s SET",
+    "UPDATE s SET a = 1 WHERE",
+    "DELETE FROM s WHERE",
+    "DELETE FROM s LIMIT",
+])
+def test_malformed_sql_is_not_explained_locally(sql):
+    assert explain_sql(sql) is None
+
+
+def test_limit_without_where_is_not_every_row():
+    assert explain_sql("DELETE FROM s LIMIT 5") == "This query deletes at most 5 rows from the s table."
+    assert explain_sql("UPDATE s SET a = 1 ORDER BY id LIMIT 5") == (
+        "This query updates the s table, setting a to 1, for at most 5 rows, in order of id."
+    )
+    assert explain_sql("DELETE FROM s WHERE a = 1 LIMIT 5") == (
+        "This query deletes the rows of the s table where a is 1. At most 5 rows are affected."
+    )
+    assert explain_sql("SELECT * FROM s WHERE a IN (1, 2) AND b BETWEEN 1 AND 3") == (
+        "This query retrieves all columns from the s table, for rows where a is one of 1 and 2 and b is between 1 and 3."
+    )
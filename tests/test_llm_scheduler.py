@@ -0,0 +1,91 @@
+import threading
+import time
+import pytest
+import llm_scheduler
+from google.api_core import exceptions as google_exceptions
+from llm_scheduler import BACKGROUND, INTERACTIVE, LLMUnavailable, Scheduler
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(llm_scheduler.time, "sleep", lambda s: None)
+    monkeypatch.setattr(llm_scheduler, "LLM_RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(llm_scheduler, "LLM_RETRY_MAX_SECONDS", 0.02)
+
+
+def test_interactive_calls_go_before_background():
+    scheduler = Scheduler(concurrency=1, keys=lambda: ["k1"])
+    started, release = threading.Event(), threading.Event()
+    order = []
+
+    def blocker(key):
+        started.set()
+        release.wait(5)
+
+    first = threading.Thread(target=scheduler.run, args=(blocker,))
+    first.start()
+    started.wait(5)
+    waiting = [
+        threading.Thread(target=scheduler.run, args=(lambda key: order.append("background"),), kwargs={"priority": BACKGROUND}),
+        threading.Thread(target=scheduler.run, args=(lambda key: order.append("interactive"),), kwargs={"priority": INTERACTIVE}),
+    ]
+    for queued, t in enumerate(waiting, 1):
+        t.start()
+        deadline = time.monotonic() + 5
+        while scheduler.status()["queued"] < queued and time.monotonic() < deadline:
+            time.sleep(0.005)
+    release.set()
+    for t in [first] + waiting:
+        t.join(5)
+    assert order == ["interactive", "background"]
+
+
+def test_rate_limited_key_cools_down_and_retry_uses_another():
+    scheduler = Scheduler(keys=lambda: ["k1", "k2"])
+    used = []
+
+    def call(key):
+        used.append(key)
+        if key == "k1":
+            raise google_exceptions.TooManyRequests("slow down")
+        return "ok"
+    assert scheduler.run(call) == "ok"
+    assert used == ["k1", "k2"]
+    assert scheduler.status()["active"] == 0
+
+
+def test_gives_up_after_retries(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_MAX_RETRIES", 2)
+    scheduler = Scheduler(keys=lambda: ["k1"])
+    calls = []
+
+    def call(key):
+        calls.append(key)
+        raise google_exceptions.ServiceUnavailable("down")
+    with pytest.raises(LLMUnavailable) as info:
+        scheduler.run(call)
+    assert len(calls) == 3
+    assert info.value.retry_after >= 1
+
+
+def test_rpm_budget_times_out_in_queue(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_QUEUE_TIMEOUT_SECONDS", 0.05)
+    scheduler = Scheduler(rpm=1, keys=lambda: ["k1"])
+    assert scheduler.run(lambda key: "first") == "first"
+    with pytest.raises(LLMUnavailable):
+        scheduler.run(lambda key: "second")
+    assert scheduler.status()["queued"] == 0
+
+
+def test_missing_key():
+    with pytest.raises(ValueError):
+        Scheduler(keys=lambda: []).run(lambda key: None)
+
+
+def test_call_larger_than_tpm_waits_for_an_empty_window():
+    state = llm_scheduler._KeyState()
+    state.record(100.0, 10)
+    state.record(110.0, 10)
+    assert state.wait_time(120.0, 500, rpm=0, tpm=100) == pytest.approx(50.0)
+    assert state.wait_time(120.0, 85, rpm=0, tpm=100) == pytest.approx(40.0)
+    assert state.wait_time(170.0, 500, rpm=0, tpm=100) == 0.0
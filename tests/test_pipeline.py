@@ -0,0 +1,43 @@
+import pipeline
+
+SCHEMA = {"student": {"id": "int", "name": "varchar(50)"}}
+
+
+def run(monkeypatch, generated, fixed, outcomes, max_attempts=3):
+    executed = []
+
+    def execute(sql):
+        executed.append(sql)
+        return outcomes.pop(0)
+
+    monkeypatch.setattr(pipeline, "REWRITE_ENABLED", False)
+    monkeypatch.setattr(pipeline, "store_all_table_structures", lambda force_update=False: None)
+    monkeypatch.setattr(pipeline, "load_schema", lambda: SCHEMA)
+    monkeypatch.setattr(pipeline, "get_gemini_response", lambda prompt, **kwargs: generated)
+    monkeypatch.setattr(pipeline, "fix_sql_query", lambda sql, err, **kwargs: fixed)
+    monkeypatch.setattr(pipeline, "execute_query_api", execute)
+    return pipeline.generate_and_execute("prompt", max_attempts=max_attempts), executed
+
+
+def test_single_statement_is_repaired(monkeypatch):
+    result, executed = run(
+        monkeypatch, "SELECT name FROM student WHERE id = 'x'", "SELECT name FROM student WHERE id = 1",
+        [(False, "bad value", None), (True, None, [{"name": "a"}])],
+    )
+    assert result["success"]
+    assert executed == ["SELECT name FROM student WHERE id = 'x'", "SELECT name FROM student WHERE id = 1"]
+
+
+def test_failed_write_batch_is_not_rerun(monkeypatch):
+    batch = "INSERT INTO student (id, name) VALUES (1, 'a'); UPDATE student SET name = 'b' WHERE id = 1"
+    result, executed = run(monkeypatch, batch, batch, [(False, "deadlock", None)])
+    assert not result["success"]
+    assert executed == [batch]
+    assert "not auto-repaired" in result["error"]
+
+
+def test_read_only_batch_is_repaired(monkeypatch):
+    batch = "SELECT id FROM student; SELECT name FROM student"
+    result, executed = run(monkeypatch, batch, batch, [(False, "timeout", None), (True, None, [])])
+    assert result["success"]
+    assert len(executed) == 2
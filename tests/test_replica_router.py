@@ -0,0 +1,107 @@
+import mysql.connector
+import pytest
+import replica_router
+from replica_router import ReplicaRouter, current_session
+
+
+class PrimaryDriver:
+    name = "mysql"
+
+    def connect(self):
+        return "primary-connection"
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setenv("DB_REPLICAS", "replica1,replica2")
+    monkeypatch.setattr(ReplicaRouter, "_health_loop", lambda self: None)
+    return ReplicaRouter()
+
+
+def refuse(errno):
+    def connect(**config):
+        raise mysql.connector.Error(msg="refused", errno=errno)
+    return connect
+
+
+def test_access_denied_keeps_replica_healthy(router, monkeypatch):
+    monkeypatch.setattr(replica_router.mysql.connector, "connect", refuse(1045))
+    assert router.connect("SELECT 1", PrimaryDriver()) == ("primary-connection", "primary")
+    assert all(r["healthy"] for r in router.status())
+
+
+def test_unreachable_replica_is_marked_down(router, monkeypatch):
+    monkeypatch.setattr(replica_router.mysql.connector, "connect", refuse(2003))
+    assert router.connect("SELECT 1", PrimaryDriver())[1] == "primary"
+    assert not any(r["healthy"] for r in router.status())
+
+
+def test_stale_write_marks_expire(router, monkeypatch):
+    monkeypatch.setattr(replica_router, "REPLICA_STICKY_SECONDS", 0.01)
+    for n in range(50):
+        router.note_write(f"session-{n}")
+    router._last_expiry = 0.0
+    monkeypatch.setattr(replica_router.time, "monotonic", lambda: 1e9)
+    router.note_write("latest")
+    assert list(router._last_write) == ["latest"]
+
+
+def test_health_check_never_uses_session_credentials(router, monkeypatch):
+    seen = []
+
+    def connect(**config):
+        seen.append(config)
+        raise mysql.connector.Error(msg="down", errno=2003)
+
+    monkeypatch.setattr(replica_router.mysql.connector, "connect", connect)
+    monkeypatch.setattr(replica_router, "REPLICA_HEALTH_USER", "monitor")
+    monkeypatch.setattr(replica_router, "REPLICA_HEALTH_PASSWORD", "pw")
+    monkeypatch.setattr(replica_router.session_context, "current_db_config", lambda: {"user": "alice", "password": "a"})
+    token = current_session.set("alice")
+    try:
+        router.connect("SELECT 1", PrimaryDriver())
+    finally:
+        current_session.reset(token)
+    router._check(router._replicas[0])
+    assert seen[-1]["user"] == "monitor" and seen[-1]["password"] == "pw"
+
+
+def test_replica_connect_uses_short_timeout(router, monkeypatch):
+    seen = []
+
+    def connect(**config):
+        seen.append(config)
+        raise mysql.connector.Error(msg="timed out", errno=2003)
+
+    monkeypatch.setattr(replica_router.mysql.connector, "connect", connect)
+    assert router.connect("SELECT 1", PrimaryDriver())[1] == "primary"
+    assert seen and all(config["connection_timeout"] == replica_router.REPLICA_CONNECT_TIMEOUT for config in seen)
+
+
+class StatusConnection:
+    def __init__(self, status):
+        self.status = status
+
+    def cursor(self, dictionary=False):
+        return self
+
+    def execute(self, sql):
+        pass
+
+    def fetchone(self):
+        return self.status
+
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("status, healthy", [
+    (None, False),
+    ({"Seconds_Behind_Source": None}, False),
+    ({"Seconds_Behind_Source": 120}, False),
+    ({"Seconds_Behind_Source": 0}, True),
+])
+def test_health_check_needs_running_replication(router, monkeypatch, status, healthy):
+    monkeypatch.setattr(replica_router.mysql.connector, "connect", lambda **config: StatusConnection(status))
+    router.status()
+    assert router._check(router._replicas[0])[0] is healthy
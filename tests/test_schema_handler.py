@@ -0,0 +1,45 @@
+import os
+import schema_handler
+from schema_handler import LazySchema, save_schema, schema_version, read_schema_file
+
+CATALOG = {"tables": {"users": "", "orders": ""}, "foreign_keys": [["orders", "user_id", "users(id)", "fk_orders_user"]]}
+
+
+class FakeDriver:
+    def connect(self):
+        return self
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+    def introspect_tables(self, cursor, tables):
+        return {table: {"id": {"type": "int", "primary_key": True}} for table in tables}
+
+
+def test_lazy_fetch_keeps_schema_version(tmp_path, monkeypatch):
+    path = str(tmp_path / "schema.json")
+    monkeypatch.setattr(schema_handler, "schema_file", lambda: path)
+    monkeypatch.setattr(schema_handler, "get_driver", FakeDriver)
+    monkeypatch.setattr(schema_handler, "_prefetcher", type("Inline", (), {"submit": lambda self, fn, *a: fn(*a)})())
+    save_schema({}, "fp1", catalog=CATALOG)
+    before = schema_version()
+    assert before
+    schema = LazySchema(path, CATALOG, {}, schema_handler._file_version(schema_handler._catalog_file(path)))
+    assert "id" in schema["users"]
+    assert set(read_schema_file(path)) == {"users", "orders"}
+    assert schema_version() == before
+    save_schema({}, "fp2", catalog=CATALOG)
+    assert schema_version() != before
+
+
+def test_eager_schema_version_follows_snapshot(tmp_path, monkeypatch):
+    path = str(tmp_path / "schema.json")
+    monkeypatch.setattr(schema_handler, "schema_file", lambda: path)
+    assert schema_version() == ""
+    save_schema({"users": {"id": {"type": "int"}}}, "fp1")
+    before = schema_version()
+    save_schema({"users": {"id": {"type": "bigint"}}, "orders": {}}, "fp1")
+    assert os.path.exists(path) and schema_version() != before
@@ -0,0 +1,63 @@
+import pytest
+import session_context
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.resets = 0
+
+    def is_connected(self):
+        return not self.closed
+
+    def reset_session(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+def fake_pool(monkeypatch, size=2):
+    opened = []
+
+    def connect(**config):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(session_context.mysql.connector, "connect", connect)
+    return session_context._Pool(size, {}), opened
+
+
+def test_minted_sids_verify_and_client_sids_do_not():
+    sid = session_context.new_sid()
+    assert session_context.valid_sid(sid)
+    assert sid != session_context.new_sid()
+    assert not session_context.valid_sid("attacker-chosen-session-id")
+    assert not session_context.valid_sid(sid.split(".")[0] + ".0123456789abcdef0123456789abcdef")
+    assert not session_context.valid_sid("")
+
+
+def test_pool_reuses_returned_connections(monkeypatch):
+    pool, opened = fake_pool(monkeypatch)
+    pool.get(1).close()
+    pool.get(1).close()
+    assert len(opened) == 1
+    assert opened[0].resets == 2
+
+
+def test_close_disconnects_idle_and_checked_out_connections(monkeypatch):
+    pool, opened = fake_pool(monkeypatch)
+    busy = pool.get(1)
+    pool.get(1).close()
+    pool.close()
+    assert opened[1].closed and not opened[0].closed
+    busy.close()
+    assert opened[0].closed
+    assert pool.open_count() == 0
+
+
+def test_exhausted_pool_times_out(monkeypatch):
+    pool, _ = fake_pool(monkeypatch, size=1)
+    pool.get(1)
+    with pytest.raises(session_context.mysql.connector.errors.PoolError):
+        pool.get(0.05)
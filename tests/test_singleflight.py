@@ -0,0 +1,44 @@
+import threading
+import time
+import pytest
+import singleflight
+
+
+def test_concurrent_callers_share_one_call():
+    group = singleflight.Group("shared")
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"rows": [1]}
+
+    leader = threading.Thread(target=lambda: results.append(group.do("k", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(group.do("k", work))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    deadline = time.monotonic() + 5
+    while singleflight.COALESCED._values.get(("shared",), 0) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+    assert len(calls) == 1
+    assert results == [{"rows": [1]}] * 4
+    results[0]["rows"].append(2)
+    assert results[1] == {"rows": [1]}
+    assert group.in_flight() == 0
+
+
+def test_errors_are_not_cached():
+    group = singleflight.Group("errors")
+
+    def fail():
+        raise ValueError("boom")
+    with pytest.raises(ValueError):
+        group.do("k", fail)
+    assert group.do("k", lambda: 42) == 42
@@ -0,0 +1,64 @@
+import sqlite3
+import pytest
+import db_config
+from sql_rewriter import rewrite_sql
+
+SCHEMA = {
+    "orders": {
+        "id": {"type": "int", "indexes": [{"name": "PRIMARY", "seq": 1}]},
+        "created_at": {"type": "datetime", "indexes": [{"name": "idx_created", "seq": 1}]},
+        "total": {"type": "decimal(10,2)"},
+    },
+}
+
+
+def rewrite(sql):
+    return rewrite_sql(sql, SCHEMA)[0]
+
+
+def test_year_equality_becomes_range():
+    assert rewrite("SELECT id FROM orders WHERE YEAR(created_at) = 2023") == (
+        "SELECT id FROM orders WHERE (created_at >= '2023-01-01' AND created_at < '2024-01-01')"
+    )
+
+
+def test_date_comparison_inside_and_chain_is_rewritten():
+    sql = rewrite("SELECT id FROM orders WHERE DATE(created_at) >= '2024-02-01' AND total > 10 ORDER BY id")
+    assert "created_at >= '2024-02-01' AND total > 10 ORDER BY id" in sql
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT id FROM orders WHERE YEAR(created_at) = 2023 + 1",
+    "SELECT id FROM orders WHERE YEAR(created_at) = 2023 IS TRUE",
+    "SELECT id FROM orders WHERE 1 + YEAR(created_at) = 2024",
+    "SELECT id FROM orders WHERE DATE(created_at) = '2024-01-01' * 1",
+])
+def test_comparison_inside_wider_expression_is_left_alone(sql):
+    assert rewrite(sql) == sql
+
+
+def test_date_equality_uses_next_day_literal():
+    assert rewrite("SELECT id FROM orders WHERE DATE(created_at) = '2024-02-29'") == (
+        "SELECT id FROM orders WHERE (created_at >= '2024-02-29' AND created_at < '2024-03-01')"
+    )
+    assert rewrite("SELECT id FROM orders WHERE DATE(created_at) = '2024-02-30'") == (
+        "SELECT id FROM orders WHERE DATE(created_at) = '2024-02-30'"
+    )
+
+
+def test_rewritten_sql_runs_on_sqlite(monkeypatch):
+    monkeypatch.setitem(db_config.DRIVER_CONFIG, "driver", "sqlite")
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, created_at DATETIME, total DECIMAL(10,2))")
+    conn.executemany("INSERT INTO orders VALUES (?, ?, ?)", [
+        (1, "2024-02-29 23:59:59", 5), (2, "2024-03-01 00:00:00", 7), (3, "2023-12-31 10:00:00", 9),
+    ])
+    for sql, ids in [
+        ("SELECT * FROM orders WHERE DATE(created_at) = '2024-02-29'", [1]),
+        ("SELECT * FROM orders WHERE DATE(created_at) <= '2024-02-29'", [1, 3]),
+        ("SELECT * FROM orders WHERE DATE(created_at) > '2024-02-29'", [2]),
+        ("SELECT * FROM orders WHERE YEAR(created_at) = 2024", [1, 2]),
+    ]:
+        rewritten, notes = rewrite_sql(sql, SCHEMA, columns=["id"])
+        assert rewritten.startswith('SELECT "id" FROM') and "DATE(" not in rewritten and "YEAR(" not in rewritten
+        assert sorted(row[0] for row in conn.execute(rewritten)) == ids
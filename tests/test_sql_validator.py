@@ -0,0 +1,47 @@
+from sql_validator import validate_sql
+
+SCHEMA = {
+    "student": {"id": "int", "name": "varchar(50)", "dob": "date", "college_id": "int"},
+    "college": {"id": "int", "name": "varchar(50)"},
+}
+
+
+def codes(sql):
+    return [err["code"] for err in validate_sql(sql, SCHEMA)]
+
+
+def test_union_branches_have_their_own_scope():
+    assert codes("SELECT id FROM student UNION SELECT id FROM college") == []
+    assert codes("SELECT name FROM student WHERE id IN (SELECT id FROM college UNION ALL SELECT id FROM student)") == []
+
+
+def test_union_branch_still_checks_its_columns():
+    assert codes("SELECT id FROM student UNION SELECT idd FROM college") == ["unknown_column"]
+    assert codes("SELECT s.id FROM student s UNION SELECT s.id FROM college c") == ["unknown_table"]
+
+
+def test_insert_select_source_has_its_own_scope():
+    assert codes("INSERT INTO student (id, name) SELECT id, name FROM college") == []
+    assert codes("INSERT INTO student (id, nme) SELECT id, name FROM college") == ["unknown_column"]
+
+
+def test_timestampdiff_unit_is_not_a_column():
+    assert codes("SELECT TIMESTAMPDIFF(YEAR, dob, CURDATE()) FROM student") == []
+    assert codes("SELECT TIMESTAMPADD(MONTH, 1, dob) FROM student") == []
+
+
+def test_ambiguous_column_in_one_select():
+    assert codes("SELECT id FROM student, college") == ["ambiguous_column"]
+    assert codes("SELECT s.id FROM student s JOIN college c ON s.college_id = c.id") == []
+
+
+def test_unknown_table_suggestion():
+    errors = validate_sql("SELECT * FROM studnet", SCHEMA)
+    assert errors[0]["code"] == "unknown_table"
+    assert errors[0]["suggestions"] == ["student"]
+
+
+def test_typed_literals_are_not_columns():
+    assert codes("SELECT id FROM student WHERE dob >= DATE '2023-01-01'") == []
+    assert codes("SELECT id FROM student WHERE dob < TIMESTAMP '2023-01-01 00:00:00' OR TIME '10:00' > TIME '09:00'") == []
+    assert codes("SELECT date FROM student") == ["unknown_column"]
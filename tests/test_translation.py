@@ -0,0 +1,24 @@
+import pytest
+import translation
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("show all students with marks above 80", "en"),
+    ("list users", "en"),
+    ("tampilkan semua siswa", "auto"),
+    ("visa alla studenter", "auto"),
+    ("tampilkan semua data dari table siswa", "auto"),
+    ("muestra todos los clientes", "es"),
+    ("सभी छात्र दिखाओ", "hi"),
+])
+def test_detect_language(text, expected):
+    assert translation.detect_language(text) == expected
+
+
+def test_unknown_latin_text_is_translated(monkeypatch):
+    calls = []
+    monkeypatch.setattr(translation, "_translate_remote", lambda text, source, target: calls.append(text) or "show all students")
+    monkeypatch.setattr(translation, "_connect", lambda: (_ for _ in ()).throw(translation.sqlite3.Error("no cache")))
+    monkeypatch.setattr(translation, "_memory", translation.OrderedDict())
+    assert translation.translate("visa alla studenter") == "show all students"
+    assert calls == ["visa alla studenter"]
@@ -0,0 +1,113 @@
+import itertools
+import sqlite3
+import threading
+import types
+import pytest
+import workload
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(workload, "DIGEST_DB", str(tmp_path / "digest.sqlite3"))
+    monkeypatch.setattr(workload, "_stats", {})
+    monkeypatch.setattr(workload, "_loaded", False)
+    monkeypatch.setattr(workload, "_flusher", None)
+    monkeypatch.setattr(workload, "_flush_loop", lambda: None)
+    monkeypatch.setattr(workload.atexit, "register", lambda fn: None)
+    return tmp_path
+
+
+def use_database(monkeypatch, identity):
+    monkeypatch.setattr(workload, "database_identity", lambda: ("label", identity))
+
+
+def test_digests_are_scoped_per_database(store, monkeypatch):
+    use_database(monkeypatch, "mysql:h:3306:shop")
+    workload.record("SELECT * FROM users WHERE id = 1", 0.01)
+    use_database(monkeypatch, "mysql:h:3306:crm")
+    workload.record("SELECT * FROM users WHERE id = 2", 0.01)
+    (stmt,) = workload.top_statements()
+    assert stmt["sample"] == "SELECT * FROM users WHERE id = 2"
+    assert stmt["calls"] == 1
+    assert "db" not in stmt
+    use_database(monkeypatch, "mysql:h:3306:shop")
+    assert workload.top_statements()[0]["sample"] == "SELECT * FROM users WHERE id = 1"
+
+
+def test_flush_and_load_keep_database(store, monkeypatch):
+    use_database(monkeypatch, "sqlite:/a.db")
+    workload.record("SELECT 1", 0.001)
+    workload.flush()
+    monkeypatch.setattr(workload, "_stats", {})
+    monkeypatch.setattr(workload, "_loaded", False)
+    monkeypatch.setattr(workload, "_flusher", None)
+    assert workload.top_statements()[0]["calls"] == 1
+    use_database(monkeypatch, "sqlite:/b.db")
+    assert workload.top_statements() == []
+
+
+def test_store_without_db_column_is_migrated(store, monkeypatch):
+    conn = sqlite3.connect(workload.DIGEST_DB)
+    conn.execute("CREATE TABLE query_digest (digest TEXT PRIMARY KEY, fingerprint TEXT, sample TEXT, calls INTEGER, "
+                 "errors INTEGER, total_ms REAL, min_ms REAL, max_ms REAL, rows INTEGER, rows_examined INTEGER, "
+                 "bytes INTEGER, histogram TEXT, last_seen REAL)")
+    conn.commit()
+    conn.close()
+    use_database(monkeypatch, "sqlite:/a.db")
+    assert workload.top_statements() == []
+    workload.record("SELECT 1", 0.001)
+    workload.flush()
+
+
+def test_concurrent_first_calls_see_loaded_store(store, monkeypatch):
+    loading = threading.Event()
+    release = threading.Event()
+    load = workload._load
+
+    def slow_load():
+        loading.set()
+        release.wait(5)
+        load()
+    monkeypatch.setattr(workload, "_load", slow_load)
+    use_database(monkeypatch, "sqlite:/a.db")
+    first = threading.Thread(target=workload._ensure_started)
+    first.start()
+    loading.wait(5)
+    second = threading.Thread(target=workload._ensure_started)
+    second.start()
+    second.join(0.1)
+    assert second.is_alive()
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert workload._loaded
+
+
+def test_store_is_capped_and_evicts_least_recently_seen(store, monkeypatch):
+    monkeypatch.setattr(workload, "MAX_ENTRIES", 10)
+    monkeypatch.setattr(workload, "time", types.SimpleNamespace(time=itertools.count(1).__next__))
+    use_database(monkeypatch, "sqlite:/a.db")
+    workload.record("SELECT * FROM hot", 0.001)
+    for i in range(30):
+        workload.record(f"SELECT * FROM t{i}", 0.001)
+        workload.record("SELECT * FROM hot", 0.001)
+    assert len(workload._stats) <= 10
+    samples = {stmt["sample"] for stmt in workload.top_statements(limit=100)}
+    assert "SELECT * FROM hot" in samples and "SELECT * FROM t29" in samples
+    assert "SELECT * FROM t0" not in samples
+    workload.flush()
+    with sqlite3.connect(workload.DIGEST_DB) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM query_digest").fetchone()[0] == len(workload._stats)
+
+
+def test_fingerprint_is_computed_outside_the_lock(store, monkeypatch):
+    fingerprint = workload.fingerprint
+
+    def checked(sql):
+        assert not workload._lock.locked()
+        return fingerprint(sql)
+    monkeypatch.setattr(workload, "fingerprint", checked)
+    use_database(monkeypatch, "sqlite:/a.db")
+    workload.record("SELECT 1", 0.001)
+    workload.record_serialized("SELECT 1", 10)
+    assert workload.top_statements()[0]["bytes"] == 10